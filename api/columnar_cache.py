@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Columnar cache of parsed workbooks: what ParsedWorkbook.load parsed from an upload
+(the projected Compute frame, its header and the glossary's columns per tab) saved
+by the upload's SHA-256, so validating the same file again skips the XLSX parse.
+Numeric column blocks are stored uncompressed after a pickle header and memory-mapped
+back; text columns are in the header.
+
+Workbooks can be converted ahead of time (into the directory later runs look in).
+Files are keyed as the app keys uploads, so a delimited-text bundle is found when
+uploaded under the same file name:
+
+Usage: python backend/columnar_cache.py WORKBOOK [...] [--cache-dir DIR]
+"""
+
+import argparse
+import hashlib
+import mmap
+import os
+import pickle
+import struct
+import sys
+import tempfile
+import threading
+
+from workbook import ParsedWorkbook, DEFAULT_READER
+from csv_reader import DelimitedBundle, DelimitedInputError, delimited_source
+from report_cache import private_directory, file_digest, delimited_upload_digest
+from upload_types import is_delimited_name
+from progress import NULL_PROGRESS
+
+
+# Bump whenever ParsedWorkbook.to_state or the projection of the readers changes
+COLUMNAR_CACHE_VERSION = 3
+
+# Shared by every process of this user (and by the conversion CLI)
+COLUMNAR_CACHE_DIR = os.path.join(tempfile.gettempdir(), 'workbook-cache')
+# Total size of the cache files; /tmp is small on serverless instances
+COLUMNAR_CACHE_MAX_BYTES = 192 * 1024 * 1024
+
+# File layout: magic, pickle header, out-of-band buffers (aligned), buffer table, table length
+_MAGIC = b'TMWC\x01\n'
+_ALIGNMENT = 64
+_LENGTH = struct.Struct('<Q')
+
+
+def source_digest(source):
+    """
+    SHA-256 hex digest of a workbook given as a path, bytes or a binary file-like object
+    (or of the tabs of a csv_reader.DelimitedBundle).
+    """
+    if isinstance(source, DelimitedBundle):
+        return source.digest()
+    digest = hashlib.sha256()
+    if isinstance(source, (bytes, bytearray)):
+        digest.update(source)
+        return digest.hexdigest()
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    position = source.tell()
+    source.seek(0)
+    for chunk in iter(lambda: source.read(1024 * 1024), b''):
+        digest.update(chunk)
+    source.seek(position)
+    return digest.hexdigest()
+
+
+def upload_file_digest(path):
+    """
+    The digest the app caches an upload of the file at path by (see app.upload_digest_for):
+    its SHA-256, mixed with the file name for delimited-text uploads.
+    """
+    digest = file_digest(path)
+    if is_delimited_name(os.fspath(path)):
+        return delimited_upload_digest(digest, os.fspath(path))
+    return digest
+
+
+def workbook_cache_key(digest, reader=DEFAULT_READER, kind='xlsx'):
+    """
+    kind is how the upload is read, 'xlsx' or 'delimited': the same bytes read as
+    delimited-text tabs or as a workbook are different entries.
+    """
+    return f"{digest}-{kind}-{reader}-w{COLUMNAR_CACHE_VERSION}"
+
+
+def write_columnar(f, value):
+    """
+    Pickle value to the binary file f with its contiguous buffers (numpy column blocks)
+    stored out of band, each aligned so read_columnar can map it in place.
+    """
+    buffers = []
+    header = pickle.dumps(value, protocol=5, buffer_callback=buffers.append)
+    f.write(_MAGIC)
+    f.write(header)
+    position = len(_MAGIC) + len(header)
+
+    table = [(len(_MAGIC), len(header))]
+    for buffer in buffers:
+        raw = buffer.raw()
+        padding = -position % _ALIGNMENT
+        f.write(b'\0' * padding)
+        position += padding
+        f.write(raw)
+        table.append((position, raw.nbytes))
+        position += raw.nbytes
+
+    encoded = pickle.dumps(table, protocol=5)
+    f.write(encoded)
+    f.write(_LENGTH.pack(len(encoded)))
+
+
+def read_columnar(path):
+    """The value written by write_columnar to path; its buffers are read-only views of a memory map."""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size < len(_MAGIC) + _LENGTH.size:
+            raise ValueError("Truncated columnar cache file")
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    view = memoryview(mapped)
+    if view[:len(_MAGIC)] != _MAGIC:
+        raise ValueError("Not a columnar cache file")
+    (table_length,) = _LENGTH.unpack(view[-_LENGTH.size:])
+    table = pickle.loads(view[-_LENGTH.size - table_length:-_LENGTH.size])
+    (start, length), buffers = table[0], table[1:]
+    return pickle.loads(view[start:start + length], buffers=[view[offset:offset + size] for offset, size in buffers])
+
+
+class ColumnarCache:
+    """
+    Parsed workbook states (see ParsedWorkbook.to_state) in a directory, one file per
+    upload. Files are memory-mapped when read, so the page cache is the only in-memory
+    copy. Entries beyond max_bytes in total are evicted least recently used first; a missing,
+    full or read-only directory just means no caching, and so does one another user
+    could write to (see report_cache.private_directory): the files are unpickled.
+    """
+
+    SUFFIX = '.columnar'
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._private = None
+
+    def _usable(self):
+        # Checked once per process: only this user can replace the directory afterwards
+        if self._private is None:
+            self._private = private_directory(self.directory)
+        return self._private
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + self.SUFFIX)
+
+    def get(self, key):
+        if not self._usable():
+            return None
+        try:
+            value = read_columnar(self._path(key))
+            # Mark as recently used
+            os.utime(self._path(key))
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError, struct.error):
+            return None
+        return value
+
+    def put(self, key, value):
+        if not self._usable():
+            return
+        try:
+            tmp_path = f"{self._path(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                write_columnar(f, value)
+            os.replace(tmp_path, self._path(key))
+            self._evict()
+        except OSError:
+            pass
+
+    def _evict(self):
+        entries = []
+        total = 0
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(self.SUFFIX):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, entry.path, stat.st_size))
+                total += stat.st_size
+
+        # Oldest first
+        for _, path, size in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+
+columnar_cache = ColumnarCache(COLUMNAR_CACHE_DIR, COLUMNAR_CACHE_MAX_BYTES)
+
+
+def load_workbook(source, digest=None, reader=DEFAULT_READER, cache=None, progress=NULL_PROGRESS, max_workers=None):
+    """
+    ParsedWorkbook.load through the columnar cache: a workbook already parsed (by any
+    process, or converted ahead of time) is restored from its cache file; otherwise it
+    is parsed and, when its structure is valid, saved for next time.
+    digest is the upload's SHA-256 when already known (e.g. SpooledUpload.digest; for
+    delimited-text uploads one that includes the file name, see
+    report_cache.delimited_upload_digest). Delimited-text sources are keyed apart from
+    workbooks with the same bytes.
+    max_workers is passed to ParsedWorkbook.load (1 from worker processes).
+    """
+    cache = cache or columnar_cache
+    try:
+        bundle = delimited_source(source)
+    except DelimitedInputError:
+        # Unreadable: nothing to cache, ParsedWorkbook.load reports the error
+        return ParsedWorkbook.load(source, reader, max_workers, progress)
+    if bundle is not None:
+        source = bundle
+    key = workbook_cache_key(digest or source_digest(source), reader, 'delimited' if bundle is not None else 'xlsx')
+    state = cache.get(key)
+    if state is not None:
+        progress.start('parse')
+        return ParsedWorkbook.from_state(state, source)
+
+    workbook = ParsedWorkbook.load(source, reader, max_workers, progress)
+    if workbook.check_structure() is None:
+        cache.put(key, workbook.to_state())
+    return workbook
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('workbooks', nargs='+', help="Workbooks (.xlsx/.xls, or delimited-text tabs) to convert")
+    parser.add_argument('--cache-dir', default=COLUMNAR_CACHE_DIR, help="Cache directory (default: %(default)s)")
+    args = parser.parse_args()
+
+    cache = ColumnarCache(args.cache_dir, COLUMNAR_CACHE_MAX_BYTES)
+    status = 0
+    for path in args.workbooks:
+        try:
+            source = delimited_source(path) or path
+        except DelimitedInputError as e:
+            print(f"FAIL {path}: {str(e)}", file=sys.stderr)
+            status = 1
+            continue
+        key = workbook_cache_key(upload_file_digest(path), kind='delimited' if source is not path else 'xlsx')
+        workbook = ParsedWorkbook.load(source)
+        problem = workbook.check_structure()
+        if problem:
+            print(f"FAIL {path}: {problem[1]}", file=sys.stderr)
+            status = 1
+            continue
+        cache.put(key, workbook.to_state())
+        print(f"OK   {path}: {len(workbook.compute)} rows -> {cache._path(key)}")
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
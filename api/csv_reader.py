@@ -0,0 +1,240 @@
+import gzip
+import hashlib
+import os
+import zipfile
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+
+from progress import NULL_PROGRESS
+from upload_types import BUNDLE_EXTENSION, GZIP_EXTENSION, is_delimited_name
+
+
+# Delimited-text uploads: a zip with one file per tab (Compute.csv, README-Glossary.csv,
+# Storage.tsv, ...; see upload_types.py), or a single tab named after the file (e.g.
+# Compute.csv, only read on its own by scripts). The upload and each member may also
+# be gzip-compressed (Compute.csv.gz).
+GZIP_MAGIC = b'\x1f\x8b'
+
+# Delimiters tried for .csv/.txt files (.tsv files are always tab-separated)
+CANDIDATE_DELIMITERS = (',', ';', '\t', '|')
+SNIFF_LINES = 20
+
+# Integers that read back as the same text (no leading zeros, '+' or '-0'; within int64)
+_INTEGER_PATTERN = r'0|-?[1-9][0-9]{0,17}'
+
+# Rows parsed per chunk; only the projected columns of 'TBD' rows are kept between chunks
+CSV_CHUNK_ROWS = 50000
+
+# Total uncompressed size of the tabs of one upload
+MAX_DELIMITED_BYTES = 512 * 1024 * 1024
+TOO_LARGE_MESSAGE = f"The uploaded tabs exceed {MAX_DELIMITED_BYTES // (1024 * 1024)} MB uncompressed."
+
+
+class DelimitedInputError(Exception):
+    """Raised for delimited-text uploads that can't be read (the message is shown to the user)."""
+
+
+def delimited_source(source):
+    """
+    The DelimitedBundle for a workbook source given as a DelimitedBundle or the path of
+    a delimited-text upload, or None for anything else (an Excel workbook).
+    """
+    if isinstance(source, DelimitedBundle):
+        return source
+    if isinstance(source, (str, os.PathLike)) and is_delimited_name(os.fspath(source)):
+        return DelimitedBundle.open(source, os.fspath(source))
+    return None
+
+
+class DelimitedBundle:
+    """
+    The tabs of a delimited-text upload, read with pandas' C parser using the same
+    header rows as the Excel sheets. Holds each tab's (uncompressed) bytes and
+    delimiter, so it can be sent to worker processes like a workbook's raw bytes.
+    """
+
+    def __init__(self, tabs):
+        # Tab name -> (bytes, delimiter), in upload order
+        self.tabs = tabs
+
+    @property
+    def sheet_names(self):
+        return list(self.tabs)
+
+    @classmethod
+    def open(cls, source, filename):
+        """
+        Read an upload (path, bytes or binary file-like object) named filename.
+        Raises DelimitedInputError for unreadable archives and compressed streams.
+        """
+        data = _read_bytes(source)
+        name = os.path.basename(filename)
+        if data[:2] == GZIP_MAGIC:
+            data = _gunzip(data, name)
+            if name.lower().endswith(GZIP_EXTENSION):
+                name = name[:-len(GZIP_EXTENSION)]
+
+        if name.lower().endswith(BUNDLE_EXTENSION):
+            return cls(_zip_tabs(data))
+        return cls({_tab_name(name): (data, _delimiter(name, data))})
+
+    def digest(self):
+        """SHA-256 over the tab names and contents (for the columnar cache)."""
+        digest = hashlib.sha256()
+        for tab, (data, delimiter) in self.tabs.items():
+            digest.update(f"{tab}\0{delimiter}\0".encode('utf-8'))
+            digest.update(hashlib.sha256(data).digest())
+        return digest.hexdigest()
+
+    def read_frame(self, tab, header_row):
+        """The whole tab as a DataFrame, as ExcelFile.parse(tab, header=header_row) would return it."""
+        data, delimiter = self.tabs[tab]
+        # Read as text, so only lossless numbers are converted (see _convert_numeric)
+        return _convert_numeric(pd.read_csv(BytesIO(data), dtype=str, **_read_options(delimiter, header_row)))
+
+    def read_projected(self, tab, header_row, select, scenario_value='TBD', progress=NULL_PROGRESS):
+        """
+        Read a tab in chunks, keeping only the projected column positions of rows whose
+        separation scenario is scenario_value, like workbook.read_sheet_streaming.
+        select(header_columns) returns (positions, scenario_position); with no scenario
+        position every row is kept. Returns (DataFrame, cleaned header names).
+        """
+        data, delimiter = self.tabs[tab]
+        options = _read_options(delimiter, header_row)
+        columns = pd.read_csv(BytesIO(data), nrows=0, **options).columns.astype(str).str.strip().tolist()
+
+        positions, scenario_position = select(columns)
+        projected = [columns[position] for position in sorted(set(positions)) if position < len(columns)]
+        read_positions = sorted({columns.index(name) for name in projected} | (
+            {scenario_position} if scenario_position is not None else set()))
+
+        progress.start('parse')
+        kept = []
+        rows = 0
+        # Values are read as text (missing values as NaN), so every chunk has the same
+        # dtypes; numeric columns are converted once, over the rows kept
+        reader = pd.read_csv(BytesIO(data), usecols=read_positions, dtype=str, chunksize=CSV_CHUNK_ROWS, **options)
+        for chunk in reader:
+            rows += len(chunk)
+            chunk.columns = [columns[position] for position in read_positions]
+            if scenario_position is not None:
+                scenario = chunk[columns[scenario_position]]
+                chunk = chunk[scenario.str.strip().str.upper() == scenario_value]
+            kept.append(chunk[projected])
+            progress.update(rows)
+
+        df = pd.concat(kept) if kept else pd.DataFrame(columns=projected)
+        return _convert_numeric(df), columns
+
+
+def _read_options(delimiter, header_row):
+    # Blank lines count towards the header row, as blank rows do in a sheet
+    return {'sep': delimiter, 'header': header_row, 'skip_blank_lines': False,
+            'encoding': 'utf-8-sig', 'encoding_errors': 'replace', 'engine': 'c'}
+
+
+def _convert_numeric(df):
+    """
+    Numbers written as text become numbers again, as read_excel returns number cells,
+    where that loses nothing: only text that reads back as the same number converts.
+    Leading zeros, exponents, signs and padding ('00123', '1E5', '+7', ' 42') stay
+    text, as identifiers entered as text do in a workbook. Columns of numbers become
+    numeric, with whole floats as ints; columns mixing numbers and text hold both
+    (as objects).
+    """
+    for column in df.columns:
+        values = df[column]
+        if values.dtype.kind in 'iufb':
+            continue
+        integers = values.str.fullmatch(_INTEGER_PATTERN).fillna(False).astype(bool)
+        floats = pd.to_numeric(values.where(~integers), errors='coerce')
+        # Decimals as Python writes them back (e.g. '2.5', not '2.50' or '1e5')
+        decimals = floats.notna() & np.isfinite(floats) & (floats.astype(str) == values).fillna(False)
+        numbers = integers | decimals
+        if not numbers.any():
+            continue
+        if numbers.sum() == values.notna().sum():
+            if numbers.all() and not decimals.any():
+                df[column] = values.astype('int64')
+                continue
+            converted = floats.where(decimals, pd.to_numeric(values.where(integers), errors='coerce'))
+            if numbers.all() and (converted % 1 == 0).all():
+                converted = converted.astype('int64')
+            df[column] = converted
+        else:
+            mixed = values.astype(object)
+            mixed[integers] = [int(text) for text in values[integers].tolist()]
+            mixed[decimals] = [int(number) if number.is_integer() else number for number in floats[decimals].tolist()]
+            df[column] = mixed
+    return df
+
+
+def _read_bytes(source):
+    if isinstance(source, (bytes, bytearray)):
+        return bytes(source)
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as f:
+            return f.read()
+    if hasattr(source, 'getvalue'):
+        return source.getvalue()
+    source.seek(0)
+    return source.read()
+
+
+def _gunzip(data, name, limit=MAX_DELIMITED_BYTES):
+    """Decompress a gzip stream of at most limit bytes uncompressed."""
+    try:
+        with gzip.GzipFile(fileobj=BytesIO(data)) as f:
+            data = f.read(limit + 1)
+    except (OSError, EOFError) as e:
+        raise DelimitedInputError(f"Unable to decompress '{name}': {str(e)}")
+    if len(data) > limit:
+        raise DelimitedInputError(TOO_LARGE_MESSAGE)
+    return data
+
+
+def _zip_tabs(data):
+    """Tab name -> (bytes, delimiter) for the delimited-text files of a zip archive."""
+    try:
+        with zipfile.ZipFile(BytesIO(data)) as archive:
+            members = [info for info in archive.infolist()
+                       if not info.is_dir() and not info.filename.startswith('__MACOSX/')
+                       and is_delimited_name(info.filename) and not info.filename.lower().endswith(BUNDLE_EXTENSION)]
+            if sum(info.file_size for info in members) > MAX_DELIMITED_BYTES:
+                raise DelimitedInputError(TOO_LARGE_MESSAGE)
+
+            # Gzipped members count with their uncompressed size, against one total
+            tabs = {}
+            remaining = MAX_DELIMITED_BYTES
+            for info in members:
+                name = os.path.basename(info.filename)
+                content = archive.read(info)
+                if content[:2] == GZIP_MAGIC:
+                    content = _gunzip(content, name, remaining)
+                    name = name[:-len(GZIP_EXTENSION)] if name.lower().endswith(GZIP_EXTENSION) else name
+                remaining -= len(content)
+                if remaining < 0:
+                    raise DelimitedInputError(TOO_LARGE_MESSAGE)
+                tabs.setdefault(_tab_name(name), (content, _delimiter(name, content)))
+    except zipfile.BadZipFile as e:
+        raise DelimitedInputError(f"Unable to read the zip file: {str(e)}")
+
+    if not tabs:
+        raise DelimitedInputError("The zip file holds no .csv, .tsv or .txt files.")
+    return tabs
+
+
+def _tab_name(filename):
+    """The tab a file holds: its name without the extension (README-Glossary.csv -> README-Glossary)."""
+    return os.path.splitext(filename)[0].strip()
+
+
+def _delimiter(filename, data):
+    """Tab for .tsv files; otherwise the candidate occurring most often in the first lines."""
+    if filename.lower().endswith('.tsv'):
+        return '\t'
+    sample = b'\n'.join(data[:64 * 1024].splitlines()[:SNIFF_LINES])
+    counts = {delimiter: sample.count(delimiter.encode('ascii')) for delimiter in CANDIDATE_DELIMITERS}
+    return max(CANDIDATE_DELIMITERS, key=lambda delimiter: counts[delimiter])
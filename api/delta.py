@@ -0,0 +1,142 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from workbook import fill_na
+
+
+CHANGES_SHEET = 'Changes'
+
+# Change types in the "what changed" sheet
+NEW_FINDING = 'New finding'
+RESOLVED = 'Resolved'
+UPDATED = 'Updated'
+
+# Report fields kept per finding, so resolved findings can be listed without the old file
+_FIELDS = ['ban', 'sbg', 'app_name', 'server_id', 'sep_scenario']
+
+# The report layout with 'Change' in place of 'Category', plus the previous result
+CHANGE_COLUMNS = ['Business Application Number (BAN)', 'Change', 'SBG', 'Business Application Name',
+                  'Server ID / Name', 'Server-Level Separation Scenario', 'Columns Missing', 'Previously Missing']
+
+
+class RowIndex:
+    """
+    The findings of one Compute sheet: its 'TBD' rows with missing columns, keyed by
+    Server ID / Name and BAN (plus the occurrence number for duplicates), each with
+    its 'Columns Missing' result and the fields shown in the report.
+    """
+
+    def __init__(self, rows):
+        # rows: DataFrame indexed by key with 'missing' and the _FIELDS columns
+        self.rows = rows
+
+    def to_bytes(self):
+        # JSON rather than pickle: indexes may be kept in a shared temp directory
+        data = {'keys': self.rows.index.tolist()}
+        for column in ['missing'] + _FIELDS:
+            data[column] = self.rows[column].tolist()
+        return json.dumps(data, default=str).encode('utf-8')
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Raises ValueError for data to_bytes didn't produce (e.g. an index stored by an older version)."""
+        try:
+            data = json.loads(data)
+            columns = {column: data[column] for column in ['missing'] + _FIELDS}
+            keys = pd.Index(data['keys'], dtype=object)
+        except (KeyError, TypeError) as e:
+            raise ValueError(f"Not a stored row index: {str(e)}")
+        return cls(pd.DataFrame(columns, index=keys, dtype=object))
+
+
+class DeltaRun:
+    """
+    Delta validation of one upload against the RowIndex of a previous upload: every
+    row is validated as usual, then this upload's findings are recorded (index) and,
+    when there was a previous index, diffed against it (changes: the "what changed" rows).
+    Earlier results are not reused for unchanged rows: finding them takes the whole
+    sheet parsed and every row fingerprinted, which costs more than the vectorized
+    missing-column check it would skip, so a delta run costs a full run plus the diff.
+    """
+
+    def __init__(self, previous=None):
+        self.previous = previous
+        self.index = None
+        self.changes = None
+
+    def record(self, df_tbd, names):
+        """
+        Record the findings among the 'TBD' rows df_tbd (those with a 'Columns
+        Missing' value; df_tbd may be empty, without the column).
+        """
+        keys = row_keys(df_tbd, names)
+        if 'Columns Missing' in df_tbd:
+            found = df_tbd['Columns Missing'].notna().to_numpy()
+        else:
+            found = np.zeros(len(df_tbd), dtype=bool)
+        findings = df_tbd[found]
+
+        columns = {'missing': findings['Columns Missing'].to_numpy() if len(findings) else []}
+        for field in _FIELDS:
+            columns[field] = (fill_na(findings[names[field]], 'N/A').to_numpy() if names.get(field)
+                              else ['N/A'] * len(findings))
+        # Object columns, as RowIndex.from_bytes restores them
+        self.index = RowIndex(pd.DataFrame(columns, index=pd.Index(keys[found], dtype=object), dtype=object))
+        if self.previous is not None:
+            self.changes = changed_findings(self.previous, self.index)
+
+    def summary(self):
+        """Counts of the changed findings, for the report statistics."""
+        counts = self.changes['Change'].value_counts() if self.changes is not None else {}
+        return {
+            'new_findings': int(counts.get(NEW_FINDING, 0)),
+            'resolved': int(counts.get(RESOLVED, 0)),
+            'updated': int(counts.get(UPDATED, 0)),
+        }
+
+
+def row_keys(df, names):
+    """Server ID / Name + BAN of each row, numbered when the same pair occurs again."""
+    key = df[names['server_id']].astype(str) + '\x1f' + df[names['ban']].astype(str)
+    occurrence = key.groupby(key, sort=False).cumcount()
+    return (key + '\x1f' + occurrence.astype(str)).to_numpy()
+
+
+def changed_findings(previous, current):
+    """
+    Findings that differ between two RowIndexes: rows reported now but not before
+    (new finding), reported before but not now (resolved: fixed, no longer 'TBD' or
+    removed) and reported both times with different missing columns (updated).
+    """
+    old = previous.rows
+    new = current.rows
+
+    added = new[~new.index.isin(old.index)]
+    resolved = old[~old.index.isin(new.index)]
+    both = new.index.intersection(old.index)
+    updated = new.loc[both][new.loc[both, 'missing'].to_numpy() != old.loc[both, 'missing'].to_numpy()]
+
+    parts = [
+        _change_rows(NEW_FINDING, added, added['missing'], None),
+        _change_rows(RESOLVED, resolved, None, resolved['missing']),
+        _change_rows(UPDATED, updated, updated['missing'], old.loc[updated.index, 'missing']),
+    ]
+    return pd.concat(parts, ignore_index=True)
+
+
+def _change_rows(change, rows, missing, previously_missing):
+    def values(series):
+        return series.to_numpy() if series is not None else None
+
+    return pd.DataFrame({
+        'Business Application Number (BAN)': rows['ban'].to_numpy(),
+        'Change': change,
+        'SBG': rows['sbg'].to_numpy(),
+        'Business Application Name': rows['app_name'].to_numpy(),
+        'Server ID / Name': rows['server_id'].to_numpy(),
+        'Server-Level Separation Scenario': rows['sep_scenario'].to_numpy(),
+        'Columns Missing': values(missing),
+        'Previously Missing': values(previously_missing),
+    }, columns=CHANGE_COLUMNS)
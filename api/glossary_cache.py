@@ -0,0 +1,142 @@
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import zipfile
+from collections import OrderedDict
+
+from report_cache import private_directory
+from xlsx_reader import CellDecoder, UnsupportedSheetXML
+
+
+# Bump whenever the cached value (see ParsedWorkbook.load) changes shape or meaning
+GLOSSARY_CACHE_VERSION = 2
+
+# Shared by every process of this user, including validation worker processes
+GLOSSARY_CACHE_DIR = os.path.join(tempfile.gettempdir(), 'glossary-cache')
+GLOSSARY_CACHE_MAX_ENTRIES = 256
+
+# Cell values in sheet XML (<v>12</v>, also with a namespace prefix). Shared-string
+# cells hold the string's index here; other numbers are matched too, which only
+# adds unneeded (but deterministic) strings to the fingerprint.
+_VALUE_PATTERN = re.compile(rb'<(?:\w+:)?v>(\d+)</(?:\w+:)?v>')
+
+
+def sheet_fingerprint(source, sheet_name):
+    """
+    Content hash of a sheet of an xlsx source (a path or binary file-like object),
+    taken from its raw XML part and the shared strings it refers to, without parsing
+    the sheet's cells. Returns None when the sheet can't be read this way.
+    """
+    try:
+        with zipfile.ZipFile(source) as archive:
+            decoder, part = CellDecoder.for_sheet(archive, sheet_name)
+            xml = archive.read(part)
+    except (OSError, KeyError, zipfile.BadZipFile, UnsupportedSheetXML):
+        return None
+    strings = decoder.shared_strings
+
+    digest = hashlib.sha256(xml)
+    for match in _VALUE_PATTERN.finditer(xml):
+        idx = int(match.group(1))
+        digest.update(b'\x1f')
+        if idx < len(strings):
+            digest.update(str(strings[idx]).encode('utf-8', 'surrogatepass'))
+    return f"{digest.hexdigest()}-g{GLOSSARY_CACHE_VERSION}"
+
+
+class GlossaryCache:
+    """
+    Parsed README-Glossary sheets by content fingerprint: a bounded in-process LRU in
+    front of an on-disk JSON store, so worker processes (and later requests) reuse
+    a glossary any process has parsed. Values are (header, {tab: set of column names}
+    or None). Disk entries beyond max_entries are evicted oldest first; a missing,
+    full, read-only or not private directory just means no caching on disk.
+    """
+
+    SUFFIX = '.json'
+
+    def __init__(self, directory, max_entries):
+        self.directory = directory
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._private = None
+
+    def _on_disk(self):
+        # Checked once per process: only this user can replace the directory afterwards
+        if self._private is None:
+            self._private = private_directory(self.directory)
+        return self._private
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + self.SUFFIX)
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                return value
+
+        if not self._on_disk():
+            return None
+        try:
+            with open(self._path(key), encoding='utf-8') as f:
+                value = _decode(json.load(f))
+            # Mark as recently used
+            os.utime(self._path(key))
+        except (OSError, ValueError, TypeError, KeyError):
+            return None
+        self._remember(key, value)
+        return value
+
+    def put(self, key, value):
+        self._remember(key, value)
+        if not self._on_disk():
+            return
+        try:
+            tmp_path = f"{self._path(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(_encode(value), f)
+            os.replace(tmp_path, self._path(key))
+            self._evict()
+        except OSError:
+            pass
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _evict(self):
+        entries = [(entry.stat().st_mtime, entry.path) for entry in os.scandir(self.directory)
+                   if entry.name.endswith(self.SUFFIX)]
+        for _, path in sorted(entries)[:max(len(entries) - self.max_entries, 0)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def _encode(value):
+    header, columns = value
+    # Header names are only looked up by (string) name
+    return {
+        'header': [name if isinstance(name, str) else str(name) for name in header],
+        'columns': None if columns is None else {tab: sorted(names) for tab, names in columns.items()},
+    }
+
+
+def _decode(data):
+    columns = data['columns']
+    if columns is not None:
+        columns = {str(tab): set(map(str, names)) for tab, names in columns.items()}
+    return list(map(str, data['header'])), columns
+
+
+glossary_cache = GlossaryCache(GLOSSARY_CACHE_DIR, GLOSSARY_CACHE_MAX_ENTRIES)
@@ -0,0 +1,127 @@
+import json
+import os
+import time
+import tracemalloc
+
+
+# VALIDATION_TIMING=1 times each validation stage; VALIDATION_TIMING=memory also
+# traces Python allocations with tracemalloc (noticeably slower). Unset: disabled.
+TIMING_ENV = 'VALIDATION_TIMING'
+
+
+class StageTimer:
+    """
+    Wall time, CPU time, rows and memory of each stage of one validation.
+    Stages are recorded in the order they start, so nested stages (e.g. 'filter'
+    inside 'compute') follow their parent.
+    """
+
+    enabled = True
+
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.stages = []
+        self._started = time.perf_counter()
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def stage(self, name, rows=None):
+        """Context manager timing one stage; set record['rows'] inside it if known later."""
+        return _Stage(self, name, rows)
+
+    def server_timing(self):
+        """Server-Timing header value: one metric per stage (milliseconds), then the total."""
+        metrics = []
+        for record in self.stages:
+            metric = f"{record['name']};dur={record['wall_ms']}"
+            if record['rows'] is not None:
+                metric += f';desc="{record["rows"]} rows"'
+            metrics.append(metric)
+        metrics.append(f"total;dur={self.total_ms()}")
+        return ', '.join(metrics)
+
+    def total_ms(self):
+        return round((time.perf_counter() - self._started) * 1000, 1)
+
+    def finish(self, response, **fields):
+        """Add the Server-Timing header to a Flask response and log the stages as one JSON line."""
+        response.headers['Server-Timing'] = self.server_timing()
+        print(json.dumps({'event': 'validation_timing', **fields, 'total_ms': self.total_ms(),
+                          'stages': self.stages}, default=str), flush=True)
+        return response
+
+
+class _Stage:
+    __slots__ = ('timer', 'record', '_wall', '_cpu', '_rss', '_traced')
+
+    def __init__(self, timer, name, rows):
+        self.timer = timer
+        self.record = {'name': name, 'rows': rows}
+
+    def __enter__(self):
+        self.timer.stages.append(self.record)
+        self._rss = _current_rss_kb()
+        if self.timer.trace_memory:
+            tracemalloc.reset_peak()
+            self._traced = tracemalloc.get_traced_memory()[0]
+        self._cpu = time.process_time()
+        self._wall = time.perf_counter()
+        return self.record
+
+    def __exit__(self, exc_type, exc, tb):
+        record = self.record
+        record['wall_ms'] = round((time.perf_counter() - self._wall) * 1000, 1)
+        # CPU time of the whole process (all threads)
+        record['cpu_ms'] = round((time.process_time() - self._cpu) * 1000, 1)
+        rss = _current_rss_kb()
+        if rss is not None and self._rss is not None:
+            record['rss_delta_kb'] = rss - self._rss
+        if self.timer.trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            record['alloc_delta_kb'] = (current - self._traced) // 1024
+            record['alloc_peak_kb'] = (peak - self._traced) // 1024
+        return False
+
+
+class _NullTimer:
+    """Stand-in used when timing is disabled: every call is a no-op."""
+
+    enabled = False
+
+    def stage(self, name, rows=None):
+        return _NULL_STAGE
+
+    def finish(self, response, **fields):
+        return response
+
+
+class _NullStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        # Writes to the record (e.g. rows) are discarded
+        return {}
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NULL_TIMER = _NullTimer()
+_NULL_STAGE = _NullStage()
+
+
+def timer_from_env():
+    """A StageTimer if VALIDATION_TIMING is set, otherwise the no-op NULL_TIMER."""
+    setting = os.environ.get(TIMING_ENV, '').strip().lower()
+    if setting in ('', '0', 'false', 'off', 'no'):
+        return NULL_TIMER
+    return StageTimer(trace_memory=(setting == 'memory'))
+
+
+def _current_rss_kb():
+    """Current resident set size in KB (Linux only; None elsewhere)."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') // 1024
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
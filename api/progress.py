@@ -0,0 +1,70 @@
+import time
+
+
+# Share of the whole validation (percent range) each stage accounts for, in order
+STAGE_PROGRESS = {
+    'parse': (0, 40),
+    'validate': (40, 55),
+    'write': (55, 90),
+    'format': (55, 90),
+    'save': (90, 98),
+    'statistics': (98, 100),
+}
+
+# Progress callbacks fire at most this often within a stage (a new stage always reports)
+PROGRESS_INTERVAL_SECONDS = 0.25
+
+# Row loops only report every this many rows, so a disabled or throttled reporter
+# costs them one modulo per row
+PROGRESS_STRIDE = 512
+
+
+class ProgressReporter:
+    """
+    Stage-level progress of one validation, reported to callback(stage, done, total,
+    percent); total is None when the stage's size isn't known up front. start() always
+    reports; update() reports at most every interval seconds.
+    """
+
+    enabled = True
+
+    def __init__(self, callback, interval=PROGRESS_INTERVAL_SECONDS):
+        self.callback = callback
+        self.interval = interval
+        self.stage = None
+        self.total = None
+        self._reported_at = 0
+
+    def start(self, stage, total=None):
+        self.stage = stage
+        self.total = total
+        self._report(0)
+
+    def update(self, done):
+        if time.monotonic() - self._reported_at >= self.interval:
+            self._report(done)
+
+    def percent(self, done):
+        low, high = STAGE_PROGRESS.get(self.stage, (0, 100))
+        if not self.total:
+            return low
+        return low + (high - low) * min(done, self.total) // self.total
+
+    def _report(self, done):
+        self._reported_at = time.monotonic()
+        self.callback(self.stage, done, self.total, self.percent(done))
+
+
+class _NullProgress:
+    """Stand-in used when nobody listens: every call is a no-op."""
+
+    enabled = False
+
+    def start(self, stage, total=None):
+        pass
+
+    def update(self, done):
+        pass
+
+
+NULL_PROGRESS = _NullProgress()
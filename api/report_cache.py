@@ -0,0 +1,237 @@
+import hashlib
+import json
+import os
+import re
+import stat
+import threading
+from collections import OrderedDict
+
+
+def private_directory(path):
+    """
+    Create the directory path (mode 0700) unless it exists, and check that it is a
+    directory owned by this user that no one else can write to: cache files in the
+    shared temp directory must not be planted by another user.
+    Returns False when it can't be used.
+    """
+    try:
+        os.makedirs(path, mode=0o700, exist_ok=True)
+        st = os.lstat(path)
+    except OSError:
+        return False
+    if not stat.S_ISDIR(st.st_mode):
+        return False
+    # No owners or modes to check on Windows, whose temp directory is per user
+    if hasattr(os, 'getuid') and (st.st_uid != os.getuid() or st.st_mode & 0o077):
+        return False
+    return True
+
+
+def upload_digest(data):
+    """SHA-256 hex digest of the uploaded bytes."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def file_digest(path, chunk_size=1024 * 1024):
+    """SHA-256 hex digest of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def delimited_upload_digest(digest, filename):
+    """
+    Digest of a delimited-text upload for the caches: its content hash (digest) mixed
+    with its file name, which decides how the bytes are read (a .csv file is the tab
+    it is named after). The same bytes uploaded as a workbook, or under another name,
+    are different entries.
+    """
+    return hashlib.sha256(f"{digest}\0{os.path.basename(filename)}".encode('utf-8')).hexdigest()
+
+
+# Bump whenever a change to the validation rules or the report layout means
+# previously generated (cached) reports are no longer valid
+VALIDATION_RULES_VERSION = 3
+
+# sha256 hex digest plus the rules version, e.g. "3f2a...-r2", and for delta
+# reports a hash of the previous report id, e.g. "3f2a...-r2-d9c1e0b7a4f25"
+_REPORT_KEY_PATTERN = re.compile(r'^[0-9a-f]{64}-r[0-9]+(-d[0-9a-f]{12})?$')
+
+
+def report_cache_key(digest, rules_version):
+    """Cache key for a report: the upload's content hash plus the validation rules version."""
+    return f"{digest}-r{rules_version}"
+
+
+def delta_cache_key(key, previous_key):
+    """Cache key for a delta report: the upload's key plus a hash of the previous report's key."""
+    return f"{key}-d{hashlib.sha256(previous_key.encode('utf-8')).hexdigest()[:12]}"
+
+
+def is_report_cache_key(key):
+    """Whether key (e.g. a report id taken from a URL) has the form report_cache_key produces."""
+    return bool(key) and _REPORT_KEY_PATTERN.match(key) is not None
+
+
+class MemoryCacheBackend:
+    """In-process LRU store bounded by the total size of the cached reports."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def get_stats(self, key):
+        entry = self.get(key)
+        return entry[1] if entry is not None else None
+
+    def put(self, key, report_bytes, stats):
+        size = len(report_bytes)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= len(old[0])
+            self._entries[key] = (report_bytes, stats)
+            self._size += size
+            # Evict least recently used entries
+            while self._size > self.max_bytes:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+
+class DiskCacheBackend:
+    """
+    On-disk LRU store (e.g. under /tmp on a serverless instance).
+    Each entry is a report file plus a JSON stats file; file mtimes track recency.
+    A directory that can't be created, or that another user could write to (see
+    private_directory), just means no caching: nothing planted there is served.
+    """
+
+    REPORT_SUFFIX = '.report'
+    STATS_SUFFIX = '.stats.json'
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._private = None
+
+    def _usable(self):
+        # Checked once per process: only this user can replace the directory afterwards
+        if self._private is None:
+            self._private = private_directory(self.directory)
+        return self._private
+
+    def _paths(self, key):
+        base = os.path.join(self.directory, key)
+        return base + self.REPORT_SUFFIX, base + self.STATS_SUFFIX
+
+    def get(self, key):
+        if not self._usable():
+            return None
+        report_path, stats_path = self._paths(key)
+        try:
+            with open(report_path, 'rb') as f:
+                report_bytes = f.read()
+            with open(stats_path, 'r') as f:
+                stats = json.load(f)
+            # Mark as recently used
+            os.utime(report_path)
+        except (OSError, ValueError):
+            return None
+        return report_bytes, stats
+
+    def get_stats(self, key):
+        # Only the small stats file is read
+        if not self._usable():
+            return None
+        report_path, stats_path = self._paths(key)
+        if not os.path.exists(report_path):
+            return None
+        try:
+            with open(stats_path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key, report_bytes, stats):
+        if len(report_bytes) > self.max_bytes or not self._usable():
+            return
+        report_path, stats_path = self._paths(key)
+        with self._lock:
+            try:
+                # Write the stats first and the report last: an entry only counts once its report exists
+                _write_atomic(stats_path, json.dumps(stats).encode('utf-8'))
+                _write_atomic(report_path, report_bytes)
+                self._evict()
+            except OSError:
+                pass  # A full or read-only disk just means no caching
+
+    def _evict(self):
+        entries = []
+        total = 0
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(self.REPORT_SUFFIX):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, entry.name[:-len(self.REPORT_SUFFIX)], stat.st_size))
+                total += stat.st_size
+
+        # Oldest first
+        for _, key, size in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            for path in self._paths(key):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            total -= size
+
+
+def _write_atomic(path, data):
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+class ReportCache:
+    """
+    Content-addressed cache of generated reports and their statistics.
+    The backend decides where entries live; hit/miss counts are kept for monitoring.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Return (report_bytes, stats) or None."""
+        entry = self.backend.get(key)
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return entry
+
+    def get_stats(self, key):
+        """Return the statistics of a cached report, or None. Not counted as a hit or miss."""
+        if not is_report_cache_key(key):
+            return None
+        return self.backend.get_stats(key)
+
+    def put(self, key, report_bytes, stats):
+        self.backend.put(key, report_bytes, stats)
@@ -0,0 +1,147 @@
+import csv
+import importlib.util
+from io import StringIO
+
+
+# Report outputs: the styled workbook, or the report rows streamed as they are
+# encoded (no openpyxl, no formatting) for scripts that only want the data.
+# Format name -> (media type, file extension)
+REPORT_FORMATS = {
+    'xlsx': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', '.xlsx'),
+    'csv': ('text/csv', '.csv'),
+    'ndjson': ('application/x-ndjson', '.ndjson'),
+    'parquet': ('application/vnd.apache.parquet', '.parquet'),
+}
+DEFAULT_REPORT_FORMAT = 'xlsx'
+DEFAULT_REPORT_MEDIA_TYPE = REPORT_FORMATS[DEFAULT_REPORT_FORMAT][0]
+STREAMING_FORMATS = ('csv', 'ndjson', 'parquet')
+
+# Other names accepted for ?format= and in the Accept header
+FORMAT_ALIASES = {
+    'jsonl': 'ndjson',
+    'application/ndjson': 'ndjson',
+    'application/jsonl': 'ndjson',
+    'application/x-parquet': 'parquet',
+}
+
+# Report rows encoded per chunk of the response body
+STREAM_CHUNK_ROWS = 2000
+
+
+def parquet_available():
+    """Parquet output needs pyarrow, an optional dependency."""
+    return importlib.util.find_spec('pyarrow') is not None
+
+
+def parse_report_format(args, accept):
+    """
+    The report format asked for by ?format= or, without it, the Accept header (a
+    werkzeug MIMEAccept); anything else (e.g. */*) gets the styled workbook.
+    Raises ValueError with a user-facing message.
+    """
+    fmt = args.get('format')
+    if not fmt:
+        # The workbook is listed first, so it wins whenever the client accepts anything
+        media_types = {media_type: name for name, (media_type, _) in REPORT_FORMATS.items()}
+        media_types.update((alias, name) for alias, name in FORMAT_ALIASES.items() if '/' in alias)
+        if not parquet_available():
+            media_types = {media_type: name for media_type, name in media_types.items() if name != 'parquet'}
+        return media_types[accept.best_match(list(media_types), DEFAULT_REPORT_MEDIA_TYPE)]
+
+    fmt = FORMAT_ALIASES.get(fmt.lower(), fmt.lower())
+    if fmt not in REPORT_FORMATS:
+        raise ValueError(f"Unknown format '{args.get('format')}'. Use one of: {', '.join(REPORT_FORMATS)}")
+    if fmt == 'parquet' and not parquet_available():
+        raise ValueError("Parquet output needs pyarrow, which is not installed on this server. "
+                         "Use format=csv or format=ndjson instead.")
+    return fmt
+
+
+def report_download_name(fmt, stem='Compute_Validation_Report'):
+    return stem + REPORT_FORMATS[fmt][1]
+
+
+def encode_report(reports, fmt, chunk_rows=STREAM_CHUNK_ROWS):
+    """
+    Yield the rows of [(category, report DataFrame), ...] encoded as fmt ('csv',
+    'ndjson' or 'parquet'), chunk_rows rows at a time. The sheets' rows follow one
+    another (each row already names its Category); columns only some sheets have
+    are left empty in the others.
+    """
+    columns = []
+    for _, df in reports:
+        columns.extend(str(name) for name in df.columns if str(name) not in columns)
+    frames = [df.set_axis([str(name) for name in df.columns], axis=1).reindex(columns=columns) for _, df in reports]
+
+    if fmt == 'csv':
+        header = StringIO()
+        csv.writer(header, lineterminator='\r\n').writerow(columns)
+        yield header.getvalue()
+        for chunk in _chunks(frames, chunk_rows):
+            yield chunk.to_csv(header=False, index=False, lineterminator='\r\n')
+    elif fmt == 'ndjson':
+        for chunk in _chunks(frames, chunk_rows):
+            yield chunk.to_json(orient='records', lines=True, date_format='iso', force_ascii=False).rstrip('\n') + '\n'
+    elif fmt == 'parquet':
+        yield from _encode_parquet(frames, columns, chunk_rows)
+    else:
+        raise ValueError(f"'{fmt}' is not a streaming report format")
+
+
+def _chunks(frames, chunk_rows):
+    for df in frames:
+        for start in range(0, len(df), chunk_rows):
+            yield df.iloc[start:start + chunk_rows]
+
+
+def _encode_parquet(frames, columns, chunk_rows):
+    """One row group per chunk, each sent as soon as it is written."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    # Report values are text (IDs can mix numbers and text): every column is a string column
+    schema = pa.schema([(name, pa.string()) for name in columns])
+    sink = _StreamSink()
+    writer = pq.ParquetWriter(sink, schema)
+    for chunk in _chunks(frames, chunk_rows):
+        values = chunk.astype(object).where(chunk.notna(), None).astype('string')
+        writer.write_table(pa.Table.from_pandas(values, schema=schema, preserve_index=False))
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+class _StreamSink:
+    """
+    Write-only file for the Parquet writer: drain() hands over what was written since
+    the last call, while tell() keeps counting from the start of the file (the footer
+    records row group offsets).
+    """
+
+    closed = False
+
+    def __init__(self):
+        self.parts = []
+        self.position = 0
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def writable(self):
+        return True
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b''.join(self.parts)
+        self.parts = []
+        return data
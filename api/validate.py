@@ -1,58 +1,87 @@
 from flask import Flask, request, send_file, jsonify
 import os
-import uuid
-import pandas as pd
 import tempfile
-import json
 from io import BytesIO
-from validator import generate_validation_report
+from report_cache import (ReportCache, DiskCacheBackend, report_cache_key, delta_cache_key, is_report_cache_key,
+                          delimited_upload_digest, VALIDATION_RULES_VERSION)
+from report_stats import stats_header, parse_stats_args, stats_page, encode_stats
+from report_formats import parse_report_format, report_download_name, REPORT_FORMATS, STREAMING_FORMATS
+from instrumentation import timer_from_env
+from upload import UploadRequest, MAX_REQUEST_BYTES, UPLOAD_TOO_LARGE_MESSAGE
+from upload_types import is_delimited_name, upload_name_error
+
+# pandas, numpy and openpyxl are imported only when a report has to be generated
+# (see validate()): health checks, preflights and cache hits on a cold serverless
+# instance don't pay for them. benchmarks/bench_startup.py guards this.
 
 # Create Flask app for Vercel WSGI
 app = Flask(__name__)
+# Uploads are hashed and size-checked as they are received (see upload.py)
+app.request_class = UploadRequest
+app.config['MAX_CONTENT_LENGTH'] = MAX_REQUEST_BYTES
+
+# Reports already generated for identical uploads; /tmp survives between
+# invocations of a warm serverless instance
+REPORT_CACHE_DIR = os.path.join(tempfile.gettempdir(), 'report-cache')
+REPORT_CACHE_MAX_BYTES = 128 * 1024 * 1024
+report_cache = ReportCache(DiskCacheBackend(REPORT_CACHE_DIR, REPORT_CACHE_MAX_BYTES))
+
+# Findings of each generated report, by report id: ?previous=<report id> lists
+# how a new upload's findings differ from them (delta mode, see delta.py)
+ROW_INDEX_DIR = os.path.join(tempfile.gettempdir(), 'row-index')
+ROW_INDEX_MAX_BYTES = 64 * 1024 * 1024
+row_indexes = DiskCacheBackend(ROW_INDEX_DIR, ROW_INDEX_MAX_BYTES)
 
 
-def validate_file_structure(file_bytes):
-    """Validate that the uploaded Excel file has the required structure
+def report_response(report_bytes, stats, report_id=None):
+    """
+    Send the in-memory report with summary statistics in the response header.
+    The BAN breakdown is paged through GET /api/validate?report_id=... (X-Report-Stats-Url).
+    """
+    response = send_file(
+        BytesIO(report_bytes),
+        as_attachment=True,
+        download_name='Compute_Validation_Report.xlsx',
+        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    )
     
-    Args:
-        file_bytes: BytesIO object containing the file data (in memory)
+    # Add statistics as response header
+    if stats:
+        response.headers['X-Report-Stats'] = stats_header(stats)
+        if report_id:
+            response.headers['X-Report-Stats-Url'] = f"/api/validate?report_id={report_id}"
+    
+    return response
+
+
+def stream_response(chunks, stats, fmt):
+    """Send report rows as they are encoded, with summary statistics in the response header."""
+    response = app.response_class(chunks, mimetype=REPORT_FORMATS[fmt][0])
+    response.headers['Content-Disposition'] = f'attachment; filename={report_download_name(fmt)}'
+    if stats:
+        response.headers['X-Report-Stats'] = stats_header(stats)
+    return response
+
+
+def stats_response():
+    """
+    Full statistics of a cached report.
+    ?offset=&limit= page through ban_breakdown, ?format=columnar returns it as
+    parallel arrays, and the body is gzipped when the client accepts it.
     """
     try:
-        # Read Excel file from memory (no disk I/O needed)
-        excel_file = pd.ExcelFile(file_bytes)
-        sheet_names = excel_file.sheet_names
-        
-        required_sheets = ['README-Glossary', 'Compute']
-        missing_sheets = [sheet for sheet in required_sheets if sheet not in sheet_names]
-        
-        if missing_sheets:
-            return f"Invalid file structure. Missing required sheet(s): {', '.join(missing_sheets)}. Please upload the correct Combined Data File."
-        
-        try:
-            # Read from memory, no disk access
-            file_bytes.seek(0)  # Reset pointer to start
-            df_glossary = pd.read_excel(file_bytes, sheet_name='README-Glossary', header=6)
-            required_glossary_columns = ['Tab Name', 'Column Name']
-            missing_cols = [col for col in required_glossary_columns if col not in df_glossary.columns]
-            
-            if missing_cols:
-                return f"Invalid 'README-Glossary' sheet structure. Missing column(s): {', '.join(missing_cols)}. Please upload the correct file."
-        except Exception as e:
-            return f"Error reading 'README-Glossary' sheet. Please ensure the file format is correct. Header should be at row 7."
-        
-        try:
-            # Read from memory, no disk access
-            file_bytes.seek(0)  # Reset pointer to start
-            df_compute = pd.read_excel(file_bytes, sheet_name='Compute', header=5)
-            
-            if len(df_compute.columns) < 24:
-                return f"Invalid 'Compute' sheet structure. Expected at least 24 columns, found {len(df_compute.columns)}. Please upload the correct file."
-        except Exception as e:
-            return f"Error reading 'Compute' sheet. Please ensure the file format is correct. Header should be at row 6."
-        
-        return None
-    except Exception as e:
-        return f"Unable to read the Excel file. Please ensure it's a valid Excel file (.xlsx or .xls). Error: {str(e)}"
+        offset, limit, fmt = parse_stats_args(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    stats = report_cache.get_stats(request.args['report_id'])
+    if stats is None:
+        return jsonify({"error": "Unknown or expired report id"}), 404
+
+    payload, headers = encode_stats(stats_page(stats, offset, limit, fmt), request.headers.get('Accept-Encoding'))
+    response = app.response_class(payload, mimetype='application/json')
+    response.headers.update(headers)
+    return response
 
 
 @app.route('/', methods=['GET', 'POST', 'OPTIONS'])
@@ -63,6 +92,10 @@ def validate():
         response = jsonify({"status": "ok"})
         return response, 204
     
+    # Handle statistics of a generated report
+    if request.method == 'GET' and request.args.get('report_id'):
+        return stats_response()
+
     # Handle health check
     if request.method == 'GET':
         return jsonify({"status": "ok", "message": "Excel Validator API"}), 200
@@ -75,72 +108,104 @@ def validate():
     if file.filename == '':
         return jsonify({"error": "No selected file"}), 400
 
-    # Validate file extension
-    allowed_extensions = {'.xlsx', '.xls'}
-    file_ext = os.path.splitext(file.filename)[1].lower()
-    if file_ext not in allowed_extensions:
-        return jsonify({"error": "Invalid file format. Please upload an Excel file (.xlsx or .xls)"}), 400
+    # Validate file extension: an Excel workbook or a zip of one CSV file per tab
+    name_error = upload_name_error(file.filename)
+    if name_error:
+        return jsonify({"error": name_error}), 400
+    delimited = is_delimited_name(file.filename)
 
+    # Report format: the formatted workbook, or rows streamed as csv, ndjson or parquet
     try:
-        # ✅ KEY FIX: Load file into memory (BytesIO) instead of disk
-        file_bytes = BytesIO(file.read())
+        report_format = parse_report_format(request.args, request.accept_mimetypes)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # Delta mode: validate against the row index of an earlier report of the same workbook
+    previous_id = request.args.get('previous')
+    previous_entry = None
+    if previous_id:
+        previous_entry = row_indexes.get(previous_id) if is_report_cache_key(previous_id) else None
+        if previous_entry is None:
+            return jsonify({"error": "Unknown or expired previous report id"}), 404
+        if report_format in STREAMING_FORMATS:
+            return jsonify({"error": "Delta reports (?previous=) are only available as xlsx"}), 400
+
+    try:
+        # ✅ KEY FIX: The upload is received into memory (a SpooledUpload, hashed as
+        # it arrives) instead of disk; only very large files spill to a temp file
+        upload = file.stream
+        # Per-stage timing (Server-Timing header + log line) when VALIDATION_TIMING is set
+        timer = timer_from_env()
+        log_fields = {'endpoint': '/api/validate', 'upload_bytes': upload.size}
+
+        # Identical uploads (and rules, and previous report) produce identical reports
+        digest = upload.digest
+        if delimited:
+            digest = delimited_upload_digest(digest, file.filename)
+        cache_key = report_cache_key(digest, VALIDATION_RULES_VERSION)
+        if previous_id:
+            cache_key = delta_cache_key(cache_key, previous_id)
+        with timer.stage('cache_lookup'):
+            # Only the workbook is cached; streamed formats are encoded for each request
+            cached = report_cache.get(cache_key) if report_format not in STREAMING_FORMATS else None
+        if cached is not None:
+            return timer.finish(report_response(*cached, report_id=cache_key), cache='hit', **log_fields)
         
+        # Cache miss: load the validation modules (pandas, openpyxl) now
+        with timer.stage('imports'):
+            from validator import generate_report_bytes, generate_report_stream
+            from workbook import validate_file_structure
+            from columnar_cache import load_workbook
+            from delta import DeltaRun, RowIndex
+            from csv_reader import DelimitedBundle, DelimitedInputError
+
+        # Parse the workbook once from memory; the same frames are used for the
+        # structure check and for report generation
+        with timer.stage('parse') as stage:
+            source = upload.source()
+            if delimited:
+                try:
+                    source = DelimitedBundle.open(source, file.filename)
+                except DelimitedInputError as e:
+                    return jsonify({"error": str(e)}), 400
+            workbook = load_workbook(source, digest)
+            stage['rows'] = len(workbook.compute) if workbook.compute is not None else 0
+
         # Validate file structure using in-memory data
-        validation_error = validate_file_structure(file_bytes)
+        with timer.stage('structure'):
+            validation_error = validate_file_structure(workbook)
         if validation_error:
-            return jsonify({"error": validation_error}), 400
+            return timer.finish(jsonify({"error": validation_error}), cache='miss', status=400, **log_fields), 400
 
-        # ✅ Reset pointer and prepare for processing
-        file_bytes.seek(0)
-        
-        # Run validation logic with in-memory file
-        # Convert to temporary file only if validator requires file path
-        temp_dir = tempfile.gettempdir()
-        unique_id = str(uuid.uuid4())
-        input_filename = f"{unique_id}_{file.filename}"
-        input_path = os.path.join(temp_dir, input_filename)
-        output_filename = f"Report_{unique_id}.xlsx"
-        output_path = os.path.join(temp_dir, output_filename)
-        
-        # Save to temp directory temporarily for processing
-        file_bytes.seek(0)
-        with open(input_path, 'wb') as f:
-            f.write(file_bytes.read())
-        
-        success, message, stats = generate_validation_report(input_path, output_path)
+        # Streamed formats: no workbook is written; rows are encoded as the response is sent
+        if report_format in STREAMING_FORMATS:
+            success, message, stats, chunks = generate_report_stream(workbook, report_format, timer=timer)
+            if not success:
+                return timer.finish(jsonify({"error": message}), cache='miss', status=500, **log_fields), 500
+            return timer.finish(stream_response(chunks, stats, report_format), cache='miss', **log_fields)
+
+        # The report is written to memory: no temp files to write, read back or clean up
+        try:
+            delta = DeltaRun(RowIndex.from_bytes(previous_entry[0]) if previous_entry else None)
+        except ValueError:
+            return jsonify({"error": "Unknown or expired previous report id"}), 404
+        success, message, stats, report_bytes = generate_report_bytes(workbook, timer=timer, delta=delta)
 
         if success:
-            # ✅ Load output into memory and return
-            with open(output_path, 'rb') as f:
-                output_bytes = BytesIO(f.read())
-            
-            output_bytes.seek(0)
-            response = send_file(
-                output_bytes,
-                as_attachment=True,
-                download_name='Compute_Validation_Report.xlsx',
-                mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-            )
-            
-            # Add statistics as response header
-            if stats:
-                response.headers['X-Report-Stats'] = json.dumps(stats)
-            
-            return response
+            report_cache.put(cache_key, report_bytes, stats)
+            if delta.index is not None:
+                row_indexes.put(cache_key, delta.index.to_bytes(), None)
+            return timer.finish(report_response(report_bytes, stats, report_id=cache_key), cache='miss', **log_fields)
         else:
-            return jsonify({"error": message}), 500
+            return timer.finish(jsonify({"error": message}), cache='miss', status=500, **log_fields), 500
 
     except Exception as e:
         return jsonify({"error": f"Processing error: {str(e)}"}), 500
-    finally:
-        # Cleanup temp files - only disk cleanup needed now
-        temp_dir = tempfile.gettempdir()
-        for filename in os.listdir(temp_dir):
-            if filename.startswith(unique_id):
-                try:
-                    os.remove(os.path.join(temp_dir, filename))
-                except:
-                    pass  # Ignore cleanup errors
+
+
+@app.errorhandler(413)
+def upload_too_large(e):
+    return jsonify({"error": UPLOAD_TOO_LARGE_MESSAGE}), 413
 
 
 @app.after_request
@@ -149,5 +214,5 @@ def after_request(response):
     response.headers['Access-Control-Allow-Origin'] = '*'
     response.headers['Access-Control-Allow-Methods'] = 'GET, POST, OPTIONS'
     response.headers['Access-Control-Allow-Headers'] = 'Content-Type'
-    response.headers['Access-Control-Expose-Headers'] = 'X-Report-Stats'
+    response.headers['Access-Control-Expose-Headers'] = 'X-Report-Stats, X-Report-Stats-Url, Server-Timing'
     return response
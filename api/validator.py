@@ -1,110 +1,80 @@
 import pandas as pd
-import os
 import numpy as np
-from openpyxl import load_workbook
-from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
-from openpyxl.utils import get_column_letter
+from io import BytesIO
+from report_writer import write_reports, report_styles, COLUMN_WIDTHS
+from workbook import ParsedWorkbook, read_tab, categorize, fill_na, COMPUTE_SHEET, DEFAULT_READER
+from columnar_cache import load_workbook
+from column_index import column_index_for, TAB_TEMPLATE
+from instrumentation import NULL_TIMER
+from progress import NULL_PROGRESS, PROGRESS_STRIDE
+from worker_pool import shared_pool, worker_count, POOL_ERRORS
+from delta import CHANGES_SHEET
+from report_formats import encode_report
+from report_stats import normalize_stats
+# Defined with the report cache so the cache can be checked without importing pandas
+from report_cache import VALIDATION_RULES_VERSION
 
 
-def generate_validation_report(input_path, output_path):
+def generate_validation_report(input_path, output_path, max_workers=None, timer=None, delta=None,
+                               progress=NULL_PROGRESS):
     """
-    Optimized version: Reads the input Excel file, validates 'Compute' tab against 'README-Glossary',
-    and saves the report to output_path using vectorized operations.
+    Optimized version: Reads the input Excel file, validates every tab described in
+    'README-Glossary' ('Compute' plus e.g. Storage, Network, Database) against its glossary
+    columns, and saves one report sheet per category to output_path using vectorized operations.
+
+    input_path may be a path, the upload's bytes or a binary file-like object, or a
+    ParsedWorkbook that was already loaded (and structure-checked) for this request,
+    in which case the workbook is not parsed again. output_path may be a path or any
+    writable binary stream.
+    Tabs other than Compute are parsed and validated concurrently in the shared worker
+    pool (see worker_pool.py) while Compute is validated in this process; with
+    max_workers=1, or inside a worker process, they are validated here afterwards.
+    timer (an instrumentation.StageTimer) records the duration and memory of each stage.
+    delta (a delta.DeltaRun) compares Compute's findings with those of a previous upload:
+    a 'Changes' sheet listing new, resolved and updated findings is added after the
+    report sheets.
+    progress (a progress.ProgressReporter) is told of each stage as it starts: 'parse'
+    (Compute rows read), 'validate' (tabs validated), 'write' (report rows written),
+    'save' and 'statistics', with throttled updates within the long ones.
     """
+    timer = timer or NULL_TIMER
     try:
-        # 1. Load README-Glossary with only required columns
-        df_glossary = pd.read_excel(
-            input_path, 
-            sheet_name='README-Glossary', 
-            header=6,
-            usecols=['Tab Name', 'Column Name']
-        )
-
-        # Clean Glossary Data
-        df_glossary['Tab Name'] = df_glossary['Tab Name'].astype(str).str.strip()
-        df_glossary['Column Name'] = df_glossary['Column Name'].astype(str).str.strip()
+        # 1. Parse the workbook once (README-Glossary and Compute)
+        if isinstance(input_path, ParsedWorkbook):
+            workbook = input_path
+        else:
+            with timer.stage('parse') as stage:
+                workbook = load_workbook(input_path, progress=progress)
+                stage['rows'] = len(workbook.compute) if workbook.compute is not None else 0
+        problem = workbook.check_structure()
+        if problem:
+            return False, problem[1], None
 
-        # Get valid columns for 'Compute' tab as a set for O(1) lookup
-        valid_compute_columns = set(
-            df_glossary.loc[df_glossary['Tab Name'] == 'Compute', 'Column Name'].values
-        )
+        # Valid columns of each tab described in the glossary (built, or found in the
+        # glossary cache, when the workbook was parsed)
+        glossary_columns = workbook.glossary_columns
 
-        # 2. Load only necessary columns from Compute Sheet
-        df_compute = pd.read_excel(input_path, sheet_name='Compute', header=5)
+        # 2-6. Validate Compute here and the other tabs in worker processes
+        reports, compute_message = build_reports(workbook, glossary_columns, max_workers, timer, delta, progress)
 
-        # Clean column names once
-        df_compute.columns = df_compute.columns.astype(str).str.strip()
+        # Without any findings, report why Compute produced none
+        if not reports:
+            return False, compute_message, None
 
-        # 3. Get column indices and names
-        columns = df_compute.columns.tolist()
-        
-        # Column indices (ensure they exist)
-        if len(columns) <= 23:
-            return False, "Compute sheet doesn't have enough columns.", None
-        
-        # Define column positions
-        idx_sbg = 2
-        idx_ban = 3
-        idx_app_name = 4
-        idx_server_id = 13
-        idx_sep_scenario = 17
-        target_indices = [18, 19, 20, 21, 22, 23]
-
-        # Get column names for target indices
-        target_columns = [columns[i] for i in target_indices if i < len(columns)]
-        
-        # Filter target columns that exist in glossary
-        valid_target_columns = [col for col in target_columns if col in valid_compute_columns]
-        
-        if not valid_target_columns:
-            return False, "No valid target columns found in glossary.", None
-
-        # 4. Vectorized filtering: Get rows where separation scenario is "TBD"
-        sep_col_name = columns[idx_sep_scenario]
-        mask_tbd = df_compute[sep_col_name].astype(str).str.strip().str.upper() == 'TBD'
-        df_tbd = df_compute[mask_tbd].copy()
-
-        if df_tbd.empty:
-            return False, "No records found with 'TBD' in Server-Level Separation Scenario.", None
-
-        # 5. Vectorized missing column detection
-        def get_missing_columns(row):
-            missing = []
-            for col in valid_target_columns:
-                val = row[col]
-                if pd.isna(val) or str(val).strip() == "":
-                    missing.append(col)
-            return "\n".join(missing) if missing else None
-
-        # Apply missing column check
-        df_tbd['Columns Missing'] = df_tbd.apply(get_missing_columns, axis=1)
-        
-        # Filter only rows with missing columns
-        df_filtered = df_tbd[df_tbd['Columns Missing'].notna()].copy()
-
-        if df_filtered.empty:
-            return False, "No records found with missing data in target columns.", None
-
-        # 6. Create report DataFrame using vectorized operations
-        report_df = pd.DataFrame({
-            "Business Application Number (BAN)": df_filtered.iloc[:, idx_ban].fillna("N/A"),
-            "Category": "Compute",
-            "SBG": df_filtered.iloc[:, idx_sbg].fillna("N/A"),
-            "Business Application Name": df_filtered.iloc[:, idx_app_name].fillna("N/A"),
-            "Server ID / Name": df_filtered.iloc[:, idx_server_id].fillna("N/A"),
-            "Server-Level Separation Scenario": df_filtered.iloc[:, idx_sep_scenario].fillna("N/A"),
-            "Columns Missing": df_filtered['Columns Missing']
-        })
-
-        # 7. Write to Excel
-        with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
-            report_df.to_excel(writer, index=False, sheet_name='Compute')
-
-        # 8. Apply formatting
-        apply_formatting(output_path, 'Compute', len(report_df))
+        # 7-8. Write to Excel (one sheet per category), formatting each cell as it is written
+        sheets = list(reports)
+        if delta is not None and delta.changes is not None:
+            sheets.append((CHANGES_SHEET, delta.changes))
+        with timer.stage('write', rows=sum(len(df) for _, df in sheets)):
+            write_reports(sheets, output_path, progress)
 
         # 9. Calculate statistics
-        stats = calculate_statistics(report_df)
+        progress.start('statistics')
+        report_df = reports[0][1] if len(reports) == 1 else pd.concat([df for _, df in reports], ignore_index=True)
+        with timer.stage('statistics', rows=len(report_df)):
+            stats = calculate_statistics(report_df)
+            if delta is not None and delta.changes is not None:
+                stats['changes'] = delta.summary()
 
         return True, f"Generated {len(report_df)} records.", stats
 
@@ -112,45 +82,300 @@ def generate_validation_report(input_path, output_path):
         return False, str(e), None
 
 
-def apply_formatting(file_path, sheet_name, row_count):
+def generate_report_bytes(source, max_workers=None, timer=None, delta=None, progress=NULL_PROGRESS):
+    """
+    In-memory variant of generate_validation_report: nothing is written to disk.
+    Returns (success, message, stats, report_bytes); report_bytes is None on failure.
+    """
+    output = BytesIO()
+    success, message, stats = generate_validation_report(source, output, max_workers, timer, delta, progress)
+    return success, message, stats, output.getvalue() if success else None
+
+
+def generate_report_stream(source, fmt, max_workers=None, timer=None, progress=NULL_PROGRESS):
+    """
+    Variant of generate_validation_report for the streaming formats ('csv', 'ndjson',
+    'parquet', see report_formats.py): the tabs are validated as usual, but no workbook
+    is written or formatted; the report rows are encoded as the returned iterator is read.
+    Returns (success, message, stats, chunks); chunks is None on failure.
+    """
+    timer = timer or NULL_TIMER
+    try:
+        # 1. Parse the workbook once (README-Glossary and Compute)
+        if isinstance(source, ParsedWorkbook):
+            workbook = source
+        else:
+            with timer.stage('parse') as stage:
+                workbook = load_workbook(source, progress=progress)
+                stage['rows'] = len(workbook.compute) if workbook.compute is not None else 0
+        problem = workbook.check_structure()
+        if problem:
+            return False, problem[1], None, None
+
+        # 2-6. Validate Compute here and the other tabs in worker processes
+        reports, compute_message = build_reports(workbook, workbook.glossary_columns, max_workers, timer, None, progress)
+        if not reports:
+            return False, compute_message, None, None
+
+        # 7. Calculate statistics (sent before the rows)
+        progress.start('statistics')
+        report_df = reports[0][1] if len(reports) == 1 else pd.concat([df for _, df in reports], ignore_index=True)
+        with timer.stage('statistics', rows=len(report_df)):
+            stats = calculate_statistics(report_df)
+
+        # 8. Encode the rows as the response is sent
+        return True, f"Generated {len(report_df)} records.", stats, encode_report(reports, fmt)
+
+    except Exception as e:
+        return False, str(e), None, None
+
+
+def build_reports(workbook, glossary_columns, max_workers=None, timer=None, delta=None, progress=NULL_PROGRESS):
+    """
+    Validate every tab of a parsed (and structure-checked) workbook that glossary_columns
+    describes. Returns ([(category, report DataFrame), ...] for the tabs with findings,
+    Compute first, and the reason Compute produced no records, or None).
+    """
+    timer = timer or NULL_TIMER
+
+    # 2. Start the other tabs in worker processes
+    other_tabs = [tab for tab in glossary_columns if tab != COMPUTE_SHEET and tab in workbook.sheet_names]
+    progress.start('validate', 1 + len(other_tabs))
+    with timer.stage('start_tabs'):
+        tab_results = _start_tab_validations(workbook, other_tabs, glossary_columns, max_workers)
+
+    # 3-6. Validate Compute here in the meantime
+    with timer.stage('compute') as stage:
+        compute_report, compute_message = build_compute_report(
+            workbook, glossary_columns.get(COMPUTE_SHEET, set()), timer, delta
+        )
+        stage['rows'] = len(compute_report) if compute_report is not None else 0
+
+    reports = []
+    if compute_report is not None:
+        reports.append((COMPUTE_SHEET, compute_report))
+    progress.update(1)
+    with timer.stage('other_tabs') as stage:
+        for done, (tab, result) in enumerate(tab_results(), start=2):
+            progress.update(done)
+            if result[0] is not None:
+                reports.append((tab, result[0]))
+        stage['rows'] = sum(len(df) for tab, df in reports if tab != COMPUTE_SHEET)
+
+    return reports, compute_message
+
+
+def build_compute_report(workbook, valid_compute_columns, timer=None, delta=None):
+    """
+    Validate the Compute sheet, locating its columns through the header ColumnIndex.
+    Returns (report DataFrame, None) or (None, reason no records were reported).
+    """
+    # Compute sheet (column names already cleaned by ParsedWorkbook; with the
+    # streaming and xml readers it only holds the projected columns of 'TBD' rows)
+    df_compute = workbook.compute
+
+    # 3. Column names resolved from the header row (name, alias, then position)
+    index = workbook.compute_index
+    if index.missing_roles() or not index.has_all_targets():
+        return None, "Compute sheet doesn't have enough columns."
+
+    # Filter target columns that exist in glossary
+    valid_target_columns = [col for col in index.target_names if col in valid_compute_columns]
+    
+    if not valid_target_columns:
+        return None, "No valid target columns found in glossary."
+
+    return build_category_report(COMPUTE_SHEET, df_compute, index.names, valid_target_columns, "Server ID / Name",
+                                 timer, delta)
+
+
+def resolve_tab_columns(columns, valid_columns):
+    """
+    Find the report columns of a glossary-described tab through its header's ColumnIndex.
+    Returns (ColumnIndex, target columns): the tab's glossary columns that follow the
+    separation scenario column, as in the Compute layout.
+    """
+    index = column_index_for(columns, TAB_TEMPLATE)
+    return index, [col for col in index.target_names if col in valid_columns]
+
+
+def validate_tab(source, tab, valid_columns, reader=DEFAULT_READER):
+    """
+    Parse and validate one glossary-described tab (runs in a worker process).
+    Returns (report DataFrame, None) or (None, reason no records were reported).
+    """
+    def select(header_columns):
+        index, targets = resolve_tab_columns(header_columns, valid_columns)
+        wanted = {index.names[role] for role in index.names if index.names[role] is not None} | set(targets)
+        positions = [idx for idx, col in enumerate(header_columns) if col in wanted]
+        return positions, index.scenario_position
+
+    df_tab, columns = read_tab(source, tab, select, reader=reader)
+    index, targets = resolve_tab_columns(columns, valid_columns)
+    if index.scenario_position is None:
+        return None, f"No Separation Scenario column found in '{tab}'."
+    if not targets:
+        return None, f"No valid target columns found in glossary for '{tab}'."
+
+    categorize(df_tab, index.names)
+    return build_category_report(tab, df_tab, index.names, targets, f"{tab} ID / Name")
+
+
+def build_category_report(category, df, names, valid_target_columns, id_label, timer=None, delta=None):
+    """
+    Report the 'TBD' rows of one tab that are missing any of valid_target_columns.
+    names maps the report roles (sbg, ban, app_name, server_id, sep_scenario) to
+    column names; roles without a column are reported as "N/A".
+    With delta (a delta.DeltaRun) the findings are recorded, to be compared with
+    those of the previous upload.
+    Returns (report DataFrame, None) or (None, reason no records were reported).
+    """
+    timer = timer or NULL_TIMER
+
+    # 4. Vectorized filtering: Get rows where separation scenario is "TBD"
+    with timer.stage('filter', rows=len(df)):
+        scenario = df[names['sep_scenario']]
+        if isinstance(scenario.dtype, pd.CategoricalDtype):
+            # Each distinct scenario is compared once; rows pick their result by code
+            # (-1, a missing value, picks the trailing False)
+            is_tbd = scenario.cat.categories.astype(str).str.strip().str.upper() == 'TBD'
+            mask_tbd = np.append(is_tbd, False)[scenario.cat.codes.to_numpy()]
+        else:
+            mask_tbd = scenario.astype(str).str.strip().str.upper() == 'TBD'
+        df_tbd = df[mask_tbd].copy()
+
+    if df_tbd.empty:
+        if delta is not None:
+            # Still recorded, so the previous findings are listed as resolved
+            delta.record(df_tbd, names)
+        return None, "No records found with 'TBD' in Server-Level Separation Scenario."
+
+    # 5. Vectorized missing column detection
+    with timer.stage('missing', rows=len(df_tbd)):
+        df_tbd['Columns Missing'] = find_missing_columns(df_tbd, valid_target_columns)
+    if delta is not None:
+        delta.record(df_tbd, names)
+    
+    # Filter only rows with missing columns
+    df_filtered = df_tbd[df_tbd['Columns Missing'].notna()].copy()
+
+    if df_filtered.empty:
+        return None, "No records found with missing data in target columns."
+
+    def column(role):
+        if names.get(role) is None:
+            return "N/A"
+        return fill_na(df_filtered[names[role]], "N/A")
+
+    # 6. Create report DataFrame using vectorized operations
+    report_df = pd.DataFrame({
+        "Business Application Number (BAN)": column('ban'),
+        "Category": category,
+        "SBG": column('sbg'),
+        "Business Application Name": column('app_name'),
+        id_label: column('server_id'),
+        "Server-Level Separation Scenario": column('sep_scenario'),
+        "Columns Missing": df_filtered['Columns Missing']
+    })
+    return report_df, None
+
+
+def _start_tab_validations(workbook, tabs, glossary_columns, max_workers):
+    """
+    Submit the tabs to the shared process pool and return a function that waits for and
+    yields (tab, (report DataFrame or None, message)). Validates serially inside worker
+    processes and where worker processes are unavailable (e.g. serverless runtimes
+    without /dev/shm).
+    """
+    if not tabs:
+        return lambda: iter(())
+
+    source = workbook.worker_source()
+    workers = min(len(tabs), worker_count(max_workers))
+
+    def serial():
+        for tab in tabs:
+            yield tab, validate_tab(source, tab, glossary_columns[tab], workbook.reader)
+
+    if workers <= 1:
+        return serial
+
+    try:
+        futures = [(tab, shared_pool.submit(validate_tab, source, tab, glossary_columns[tab], workbook.reader))
+                   for tab in tabs]
+    except POOL_ERRORS:
+        return serial
+
+    def collect():
+        for tab, future in futures:
+            try:
+                yield tab, shared_pool.result(future)
+            except Exception as e:
+                yield tab, (None, str(e))
+
+    return collect
+
+
+def find_missing_columns(df, columns):
+    """
+    Vectorized missing-column detection.
+    A cell is missing if it is NaN or its text is blank. Each column is dictionary-encoded
+    so the blank check runs once per distinct value, the per-row results are packed into a
+    bitmask over `columns`, and each distinct mask is mapped to its newline-joined names once.
+    Returns a Series of those strings (None where nothing is missing).
+    """
+    # Python ints (object dtype) only in the unlikely case of more than 63 columns
+    code_dtype = np.int64 if len(columns) < 64 else object
+    codes = np.zeros(len(df), dtype=code_dtype)
+    for bit, col in enumerate(columns):
+        value_codes, uniques = pd.factorize(df[col].to_numpy())
+        # factorize marks NaN/None with -1, which picks the trailing True
+        is_missing = np.array([str(val).strip() == "" for val in uniques] + [True], dtype=bool)
+        codes |= is_missing[value_codes].astype(code_dtype) << bit
+
+    masks, inverse = np.unique(codes, return_inverse=True)
+    labels = np.empty(len(masks), dtype=object)
+    for i, mask in enumerate(masks.tolist()):
+        missing_names = [col for bit, col in enumerate(columns) if mask >> bit & 1]
+        labels[i] = "\n".join(missing_names) if missing_names else None
+
+    return pd.Series(labels[inverse.reshape(-1)], index=df.index, dtype=object)
+
+
+def apply_formatting(file_path, sheet_name, row_count, progress=NULL_PROGRESS):
     """
     Optimized: Apply conditional formatting, alignment, and styling to the Excel report.
+    Reformats an already written report in place; new reports are styled at write
+    time by report_writer.write_report.
+    progress gets the 'format' stage (rows formatted) and then 'save'.
     """
+    # Only this legacy path loads a workbook back in; keep openpyxl's reader out of module import
+    from openpyxl import load_workbook
+    from openpyxl.utils import get_column_letter
+
     try:
         # Load the workbook
         wb = load_workbook(file_path)
         ws = wb[sheet_name]
         
-        # Define styles (reuse objects for performance) - All using Aptos font size 10
-        header_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
-        header_font = Font(name="Aptos", bold=True, color="FFFFFF", size=10)
-        header_alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
-        
-        light_fill = PatternFill(start_color="F2F2F2", end_color="F2F2F2", fill_type="solid")
-        white_fill = PatternFill(start_color="FFFFFF", end_color="FFFFFF", fill_type="solid")
-        
-        tbd_fill = PatternFill(start_color="FFF2CC", end_color="FFF2CC", fill_type="solid")
-        tbd_font = Font(name="Aptos", bold=True, color="C65911", size=10)
-        
-        missing_fill = PatternFill(start_color="FFE6E6", end_color="FFE6E6", fill_type="solid")
-        missing_font = Font(name="Aptos", color="C00000", size=10)
-        
-        # Default font for regular cells
-        default_font = Font(name="Aptos", size=10)
-        
-        thin_border = Border(
-            left=Side(style='thin', color='D0D0D0'),
-            right=Side(style='thin', color='D0D0D0'),
-            top=Side(style='thin', color='D0D0D0'),
-            bottom=Side(style='thin', color='D0D0D0')
-        )
-        
-        center_alignment = Alignment(horizontal="center", vertical="center", wrap_text=False)
-        left_alignment = Alignment(horizontal="left", vertical="top", wrap_text=True)
+        # Define styles (reuse objects for performance) - shared with the streaming writer
+        styles = report_styles()
+        header_fill = styles['header_fill']
+        header_font = styles['header_font']
+        header_alignment = styles['header_alignment']
+        light_fill = styles['light_fill']
+        white_fill = styles['white_fill']
+        tbd_fill = styles['tbd_fill']
+        tbd_font = styles['tbd_font']
+        missing_fill = styles['missing_fill']
+        missing_font = styles['missing_font']
+        default_font = styles['default_font']
+        thin_border = styles['thin_border']
+        center_alignment = styles['center_alignment']
+        left_alignment = styles['left_alignment']
         
         # Set column widths (batch operation)
-        column_widths = [25, 12, 15, 35, 25, 30, 50]
-        for idx, width in enumerate(column_widths, start=1):
+        for idx, width in enumerate(COLUMN_WIDTHS, start=1):
             ws.column_dimensions[get_column_letter(idx)].width = width
         
         # Format header row
@@ -167,7 +392,10 @@ def apply_formatting(file_path, sheet_name, row_count):
         missing_col = 7  # G
         
         # Format data rows - optimized loop
+        progress.start('format', row_count)
         for row_idx in range(2, row_count + 2):
+            if not row_idx % PROGRESS_STRIDE:
+                progress.update(row_idx - 1)
             row_fill = light_fill if row_idx % 2 == 0 else white_fill
             row_height = 30  # Default height
             
@@ -205,6 +433,7 @@ def apply_formatting(file_path, sheet_name, row_count):
         ws.freeze_panes = 'A2'
         
         # Save the workbook
+        progress.start('save')
         wb.save(file_path)
         
     except Exception as e:
@@ -218,39 +447,48 @@ def calculate_statistics(df_report):
     Returns a dictionary with summary statistics including category breakdown.
     """
     try:
+        ban_column = 'Business Application Number (BAN)'
+
+        # One grouped aggregation: record counts per (Category, SBG, BAN), in order of
+        # first appearance. Every breakdown below is a roll-up of these counts.
+        counts = df_report.groupby(['Category', 'SBG', ban_column], sort=False, dropna=False, observed=True).size()
+        # The roll-ups are over the (few) distinct combinations: group those by value,
+        # so categorical columns break down in the same (sorted) order as text columns
+        counts.index = counts.index.set_levels([level.astype(object) for level in counts.index.levels])
+
+        sbg_breakdown = counts.groupby(level='SBG').sum().to_dict()
+        ban_breakdown = counts.groupby(level=ban_column).sum().to_dict()
+        category_breakdown = counts.groupby(level='Category').sum().to_dict()
+
         stats = {
             'total_records': len(df_report),
-            'unique_sbg_count': df_report['SBG'].nunique(),
-            'unique_ban_count': df_report['Business Application Number (BAN)'].nunique(),
-            'unique_categories': df_report['Category'].nunique(),
+            'unique_sbg_count': len(sbg_breakdown),
+            'unique_ban_count': len(ban_breakdown),
+            'unique_categories': len(category_breakdown),
             'sbg_list': df_report['SBG'].unique().tolist(),
             'category_list': df_report['Category'].unique().tolist(),
-            'sbg_breakdown': df_report.groupby('SBG').size().to_dict(),
-            'ban_breakdown': df_report.groupby('Business Application Number (BAN)').size().to_dict(),
-            'category_breakdown': df_report.groupby('Category').size().to_dict(),
+            'sbg_breakdown': sbg_breakdown,
+            'ban_breakdown': ban_breakdown,
+            'category_breakdown': category_breakdown,
             'category_details': {}
         }
-        
-        # For each category, get distinct SBGs and their BAN counts
-        for category in df_report['Category'].unique():
-            df_category = df_report[df_report['Category'] == category]
-            distinct_sbgs = df_category['SBG'].unique().tolist()
-            
-            sbg_ban_details = {}
-            for sbg in distinct_sbgs:
-                df_sbg = df_category[df_category['SBG'] == sbg]
-                distinct_bans = df_sbg['Business Application Number (BAN)'].nunique()
-                sbg_ban_details[sbg] = {
-                    'distinct_bans': distinct_bans,
-                    'total_records': len(df_sbg)
-                }
-            
-            stats['category_details'][category] = {
-                'distinct_sbgs': len(distinct_sbgs),
-                'sbg_ban_details': sbg_ban_details
+
+        # For each category, its distinct SBGs and their BAN counts
+        has_ban = pd.Series(counts.index.get_level_values(ban_column).notna(), index=counts.index)
+        pair_records = counts.groupby(level=['Category', 'SBG'], sort=False).sum()
+        pair_bans = has_ban.groupby(level=['Category', 'SBG'], sort=False).sum()
+
+        category_details = stats['category_details']
+        for (category, sbg), total_records, distinct_bans in zip(
+                pair_records.index.tolist(), pair_records.tolist(), pair_bans.tolist()):
+            details = category_details.setdefault(category, {'distinct_sbgs': 0, 'sbg_ban_details': {}})
+            details['distinct_sbgs'] += 1
+            details['sbg_ban_details'][sbg] = {
+                'distinct_bans': distinct_bans,
+                'total_records': total_records
             }
         
-        return stats
+        return normalize_stats(stats)
     except Exception as e:
         print(f"Error calculating statistics: {str(e)}")
         return {
@@ -2,123 +2,520 @@ from flask import Flask, request, send_file, jsonify
 from flask_cors import CORS
 import os
 import uuid
-import pandas as pd
-from validator import generate_validation_report
+import json
+import time
+from io import BytesIO
+from validator import generate_report_bytes, generate_report_stream
+from delta import DeltaRun, RowIndex
+from batch import validate_batch, zip_members, batch_digest, BatchError, MAX_BATCH_FILES
+from workbook import STRUCTURE_ERROR_CODES
+from columnar_cache import load_workbook
+from csv_reader import DelimitedBundle, DelimitedInputError
+from upload_types import WORKBOOK_EXTENSIONS, is_delimited_name, upload_name_error
+from report_cache import (ReportCache, MemoryCacheBackend, report_cache_key, delta_cache_key, is_report_cache_key,
+                          delimited_upload_digest, VALIDATION_RULES_VERSION)
+from report_stats import summarize_stats, stats_header, parse_stats_args, stats_page, encode_stats
+from report_formats import parse_report_format, report_download_name, REPORT_FORMATS, STREAMING_FORMATS
+from jobs import JobManager, QueueFullError
+from instrumentation import timer_from_env
+from upload import UploadRequest, MAX_REQUEST_BYTES, UPLOAD_TOO_LARGE_MESSAGE
+from metrics import Registry, CONTENT_TYPE as METRICS_CONTENT_TYPE
 
 app = Flask(__name__)
+# Uploads are hashed and size-checked as they are received (see upload.py)
+app.request_class = UploadRequest
+app.config['MAX_CONTENT_LENGTH'] = MAX_REQUEST_BYTES
 # Enable CORS with proper header exposure
-CORS(app, expose_headers=['X-Report-Stats'])
+CORS(app, expose_headers=['X-Report-Stats', 'X-Report-Stats-Url', 'Server-Timing'])
 
 UPLOAD_FOLDER = 'uploads'
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
+# Reports already generated for identical uploads, kept in process memory
+REPORT_CACHE_MAX_BYTES = 256 * 1024 * 1024
+report_cache = ReportCache(MemoryCacheBackend(REPORT_CACHE_MAX_BYTES))
 
-@app.route('/api/validate', methods=['POST'])
-def validate_file():
+# Findings of each generated report, by report id: ?previous=<report id> lists
+# how a new upload's findings differ from them (delta mode, see delta.py)
+ROW_INDEX_MAX_BYTES = 64 * 1024 * 1024
+row_indexes = MemoryCacheBackend(ROW_INDEX_MAX_BYTES)
+
+# Background validations: one process per core, and a bounded number of
+# queued + running jobs before new submissions get a 429
+JOB_WORKERS = os.cpu_count() or 2
+JOB_QUEUE_DEPTH = JOB_WORKERS * 4
+JOB_RETRY_AFTER_SECONDS = 10
+job_manager = JobManager(JOB_WORKERS, JOB_QUEUE_DEPTH)
+# Progress streams send a comment this often while a job is quiet, so proxies keep them open
+JOB_EVENTS_KEEPALIVE_SECONDS = 15
+
+# Prometheus metrics, served at /metrics
+MB = 1024 * 1024
+metrics = Registry()
+upload_bytes = metrics.histogram(
+    'validation_upload_bytes', 'Size of uploaded workbooks in bytes.',
+    [64 * 1024, 256 * 1024, MB, 4 * MB, 16 * MB, 32 * MB, 64 * MB, 128 * MB], ['endpoint'])
+parse_seconds = metrics.histogram(
+    'validation_parse_seconds', 'Time to parse an uploaded workbook.',
+    [0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120])
+report_seconds = metrics.histogram(
+    'validation_report_seconds', 'Time to validate a parsed workbook and write its report.',
+    [0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120])
+report_rows = metrics.histogram(
+    'validation_report_rows', 'Records in generated reports.',
+    [10, 100, 1000, 10_000, 50_000, 100_000, 500_000, 1_000_000])
+validations_total = metrics.counter(
+    'validations_total', 'Finished /api/validate requests and validation jobs by result.', ['result'])
+structure_errors_total = metrics.counter(
+    'validation_structure_errors_total', 'Uploads rejected by the structure check, by error code.', ['code'])
+validations_in_flight = metrics.gauge(
+    'validations_in_flight', 'Validations currently being processed by /api/validate or a validation job.')
+metrics.gauge('validation_jobs_pending', 'Queued and running background validation jobs.',
+              function=job_manager.pending_count)
+metrics.gauge('report_cache_hit_ratio', 'Share of report cache lookups that were hits.',
+              function=lambda: report_cache.hits / max(report_cache.hits + report_cache.misses, 1))
+# Export every series from the first scrape
+for result in ('success', 'cache_hit', 'invalid', 'error'):
+    validations_total.labels(result)
+for code in STRUCTURE_ERROR_CODES:
+    structure_errors_total.labels(code)
+
+
+def record_job_metrics(job, measurements):
+    """Metrics of a finished validation job (see JobManager.submit's on_finished)."""
+    validations_in_flight.dec()
+    if 'parse_seconds' in measurements:
+        parse_seconds.observe(measurements['parse_seconds'])
+    if 'report_seconds' in measurements:
+        report_seconds.observe(measurements['report_seconds'])
+    if 'structure_error' in measurements:
+        structure_errors_total.labels(measurements['structure_error']).inc()
+    if not job.error:
+        validations_total.labels('success').inc()
+        report_rows.observe((job.stats or {}).get('total_records', 0))
+    else:
+        validations_total.labels('invalid' if job.error_status == 400 else 'error').inc()
+
+
+def cache_job_report(job, report_bytes, stats, row_index):
+    """Keep a finished job's report (and its findings, for ?previous=) like /api/validate does."""
+    report_cache.put(job.cache_key, report_bytes, stats)
+    if row_index is not None:
+        row_indexes.put(job.cache_key, row_index, None)
+
+
+def stats_json_response(body, status=200):
+    """
+    JSON response for bodies that embed statistics. Breakdown keys can mix numbers
+    and strings (e.g. numeric BANs), which jsonify's key sorting can't handle.
+    """
+    return app.response_class(json.dumps(body), status=status, mimetype='application/json')
+
+
+def check_upload():
+    """
+    Get the uploaded file from the request.
+    Returns (file, None) if valid, (None, error response) otherwise.
+    """
     if 'file' not in request.files:
-        return jsonify({"error": "No file part"}), 400
+        return None, (jsonify({"error": "No file part"}), 400)
 
     file = request.files['file']
     if file.filename == '':
-        return jsonify({"error": "No selected file"}), 400
+        return None, (jsonify({"error": "No selected file"}), 400)
 
-    # Validate file extension
-    allowed_extensions = {'.xlsx', '.xls'}
-    file_ext = os.path.splitext(file.filename)[1].lower()
-    if file_ext not in allowed_extensions:
-        return jsonify({"error": "Invalid file format. Please upload an Excel file (.xlsx or .xls)"}), 400
+    # Validate file extension (a single CSV file can't hold the tabs validation needs)
+    name_error = upload_name_error(file.filename)
+    if name_error:
+        return None, (jsonify({"error": name_error}), 400)
 
-    # Create unique filenames to avoid collisions
-    unique_id = str(uuid.uuid4())
-    input_filename = f"{unique_id}_{file.filename}"
-    input_path = os.path.join(UPLOAD_FOLDER, input_filename)
-    output_filename = f"Report_{unique_id}.xlsx"
-    output_path = os.path.join(UPLOAD_FOLDER, output_filename)
+    return file, None
+
+
+def upload_digest_for(file):
+    """The digest an upload's report and parsed workbook are cached by."""
+    upload = file.stream
+    if is_delimited_name(file.filename):
+        return delimited_upload_digest(upload.digest, file.filename)
+    return upload.digest
+
+
+@app.errorhandler(413)
+def upload_too_large(e):
+    return jsonify({"error": UPLOAD_TOO_LARGE_MESSAGE}), 413
+
+
+def report_response(report_bytes, stats, report_id=None, download_name='Compute_Validation_Report.xlsx'):
+    """
+    Send the report back to frontend with summary statistics in headers.
+    The BAN breakdown is paged through the stats resource at X-Report-Stats-Url.
+    """
+    response = send_file(
+        BytesIO(report_bytes),
+        as_attachment=True,
+        download_name=download_name,
+        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    )
+    
+    # Add statistics as response headers
+    if stats:
+        response.headers['X-Report-Stats'] = stats_header(stats)
+        if report_id:
+            response.headers['X-Report-Stats-Url'] = stats_url(report_id)
+    
+    return response
+
+
+def stream_response(chunks, stats, fmt):
+    """
+    Send report rows as they are encoded (chunks of a streaming format), with the
+    summary statistics in the X-Report-Stats header.
+    """
+    response = app.response_class(chunks, mimetype=REPORT_FORMATS[fmt][0])
+    response.headers['Content-Disposition'] = f'attachment; filename={report_download_name(fmt)}'
+    if stats:
+        response.headers['X-Report-Stats'] = stats_header(stats)
+    return response
+
+
+def stats_url(report_id):
+    return f"/api/reports/{report_id}/stats"
+
+
+def job_body(job):
+    """A job's status with summary statistics; polling doesn't resend the full breakdowns."""
+    body = job.to_dict()
+    if job.stats:
+        body['stats'] = summarize_stats(job.stats)
+        if job.cache_key:
+            body['stats_url'] = stats_url(job.cache_key)
+    return body
+
+
+def previous_row_index():
+    """
+    The RowIndex of the report named by ?previous=, for delta validation.
+    Returns (previous report id or None, RowIndex or None, error response or None).
+    """
+    previous_id = request.args.get('previous')
+    if not previous_id:
+        return None, None, None
+    entry = row_indexes.get(previous_id) if is_report_cache_key(previous_id) else None
+    try:
+        previous_index = RowIndex.from_bytes(entry[0]) if entry is not None else None
+    except ValueError:
+        previous_index = None
+    if previous_index is None:
+        return None, None, (jsonify({"error": "Unknown or expired previous report id"}), 404)
+    return previous_id, previous_index, None
+
+
+@app.route('/api/validate', methods=['POST'])
+def validate_file():
+    """
+    Validate an upload and return its report.
+    ?previous=<report id> compares it with an earlier report of the same workbook: a
+    'Changes' sheet lists the Compute findings that are new, resolved or updated.
+    ?format=csv|ndjson|parquet (or the Accept header) streams the report rows instead
+    of the formatted workbook (see report_formats.py).
+    """
+    file, upload_error = check_upload()
+    if upload_error:
+        return upload_error
+    try:
+        report_format = parse_report_format(request.args, request.accept_mimetypes)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    previous_id, previous_index, previous_error = previous_row_index()
+    if previous_error:
+        return previous_error
+    if previous_id and report_format in STREAMING_FORMATS:
+        return jsonify({"error": "Delta reports (?previous=) are only available as xlsx"}), 400
+
+    # The upload was hashed while it was received (a SpooledUpload, see upload.py)
+    upload = file.stream
+    # Per-stage timing (Server-Timing header + log line) when VALIDATION_TIMING is set
+    timer = timer_from_env()
+    log_fields = {'endpoint': '/api/validate', 'upload_bytes': upload.size}
+    upload_bytes.labels('/api/validate').observe(upload.size)
 
+    validations_in_flight.inc()
     try:
-        # Save uploaded file
-        file.save(input_path)
+        # Identical uploads (and rules, and previous report) produce identical reports
+        digest = upload_digest_for(file)
+        cache_key = report_cache_key(digest, VALIDATION_RULES_VERSION)
+        if previous_id:
+            cache_key = delta_cache_key(cache_key, previous_id)
+        with timer.stage('cache_lookup'):
+            # Only the workbook is cached; streamed formats are encoded for each request
+            cached = report_cache.get(cache_key) if report_format not in STREAMING_FORMATS else None
+        if cached is not None:
+            validations_total.labels('cache_hit').inc()
+            return timer.finish(report_response(*cached, report_id=cache_key), cache='hit', **log_fields)
+
+        # Parse the workbook once, straight from the received buffer (or spool
+        # file); the same frames are used for the structure check and for
+        # report generation
+        started = time.perf_counter()
+        with timer.stage('parse') as stage:
+            source = upload.source()
+            if is_delimited_name(file.filename):
+                source = DelimitedBundle.open(source, file.filename)
+            workbook = load_workbook(source, digest)
+            stage['rows'] = len(workbook.compute) if workbook.compute is not None else 0
+        parse_seconds.observe(time.perf_counter() - started)
 
         # Validate file structure before processing
-        validation_error = validate_file_structure(input_path)
-        if validation_error:
-            if os.path.exists(input_path):
-                os.remove(input_path)
-            return jsonify({"error": validation_error}), 400
+        with timer.stage('structure'):
+            problem = workbook.check_structure()
+        if problem:
+            code, validation_error = problem
+            structure_errors_total.labels(code).inc()
+            validations_total.labels('invalid').inc()
+            return timer.finish(jsonify({"error": validation_error}), cache='miss', status=400, **log_fields), 400
 
-        # Run validation logic
-        success, message, stats = generate_validation_report(input_path, output_path)
+        # Streamed formats: validate, then send the rows as they are encoded
+        if report_format in STREAMING_FORMATS:
+            started = time.perf_counter()
+            success, message, stats, chunks = generate_report_stream(workbook, report_format, timer=timer)
+            report_seconds.observe(time.perf_counter() - started)
+            if not success:
+                validations_total.labels('error').inc()
+                return timer.finish(jsonify({"error": message}), cache='miss', status=500, **log_fields), 500
+            validations_total.labels('success').inc()
+            report_rows.observe(stats.get('total_records', 0))
+            return timer.finish(stream_response(chunks, stats, report_format), cache='miss', **log_fields)
+
+        # Run validation logic; the report is written to memory
+        started = time.perf_counter()
+        delta = DeltaRun(previous_index)
+        success, message, stats, report_bytes = generate_report_bytes(workbook, timer=timer, delta=delta)
+        report_seconds.observe(time.perf_counter() - started)
 
         if success:
-            # Send the generated report back to frontend with statistics in headers
-            response = send_file(
-                output_path,
-                as_attachment=True,
-                download_name='Compute_Validation_Report.xlsx',
-                mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-            )
-            
-            # Add statistics as response headers
-            if stats:
-                import json
-                response.headers['X-Report-Stats'] = json.dumps(stats)
-            
-            return response
+            validations_total.labels('success').inc()
+            report_rows.observe(stats.get('total_records', 0))
+            report_cache.put(cache_key, report_bytes, stats)
+            if delta.index is not None:
+                row_indexes.put(cache_key, delta.index.to_bytes(), None)
+            return timer.finish(report_response(report_bytes, stats, report_id=cache_key), cache='miss', **log_fields)
         else:
-            return jsonify({"error": message}), 500
+            validations_total.labels('error').inc()
+            return timer.finish(jsonify({"error": message}), cache='miss', status=500, **log_fields), 500
 
+    except DelimitedInputError as e:
+        structure_errors_total.labels('unreadable_file').inc()
+        validations_total.labels('invalid').inc()
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
+        validations_total.labels('error').inc()
         return jsonify({"error": f"Processing error: {str(e)}"}), 500
     finally:
-        # Cleanup: Remove files after processing
+        validations_in_flight.dec()
+
+
+@app.route('/api/batch', methods=['POST'])
+def validate_batch_files():
+    """
+    Validate several workbooks at once: any number of 'file' fields, each an Excel
+    file or a zip of Excel files. Returns one combined report (one sheet per category
+    with a 'Workbook' column) and statistics over all workbooks.
+    """
+    files = [file for file in request.files.getlist('file') if file.filename]
+    if not files:
+        return jsonify({"error": "No file part"}), 400
+
+    try:
+        sources = []
+        for file in files:
+            upload = file.stream
+            upload_bytes.labels('/api/batch').observe(upload.size)
+            file_ext = os.path.splitext(file.filename)[1].lower()
+            if file_ext == '.zip':
+                sources.extend(zip_members(upload.source()))
+            elif file_ext in WORKBOOK_EXTENSIONS:
+                # Worker processes get the bytes, or the spool file's path
+                source = upload.source()
+                sources.append((file.filename, source.getvalue() if upload.in_memory else source))
+            else:
+                return jsonify({"error": f"Invalid file format: {file.filename}. Please upload Excel files (.xlsx or .xls) or zip archives of them"}), 400
+        if len(sources) > MAX_BATCH_FILES:
+            return jsonify({"error": f"{len(sources)} workbooks were submitted; the maximum is {MAX_BATCH_FILES}."}), 400
+        if not sources:
+            return jsonify({"error": "No Excel files found in the upload"}), 400
+
+        # Identical batches (same names, contents and rules) produce identical reports
+        cache_key = report_cache_key(batch_digest(sources), VALIDATION_RULES_VERSION)
+        cached = report_cache.get(cache_key)
+        if cached is not None:
+            return report_response(*cached, report_id=cache_key, download_name='Batch_Validation_Report.xlsx')
+
+        output = BytesIO()
+        success, message, stats = validate_batch(sources, output, JOB_WORKERS)
+        if not success:
+            return jsonify({"error": message}), 400
+
+        report_bytes = output.getvalue()
+        report_cache.put(cache_key, report_bytes, stats)
+        return report_response(report_bytes, stats, report_id=cache_key, download_name='Batch_Validation_Report.xlsx')
+
+    except BatchError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": f"Processing error: {str(e)}"}), 500
+
+
+@app.route('/api/jobs', methods=['GET'])
+def jobs_info():
+    """
+    Whether background jobs are available here, and the queue's load. The frontend
+    probes this once (without uploading anything) before choosing /api/jobs over
+    /api/validate; deployments without it (e.g. the Vercel function) answer 404.
+    """
+    return jsonify({"jobs": True, "pending": job_manager.pending_count(), "max_pending": job_manager.max_pending})
+
+
+@app.route('/api/jobs', methods=['POST'])
+def submit_job():
+    """Queue a validation and return its job id straight away (202)."""
+    file, upload_error = check_upload()
+    if upload_error:
+        return upload_error
+
+    unique_id = str(uuid.uuid4())
+    input_path = os.path.join(UPLOAD_FOLDER, f"{unique_id}_{file.filename}")
+    report_path = os.path.join(UPLOAD_FOLDER, f"Report_{unique_id}.xlsx")
+
+    try:
+        upload = file.stream
+        upload_bytes.labels('/api/jobs').observe(upload.size)
+        digest = upload_digest_for(file)
+        cache_key = report_cache_key(digest, VALIDATION_RULES_VERSION)
+        cached = report_cache.get(cache_key)
+        if cached is not None:
+            job = job_manager.add_finished(report_path, *cached, cache_key=cache_key)
+            validations_total.labels('cache_hit').inc()
+        else:
+            # Worker processes read the upload from disk
+            upload.persist(input_path)
+            # Decremented by record_job_metrics once the job has finished
+            validations_in_flight.inc()
+            try:
+                job = job_manager.submit(
+                    input_path, report_path, cache_key,
+                    on_success=cache_job_report,
+                    on_finished=record_job_metrics,
+                    digest=digest,
+                )
+            except Exception:
+                validations_in_flight.dec()
+                raise
+    except QueueFullError as e:
+        if os.path.exists(input_path):
+            os.remove(input_path)
+        response = jsonify({"error": f"The validation queue is full ({str(e)}) Please retry shortly."})
+        response.headers['Retry-After'] = str(JOB_RETRY_AFTER_SECONDS)
+        return response, 429
+    except Exception as e:
         if os.path.exists(input_path):
             os.remove(input_path)
-        # Note: In production, you might want a scheduled job to clean output files
+        return jsonify({"error": f"Processing error: {str(e)}"}), 500
+
+    body = job_body(job)
+    body['status_url'] = f"/api/jobs/{job.job_id}"
+    body['events_url'] = f"/api/jobs/{job.job_id}/events"
+    body['report_url'] = f"/api/jobs/{job.job_id}/report"
+    return stats_json_response(body, 202)
+
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """Status, progress and (once finished) statistics of a validation job."""
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job id"}), 404
+    return stats_json_response(job_body(job))
+
+
+@app.route('/api/jobs/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    """
+    Server-Sent Events stream of a validation job: a 'progress' event (the job status,
+    with its stage and rows done) whenever the job changes, then one 'done' event with
+    the final status and summary statistics.
+    """
+    if job_manager.get(job_id) is None:
+        return jsonify({"error": "Unknown job id"}), 404
 
+    def events():
+        version = None
+        while True:
+            job, current = job_manager.wait_for_change(job_id, version, JOB_EVENTS_KEEPALIVE_SECONDS)
+            if job is None:
+                yield sse_event('error', {"error": "Unknown job id"})
+                return
+            if current == version:
+                yield ': keep-alive\n\n'
+                continue
+            version = current
+            if job.finished:
+                yield sse_event('done', job_body(job))
+                return
+            yield sse_event('progress', job_body(job))
 
-def validate_file_structure(file_path):
+    response = app.response_class(events(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    # Stop reverse proxies (nginx) from buffering the stream
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def sse_event(event, body):
+    return f"event: {event}\ndata: {json.dumps(body)}\n\n"
+
+
+@app.route('/api/jobs/<job_id>/report', methods=['GET'])
+def job_report(job_id):
+    """Download the report of a finished validation job."""
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job id"}), 404
+    if not job.finished:
+        return jsonify({"error": "Report is not ready yet", "status": job.status, "progress": job.progress}), 409
+    if job.error:
+        return jsonify({"error": job.error}), job.error_status
+
+    with open(job.report_path, 'rb') as f:
+        report_bytes = f.read()
+    return report_response(report_bytes, job.stats, report_id=job.cache_key)
+
+
+@app.route('/api/reports/<report_id>/stats', methods=['GET'])
+def report_stats(report_id):
     """
-    Validate that the uploaded Excel file has the required structure.
-    Returns error message if invalid, None if valid.
+    Full statistics of a generated report.
+    ?offset=&limit= page through ban_breakdown, ?format=columnar returns it as
+    parallel arrays, and the body is gzipped when the client accepts it.
     """
     try:
-        # Try to read the Excel file
-        excel_file = pd.ExcelFile(file_path)
-        sheet_names = excel_file.sheet_names
-        
-        # Check for required sheets
-        required_sheets = ['README-Glossary', 'Compute']
-        missing_sheets = [sheet for sheet in required_sheets if sheet not in sheet_names]
-        
-        if missing_sheets:
-            return f"Invalid file structure. Missing required sheet(s): {', '.join(missing_sheets)}. Please upload the correct Combined Data File."
-        
-        # Validate README-Glossary sheet structure
-        try:
-            df_glossary = pd.read_excel(file_path, sheet_name='README-Glossary', header=6)
-            required_glossary_columns = ['Tab Name', 'Column Name']
-            missing_cols = [col for col in required_glossary_columns if col not in df_glossary.columns]
-            
-            if missing_cols:
-                return f"Invalid 'README-Glossary' sheet structure. Missing column(s): {', '.join(missing_cols)}. Please upload the correct file."
-        except Exception as e:
-            return f"Error reading 'README-Glossary' sheet. Please ensure the file format is correct. Header should be at row 7."
-        
-        # Validate Compute sheet structure
-        try:
-            df_compute = pd.read_excel(file_path, sheet_name='Compute', header=5)
-            
-            # Check if we have enough columns
-            if len(df_compute.columns) < 24:
-                return f"Invalid 'Compute' sheet structure. Expected at least 24 columns, found {len(df_compute.columns)}. Please upload the correct file."
-                
-        except Exception as e:
-            return f"Error reading 'Compute' sheet. Please ensure the file format is correct. Header should be at row 6."
-        
-        return None  # File is valid
-        
-    except Exception as e:
-        return f"Unable to read the Excel file. Please ensure it's a valid Excel file (.xlsx or .xls). Error: {str(e)}"
+        offset, limit, fmt = parse_stats_args(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    stats = report_cache.get_stats(report_id)
+    if stats is None:
+        return jsonify({"error": "Unknown or expired report id"}), 404
+
+    payload, headers = encode_stats(stats_page(stats, offset, limit, fmt), request.headers.get('Accept-Encoding'))
+    response = app.response_class(payload, mimetype='application/json')
+    response.headers.update(headers)
+    return response
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Prometheus scrape endpoint."""
+    return app.response_class(metrics.render(), content_type=METRICS_CONTENT_TYPE)
 
 
 if __name__ == '__main__':
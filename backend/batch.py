@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Batch validation: many workbooks (e.g. one per SBG) validated concurrently in worker
+processes and combined into one report, with statistics over all of them.
+
+Usage: python backend/batch.py WORKBOOK_OR_ZIP [...] -o Combined_Report.xlsx
+           [--workers 4] [--stats stats.json]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from validator import build_reports, calculate_statistics
+from columnar_cache import load_workbook
+from worker_pool import worker_context, mark_worker_process
+from report_writer import write_reports
+
+
+WORKBOOK_EXTENSIONS = ('.xlsx', '.xls')
+MAX_BATCH_FILES = 100
+# Total uncompressed size of the workbooks in one zip
+MAX_BATCH_BYTES = 512 * 1024 * 1024
+
+# Column added to the combined report sheets, naming the workbook of each record
+WORKBOOK_COLUMN = 'Workbook'
+
+
+class BatchError(Exception):
+    """Raised for batch input that can't be validated (the message is shown to the user)."""
+
+
+def zip_members(source):
+    """
+    The workbooks in a zip archive (path or binary file-like object) as (name, bytes) pairs.
+    Folders, other files and macOS resource forks are skipped.
+    """
+    try:
+        with zipfile.ZipFile(source) as archive:
+            members = [info for info in archive.infolist()
+                       if not info.is_dir() and not info.filename.startswith('__MACOSX/')
+                       and os.path.splitext(info.filename)[1].lower() in WORKBOOK_EXTENSIONS]
+            if len(members) > MAX_BATCH_FILES:
+                raise BatchError(f"The archive holds {len(members)} workbooks; the maximum is {MAX_BATCH_FILES}.")
+            if sum(info.file_size for info in members) > MAX_BATCH_BYTES:
+                raise BatchError(f"The workbooks in the archive exceed {MAX_BATCH_BYTES // (1024 * 1024)} MB.")
+            return [(info.filename, archive.read(info)) for info in members]
+    except zipfile.BadZipFile as e:
+        raise BatchError(f"Unable to read the zip file: {str(e)}")
+
+
+def batch_digest(sources):
+    """SHA-256 over the names and contents of a batch, in order (for the report cache)."""
+    digest = hashlib.sha256()
+    for name, source in sources:
+        digest.update(name.encode('utf-8') + b'\0')
+        if isinstance(source, (bytes, bytearray)):
+            digest.update(hashlib.sha256(source).digest())
+        else:
+            with open(source, 'rb') as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                    digest.update(chunk)
+    return digest.hexdigest()
+
+
+# Worker process side ---------------------------------------------------------
+
+def glossary_identity(glossary_columns):
+    """Hash of a glossary's valid columns per tab, for workbooks without a glossary fingerprint (.xls)."""
+    canonical = json.dumps(sorted((tab, sorted(columns)) for tab, columns in glossary_columns.items()))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def validate_member(name, source):
+    """
+    Parse and validate one workbook of a batch (runs in a worker process).
+    Returns (name, success, message, glossary fingerprint, [(category, report DataFrame), ...]).
+    """
+    try:
+        workbook = load_workbook(source, max_workers=1)
+        problem = workbook.check_structure()
+        if problem:
+            return name, False, problem[1], None, []
+
+        # Workbooks of one batch usually carry the same README-Glossary: it is parsed
+        # by the first worker to see it and found in the glossary cache by the others
+        fingerprint = workbook.glossary_key or glossary_identity(workbook.glossary_columns)
+
+        # The other tabs are validated in this worker: the batch already uses every core
+        reports, message = build_reports(workbook, workbook.glossary_columns, max_workers=1)
+        if not reports:
+            return name, False, message, fingerprint, []
+        records = sum(len(df) for _, df in reports)
+        return name, True, f"Generated {records} records.", fingerprint, reports
+    except Exception as e:
+        return name, False, str(e), None, []
+
+
+# Parent process side ---------------------------------------------------------
+
+def validate_batch(sources, output_path, max_workers=None):
+    """
+    Validate (name, path or bytes) workbooks concurrently in up to max_workers worker
+    processes (default: one per CPU) and save one combined report to output_path:
+    one sheet per category with every workbook's records and a 'Workbook' column.
+    Returns (success, message, stats); stats are calculate_statistics over all records
+    plus 'workbooks' (the result of each workbook) and a 'batch' summary.
+    """
+    if not sources:
+        return False, "No workbooks to validate.", None
+    if len(sources) > MAX_BATCH_FILES:
+        return False, f"{len(sources)} workbooks were submitted; the maximum is {MAX_BATCH_FILES}.", None
+
+    try:
+        results = _run_members(sources, max_workers)
+
+        # One sheet per category, in order of first appearance
+        sheets = {}
+        workbooks = []
+        for name, success, message, fingerprint, reports in results:
+            workbooks.append({
+                'workbook': name,
+                'success': success,
+                'message': message,
+                'total_records': sum(len(df) for _, df in reports),
+            })
+            for category, df in reports:
+                sheets.setdefault(category, []).append(df.assign(**{WORKBOOK_COLUMN: name}))
+
+        if not sheets:
+            reasons = '; '.join(f"{entry['workbook']}: {entry['message']}" for entry in workbooks)
+            return False, f"No records found in any workbook. {reasons}", None
+
+        reports = [(category, pd.concat(frames, ignore_index=True)) for category, frames in sheets.items()]
+        write_reports(reports, output_path)
+
+        report_df = pd.concat([df for _, df in reports], ignore_index=True)
+        stats = calculate_statistics(report_df)
+        stats['workbooks'] = workbooks
+        stats['batch'] = {
+            'workbooks': len(workbooks),
+            'failed': sum(1 for entry in workbooks if not entry['success']),
+            'distinct_glossaries': len({result[3] for result in results if result[3] is not None}),
+        }
+
+        validated = len(workbooks) - stats['batch']['failed']
+        return True, f"Generated {len(report_df)} records from {validated} of {len(workbooks)} workbooks.", stats
+
+    except Exception as e:
+        return False, str(e), None
+
+
+def _run_members(sources, max_workers):
+    """validate_member for each source, in worker processes where available, in order."""
+    workers = min(len(sources), max_workers or os.cpu_count() or 1)
+    if workers > 1:
+        try:
+            with ProcessPoolExecutor(max_workers=workers, mp_context=worker_context(),
+                                     initializer=mark_worker_process) as executor:
+                futures = [executor.submit(validate_member, name, source) for name, source in sources]
+                return [_result(future, name) for future, (name, _) in zip(futures, sources)]
+        except (OSError, NotImplementedError):
+            pass  # No worker processes here (e.g. serverless runtimes without /dev/shm)
+    return [validate_member(name, source) for name, source in sources]
+
+
+def _result(future, name):
+    try:
+        return future.result()
+    except Exception as e:
+        return name, False, f"Processing error: {str(e)}", None, []
+
+
+def collect_sources(paths):
+    """(name, path or bytes) for each workbook path; zip archives are expanded."""
+    sources = []
+    for path in paths:
+        if os.path.splitext(path)[1].lower() == '.zip':
+            sources.extend(zip_members(path))
+        else:
+            sources.append((os.path.basename(path), path))
+    return sources
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('inputs', nargs='+', help="Workbooks (.xlsx/.xls) or zip archives of workbooks")
+    parser.add_argument('-o', '--output', default='Combined_Validation_Report.xlsx')
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: one per CPU)")
+    parser.add_argument('--stats', metavar='PATH', help="Also write the statistics as JSON to PATH")
+    args = parser.parse_args()
+
+    try:
+        sources = collect_sources(args.inputs)
+    except BatchError as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        return 2
+
+    success, message, stats = validate_batch(sources, args.output, args.workers)
+    if not success:
+        print(f"Error: {message}", file=sys.stderr)
+        return 1
+
+    for entry in stats['workbooks']:
+        print(f"{'OK  ' if entry['success'] else 'FAIL'} {entry['workbook']}: {entry['message']}")
+    print(message)
+    print(f"Wrote {args.output}")
+    if args.stats:
+        with open(args.stats, 'w') as f:
+            json.dump(stats, f, indent=2, default=str)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
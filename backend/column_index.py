@@ -0,0 +1,127 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+class ColumnTemplate:
+    """
+    How to find the columns a tab's validation needs.
+    Each role is matched by header name, then by alias, then by a substring of the
+    header, and finally by a fixed position. Target columns are the columns following
+    the separation scenario column (at most target_count of them, if given).
+    """
+
+    def __init__(self, name, roles, target_count=None):
+        self.name = name
+        self.roles = roles
+        self.target_count = target_count
+
+
+# Compute: names and aliases first; the positions are those of the original template
+COMPUTE_TEMPLATE = ColumnTemplate('Compute', {
+    'sbg': {'names': ['SBG'], 'position': 2},
+    'ban': {'names': ['Business Application Number (BAN)', 'BAN', 'Business Application Number'], 'position': 3},
+    'app_name': {'names': ['Business Application Name', 'Application Name'], 'position': 4},
+    'server_id': {'names': ['Server ID / Name', 'Server ID', 'Server Name'], 'position': 13},
+    'sep_scenario': {'names': ['Server-Level Separation Scenario', 'Separation Scenario'], 'position': 17},
+}, target_count=6)
+
+# Other glossary-described tabs (Storage, Network, ...): by name only
+TAB_TEMPLATE = ColumnTemplate('Tab', {
+    'sbg': {'names': ['SBG']},
+    'ban': {'names': ['Business Application Number (BAN)', 'BAN'], 'contains': ['Business Application Number']},
+    'app_name': {'names': ['Business Application Name', 'Application Name'], 'contains': ['Application Name']},
+    'server_id': {'contains': [' ID / Name', ' ID', 'ID ']},
+    'sep_scenario': {'contains': ['Separation Scenario']},
+})
+
+REQUIRED_ROLES = ['sbg', 'ban', 'app_name', 'server_id', 'sep_scenario']
+
+# Resolved indexes are reused for every upload with the same header row
+INDEX_CACHE_SIZE = 64
+_index_cache = OrderedDict()
+_index_cache_lock = threading.Lock()
+
+
+class ColumnIndex:
+    """Column positions and names resolved once for one header row and template."""
+
+    def __init__(self, columns, template):
+        self.columns = list(columns)
+        self.template = template
+        self.signature = header_signature(self.columns)
+
+        normalized = [_normalize(col) for col in self.columns]
+        self.positions = {role: _resolve(normalized, spec) for role, spec in template.roles.items()}
+        self.names = {role: (self.columns[idx] if idx is not None else None)
+                      for role, idx in self.positions.items()}
+
+        scenario = self.positions.get('sep_scenario')
+        if scenario is None:
+            self.target_positions = []
+        else:
+            end = len(self.columns) if template.target_count is None else scenario + 1 + template.target_count
+            self.target_positions = list(range(scenario + 1, min(end, len(self.columns))))
+        self.target_names = [self.columns[idx] for idx in self.target_positions]
+
+    @property
+    def scenario_position(self):
+        return self.positions.get('sep_scenario')
+
+    @property
+    def projected_positions(self):
+        """Every column position validation reads, in sheet order."""
+        resolved = {idx for idx in self.positions.values() if idx is not None}
+        return sorted(resolved | set(self.target_positions))
+
+    def missing_roles(self, roles=REQUIRED_ROLES):
+        return [role for role in roles if self.positions.get(role) is None]
+
+    def has_all_targets(self):
+        count = self.template.target_count
+        return bool(self.target_positions) and (count is None or len(self.target_positions) == count)
+
+
+def header_signature(columns):
+    """Hash of a cleaned header row, identifying a template version."""
+    return hashlib.sha1('\x1f'.join(str(col) for col in columns).encode('utf-8')).hexdigest()
+
+
+def column_index_for(columns, template=COMPUTE_TEMPLATE):
+    """Resolve (or fetch the cached) ColumnIndex for a header row."""
+    key = (template.name, header_signature(columns))
+    with _index_cache_lock:
+        index = _index_cache.get(key)
+        if index is not None:
+            _index_cache.move_to_end(key)
+            return index
+
+    index = ColumnIndex(columns, template)
+    with _index_cache_lock:
+        _index_cache[key] = index
+        while len(_index_cache) > INDEX_CACHE_SIZE:
+            _index_cache.popitem(last=False)
+    return index
+
+
+def _normalize(name):
+    return ' '.join(str(name).split()).lower()
+
+
+def _resolve(normalized, spec):
+    # 1. Header name, then aliases, in order of preference
+    for candidate in spec.get('names', []):
+        candidate = _normalize(candidate)
+        if candidate in normalized:
+            return normalized.index(candidate)
+    # 2. Part of a header name
+    for candidate in spec.get('contains', []):
+        candidate = candidate.lower()
+        for idx, name in enumerate(normalized):
+            if candidate in name:
+                return idx
+    # 3. Fixed position of the original template
+    position = spec.get('position')
+    if position is not None and position < len(normalized):
+        return position
+    return None
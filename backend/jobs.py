@@ -0,0 +1,317 @@
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from worker_pool import mark_worker_process
+
+
+# Job states
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+
+
+class QueueFullError(Exception):
+    """Raised when the number of pending validations has reached the queue depth."""
+
+
+class Job:
+    """A validation submitted to the worker pool and tracked by id."""
+
+    def __init__(self, job_id, input_path, report_path, cache_key=None):
+        self.job_id = job_id
+        self.input_path = input_path
+        self.report_path = report_path
+        self.cache_key = cache_key
+        self.status = QUEUED
+        self.progress = 0
+        self.stage = 'queued'
+        # Units done and total (rows, tabs) of the current stage, when it reports them
+        self.stage_done = None
+        self.stage_total = None
+        # Incremented on every change, so progress streams can wait for the next one
+        self.version = 0
+        self.error = None
+        self.error_status = None
+        self.message = None
+        self.stats = None
+        self.created_at = time.time()
+        self.finished_at = None
+
+    @property
+    def finished(self):
+        return self.status in (SUCCEEDED, FAILED)
+
+    def to_dict(self):
+        return {
+            'job_id': self.job_id,
+            'status': self.status,
+            'progress': self.progress,
+            'stage': self.stage,
+            'stage_done': self.stage_done,
+            'stage_total': self.stage_total,
+            'message': self.message,
+            'error': self.error,
+            'stats': self.stats,
+        }
+
+
+# Worker process side ---------------------------------------------------------
+
+_progress_queue = None
+
+
+def _init_worker(progress_queue):
+    global _progress_queue
+    _progress_queue = progress_queue
+    mark_worker_process()
+
+
+def _report_progress(job_id, progress, stage, done=None, total=None):
+    if _progress_queue is not None:
+        _progress_queue.put((job_id, progress, stage, done, total))
+
+
+def _run_validation(job_id, input_path, report_path, digest=None):
+    """
+    Parse, check and validate one uploaded workbook in a worker process.
+    Returns (success, message, stats, http_status, measurements, row_index);
+    measurements holds the stage timings ('parse_seconds', 'report_seconds') and the
+    structure error code ('structure_error') of the stages that ran, for the parent's
+    metrics, and row_index the report's findings (delta.RowIndex bytes, or None), so
+    the report can be named as a later upload's ?previous=. digest is the upload's
+    cache digest (see app.upload_digest_for; the saved upload's name has a prefix).
+    """
+    from validator import generate_validation_report
+    from columnar_cache import load_workbook
+    from delta import DeltaRun
+    from progress import ProgressReporter
+
+    measurements = {}
+    # Stage progress (throttled) goes to the parent through the progress queue
+    progress = ProgressReporter(
+        lambda stage, done, total, percent: _report_progress(job_id, percent, stage, done, total)
+    )
+    # The pool already runs one job per core: this job's own work stays in this process
+    started = time.perf_counter()
+    workbook = load_workbook(input_path, digest, progress=progress, max_workers=1)
+    measurements['parse_seconds'] = time.perf_counter() - started
+
+    problem = workbook.check_structure()
+    if problem:
+        measurements['structure_error'] = problem[0]
+        return False, problem[1], None, 400, measurements, None
+
+    started = time.perf_counter()
+    delta = DeltaRun()
+    success, message, stats = generate_validation_report(workbook, report_path, max_workers=1, progress=progress,
+                                                         delta=delta)
+    measurements['report_seconds'] = time.perf_counter() - started
+    row_index = delta.index.to_bytes() if success and delta.index is not None else None
+    return success, message, stats, 200 if success else 500, measurements, row_index
+
+
+# Parent process side ---------------------------------------------------------
+
+class JobManager:
+    """
+    Runs validations on a bounded ProcessPoolExecutor.
+    pandas/openpyxl parsing and formatting is CPU bound, so separate processes are
+    needed to use more than one core. Submissions beyond max_pending (queued plus
+    running jobs) are rejected with QueueFullError so callers can apply backpressure.
+    A pool broken by a worker that died (e.g. killed for memory) is replaced by a new
+    one on the next submission.
+    """
+
+    def __init__(self, max_workers, max_pending, ttl_seconds=3600):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.ttl_seconds = ttl_seconds
+        self._jobs = {}
+        self._lock = threading.Lock()
+        # Notified whenever a job changes (see wait_for_change)
+        self._changed = threading.Condition(self._lock)
+        self._executor = None
+        self._progress_queue = None
+        self._executor_lock = threading.Lock()
+
+    def _get_executor(self):
+        # Created lazily so importing the app doesn't spawn worker processes
+        with self._executor_lock:
+            if self._executor is None:
+                context = multiprocessing.get_context('spawn')
+                self._progress_queue = context.Queue()
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=context,
+                    initializer=_init_worker,
+                    initargs=(self._progress_queue,),
+                )
+                threading.Thread(target=self._drain_progress, args=(self._progress_queue,), daemon=True).start()
+            return self._executor
+
+    def _discard_executor(self, executor):
+        """Drop a broken pool (and its progress queue) so the next submission starts a new one."""
+        with self._executor_lock:
+            if self._executor is not executor:
+                return
+            progress_queue = self._progress_queue
+            self._executor = None
+            self._progress_queue = None
+        executor.shutdown(wait=False)
+        # Stops that pool's drain thread
+        progress_queue.put(None)
+
+    def _drain_progress(self, progress_queue):
+        while True:
+            item = progress_queue.get()
+            if item is None:
+                return
+            job_id, progress, stage, done, total = item
+            with self._lock:
+                job = self._jobs.get(job_id)
+                if job is not None and not job.finished:
+                    job.status = RUNNING
+                    job.progress = progress
+                    job.stage = stage
+                    job.stage_done = done
+                    job.stage_total = total
+                    job.version += 1
+                    self._changed.notify_all()
+
+    def pending_count(self):
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if not job.finished)
+
+    def submit(self, input_path, report_path, cache_key=None, on_success=None, on_finished=None, digest=None):
+        """
+        Queue a validation. on_success(job, report_bytes, stats, row_index) is called in
+        the parent once the report has been generated (e.g. to populate the report cache
+        and the row indexes; row_index may be None), and
+        on_finished(job, measurements) once the job has finished, however it ended
+        (e.g. to record metrics; measurements as returned by _run_validation).
+        digest keys the parsed workbook in the columnar cache (computed from the file
+        when not given).
+        """
+        self._prune()
+        with self._lock:
+            pending = sum(1 for job in self._jobs.values() if not job.finished)
+            if pending >= self.max_pending:
+                raise QueueFullError(f"{pending} validations are already pending.")
+            job = Job(uuid.uuid4().hex, input_path, report_path, cache_key)
+            self._jobs[job.job_id] = job
+
+        executor = None
+        try:
+            executor = self._get_executor()
+            try:
+                future = executor.submit(_run_validation, job.job_id, input_path, report_path, digest)
+            except BrokenProcessPool:
+                # A worker died since the last job: retry once on a new pool
+                self._discard_executor(executor)
+                executor = self._get_executor()
+                future = executor.submit(_run_validation, job.job_id, input_path, report_path, digest)
+        except Exception as e:
+            if isinstance(e, BrokenProcessPool) and executor is not None:
+                self._discard_executor(executor)
+            self._finish(job, False, f"Could not start validation: {str(e)}", None, 500)
+            _remove(input_path)
+            if on_finished is not None:
+                on_finished(job, {})
+            return job
+
+        future.add_done_callback(lambda f: self._on_done(job, f, on_success, on_finished, executor))
+        return job
+
+    def add_finished(self, report_path, report_bytes, stats, cache_key=None):
+        """Register an already available report (e.g. a cache hit) as a finished job."""
+        self._prune()
+        with open(report_path, 'wb') as f:
+            f.write(report_bytes)
+        job = Job(uuid.uuid4().hex, None, report_path, cache_key)
+        with self._lock:
+            self._jobs[job.job_id] = job
+        self._finish(job, True, f"Generated {stats.get('total_records', 0)} records.", stats, 200)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def wait_for_change(self, job_id, version, timeout):
+        """
+        Wait up to timeout seconds for the job to change after version (its version when
+        last seen). Returns (job, its current version); job is None for unknown job ids.
+        """
+        with self._changed:
+            self._changed.wait_for(lambda: self._version(job_id) != version, timeout)
+            job = self._jobs.get(job_id)
+            return job, self._version(job_id)
+
+    def _version(self, job_id):
+        job = self._jobs.get(job_id)
+        return job.version if job is not None else None
+
+    def _on_done(self, job, future, on_success, on_finished, executor):
+        try:
+            success, message, stats, http_status, measurements, row_index = future.result()
+        except BrokenProcessPool as e:
+            # The worker running this (or another) job died: later jobs get a new pool
+            self._discard_executor(executor)
+            success, message, stats, http_status, measurements, row_index = (
+                False, f"Processing error: {str(e)}", None, 500, {}, None)
+        except Exception as e:
+            success, message, stats, http_status, measurements, row_index = (
+                False, f"Processing error: {str(e)}", None, 500, {}, None)
+
+        if success and on_success is not None:
+            try:
+                with open(job.report_path, 'rb') as f:
+                    on_success(job, f.read(), stats, row_index)
+            except OSError:
+                pass
+        self._finish(job, success, message, stats, http_status)
+
+        # The upload is no longer needed once the job has finished
+        _remove(job.input_path)
+        if on_finished is not None:
+            on_finished(job, measurements)
+
+    def _finish(self, job, success, message, stats, http_status):
+        with self._lock:
+            job.status = SUCCEEDED if success else FAILED
+            job.progress = 100
+            job.stage = 'done'
+            job.stage_done = None
+            job.stage_total = None
+            job.message = message if success else None
+            job.error = None if success else message
+            job.error_status = None if success else http_status
+            job.stats = stats
+            job.finished_at = time.time()
+            job.version += 1
+            self._changed.notify_all()
+
+    def _prune(self):
+        """Forget finished jobs (and delete their files) once they are older than the TTL."""
+        cutoff = time.time() - self.ttl_seconds
+        with self._lock:
+            expired = [job for job in self._jobs.values() if job.finished and job.finished_at < cutoff]
+            for job in expired:
+                del self._jobs[job.job_id]
+        for job in expired:
+            _remove(job.input_path)
+            _remove(job.report_path)
+
+
+def _remove(path):
+    if path and os.path.exists(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,93 @@
+import gzip
+import json
+
+
+# Bounded fields sent with every report in the X-Report-Stats header: everything
+# the dashboard shows except the BAN breakdown (one entry per BAN), which is paged
+# through the stats resource. The header is the only copy the client is sure to
+# get: the stats resource is a cache entry, which can be evicted or live on another
+# instance. 'changes' (counts only) is present for delta reports and 'batch'
+# (workbook counts) for batch reports.
+SUMMARY_FIELDS = ['total_records', 'unique_sbg_count', 'unique_ban_count', 'unique_categories',
+                  'sbg_list', 'category_list', 'sbg_breakdown', 'category_breakdown', 'category_details',
+                  'changes', 'batch']
+
+STATS_FORMATS = ('json', 'columnar')
+
+# Bodies smaller than this aren't worth compressing
+GZIP_MIN_BYTES = 1024
+
+
+def normalize_stats(stats):
+    """
+    The statistics as they read back from JSON: breakdown keys (e.g. numeric BANs)
+    as strings. Reports are cached with JSON stats files, so statistics are
+    normalised when computed and a cache hit returns the same ones as a fresh run.
+    """
+    return json.loads(json.dumps(stats))
+
+
+def summarize_stats(stats):
+    """The report statistics without the BAN breakdown."""
+    return {field: stats[field] for field in SUMMARY_FIELDS if field in stats}
+
+
+def stats_header(stats):
+    """Value of the X-Report-Stats header: the summary as compact JSON."""
+    return json.dumps(summarize_stats(stats), separators=(',', ':'))
+
+
+def parse_stats_args(args):
+    """
+    Read offset, limit and format from the request query string.
+    Returns (offset, limit, fmt); raises ValueError with a user-facing message.
+    """
+    try:
+        offset = int(args.get('offset', 0))
+        limit = args.get('limit')
+        limit = int(limit) if limit not in (None, '') else None
+    except ValueError:
+        raise ValueError("offset and limit must be integers")
+    if offset < 0 or (limit is not None and limit < 0):
+        raise ValueError("offset and limit must not be negative")
+
+    fmt = args.get('format', 'json')
+    if fmt not in STATS_FORMATS:
+        raise ValueError(f"Unknown format '{fmt}'. Use one of: {', '.join(STATS_FORMATS)}")
+    return offset, limit, fmt
+
+
+def stats_page(stats, offset=0, limit=None, fmt='json'):
+    """
+    Full statistics with one page of ban_breakdown (in its sorted order).
+    'columnar' lists the BAN breakdown as parallel arrays rather than an object.
+    """
+    bans = list(stats.get('ban_breakdown', {}).items())
+    end = len(bans) if limit is None else min(offset + limit, len(bans))
+    page = bans[offset:end]
+
+    body = dict(stats)
+    if fmt == 'columnar':
+        body['ban_breakdown'] = {'ban': [ban for ban, _ in page], 'records': [count for _, count in page]}
+    else:
+        body['ban_breakdown'] = dict(page)
+    body['ban_page'] = {
+        'offset': offset,
+        'limit': limit,
+        'total': len(bans),
+        'next_offset': end if end < len(bans) else None,
+    }
+    return body
+
+
+def encode_stats(body, accept_encoding=''):
+    """
+    Serialize a stats body, gzipped when the client accepts it and it's large enough.
+    Returns (payload, headers).
+    """
+    payload = json.dumps(body, separators=(',', ':')).encode('utf-8')
+    headers = {'Vary': 'Accept-Encoding'}
+    if 'gzip' in (accept_encoding or '').lower() and len(payload) >= GZIP_MIN_BYTES:
+        payload = gzip.compress(payload, compresslevel=6)
+        headers['Content-Encoding'] = 'gzip'
+    return payload, headers
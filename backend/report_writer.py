@@ -0,0 +1,162 @@
+from datetime import datetime
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, Alignment, PatternFill, Border, Side, NamedStyle
+from openpyxl.utils import get_column_letter
+
+from progress import NULL_PROGRESS, PROGRESS_STRIDE
+
+
+# Report layout (1-based column numbers)
+COLUMN_WIDTHS = [25, 12, 15, 35, 25, 30, 50]
+CENTER_COLUMNS = {1, 2, 3, 6}  # A, B, C, F
+LEFT_COLUMNS = {4, 5}  # D, E
+SCENARIO_COLUMN = 6  # F
+MISSING_COLUMN = 7  # G
+# Columns after G (e.g. 'Previously Missing', 'Workbook'): styled like G when
+# their header ends with 'Missing', otherwise like the left-aligned text columns
+EXTRA_MISSING_WIDTH = COLUMN_WIDTHS[MISSING_COLUMN - 1]
+EXTRA_TEXT_WIDTH = 35
+
+HEADER_ROW_HEIGHT = 40
+DEFAULT_ROW_HEIGHT = 30
+LINE_HEIGHT = 15
+
+# Same number format pandas uses when writing datetimes with to_excel
+DATETIME_FORMAT = 'YYYY-MM-DD HH:MM:SS'
+
+
+def report_styles():
+    """
+    Build the report style objects - All using Aptos font size 10.
+    Returned as a dict so the streaming writer and apply_formatting share one definition.
+    """
+    thin_side = Side(style='thin', color='D0D0D0')
+    return {
+        'header_fill': PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid"),
+        'header_font': Font(name="Aptos", bold=True, color="FFFFFF", size=10),
+        'header_alignment': Alignment(horizontal="center", vertical="center", wrap_text=True),
+        'light_fill': PatternFill(start_color="F2F2F2", end_color="F2F2F2", fill_type="solid"),
+        'white_fill': PatternFill(start_color="FFFFFF", end_color="FFFFFF", fill_type="solid"),
+        'tbd_fill': PatternFill(start_color="FFF2CC", end_color="FFF2CC", fill_type="solid"),
+        'tbd_font': Font(name="Aptos", bold=True, color="C65911", size=10),
+        'missing_fill': PatternFill(start_color="FFE6E6", end_color="FFE6E6", fill_type="solid"),
+        'missing_font': Font(name="Aptos", color="C00000", size=10),
+        'default_font': Font(name="Aptos", size=10),
+        'thin_border': Border(left=thin_side, right=thin_side, top=thin_side, bottom=thin_side),
+        'center_alignment': Alignment(horizontal="center", vertical="center", wrap_text=False),
+        'left_alignment': Alignment(horizontal="left", vertical="top", wrap_text=True),
+    }
+
+
+def _register_named_styles(wb):
+    """
+    Register one named style per distinct cell look, so each cell gets its
+    fill/font/border/alignment with a single assignment.
+    """
+    s = report_styles()
+    looks = {
+        'Report Header': (s['header_fill'], s['header_font'], s['header_alignment']),
+        'Report TBD': (s['tbd_fill'], s['tbd_font'], s['center_alignment']),
+        'Report Missing': (s['missing_fill'], s['missing_font'], s['left_alignment']),
+    }
+    for band, fill in (('Light', s['light_fill']), ('White', s['white_fill'])):
+        looks[f'Report Center {band}'] = (fill, s['default_font'], s['center_alignment'])
+        looks[f'Report Left {band}'] = (fill, s['default_font'], s['left_alignment'])
+
+    for name, (fill, font, alignment) in looks.items():
+        if name not in wb.named_styles:
+            wb.add_named_style(NamedStyle(name=name, fill=fill, font=font,
+                                          alignment=alignment, border=s['thin_border']))
+
+
+def write_report(report_df, output, sheet_name='Compute'):
+    """
+    Write report_df as a fully formatted report in one streaming pass.
+    output may be a path or a writable binary stream.
+    """
+    write_reports([(sheet_name, report_df)], output)
+
+
+def write_reports(sheets, output, progress=NULL_PROGRESS):
+    """
+    Write several (sheet_name, report_df) pairs as formatted sheets of one workbook.
+    progress gets the 'write' stage (rows written over all sheets) and then 'save'.
+    """
+    wb = Workbook(write_only=True)
+    progress.start('write', sum(len(report_df) for _, report_df in sheets))
+    written = 0
+    for sheet_name, report_df in sheets:
+        add_report_sheet(wb, report_df, sheet_name, progress, written)
+        written += len(report_df)
+    progress.start('save')
+    wb.save(output)
+
+
+def add_report_sheet(wb, report_df, sheet_name, progress=NULL_PROGRESS, rows_before=0):
+    """
+    Append a formatted report sheet to a write-only workbook: banded rows,
+    highlighted TBD scenarios, wrapped 'Columns Missing' text and a frozen header.
+    Styles are applied as each row is written, so the workbook is never reloaded.
+    progress is updated with rows_before plus the rows of this sheet written so far.
+    """
+    _register_named_styles(wb)
+    ws = wb.create_sheet(sheet_name)
+
+    extra_missing = {idx for idx, name in enumerate(report_df.columns, start=1)
+                     if idx > MISSING_COLUMN and str(name).endswith('Missing')}
+    left_columns = LEFT_COLUMNS | set(range(MISSING_COLUMN + 1, len(report_df.columns) + 1)) - extra_missing
+
+    # Column widths and panes must be set before the first row is written
+    widths = list(COLUMN_WIDTHS)
+    for idx in range(MISSING_COLUMN + 1, len(report_df.columns) + 1):
+        widths.append(EXTRA_MISSING_WIDTH if idx in extra_missing else EXTRA_TEXT_WIDTH)
+    for idx, width in enumerate(widths, start=1):
+        ws.column_dimensions[get_column_letter(idx)].width = width
+    ws.freeze_panes = 'A2'
+
+    # Header row
+    ws.row_dimensions[1].height = HEADER_ROW_HEIGHT
+    ws.append([_styled_cell(ws, str(name), 'Report Header') for name in report_df.columns])
+
+    row_idx = 1
+    for values in report_df.itertuples(index=False, name=None):
+        row_idx += 1
+        if not row_idx % PROGRESS_STRIDE:
+            progress.update(rows_before + row_idx - 1)
+        band = 'Light' if row_idx % 2 == 0 else 'White'
+        row_height = DEFAULT_ROW_HEIGHT
+
+        cells = []
+        for col_idx, value in enumerate(values, start=1):
+            if col_idx in CENTER_COLUMNS:
+                if col_idx == SCENARIO_COLUMN and str(value).strip().upper() == 'TBD':
+                    style = 'Report TBD'
+                else:
+                    style = f'Report Center {band}'
+            elif col_idx in left_columns:
+                style = f'Report Left {band}'
+            else:
+                style = 'Report Missing'
+                # Calculate row height based on line breaks
+                if value:
+                    line_count = str(value).count('\n') + 1
+                    if line_count > 1:
+                        row_height = max(LINE_HEIGHT * line_count, row_height)
+            cells.append(_styled_cell(ws, value, style))
+
+        # Row dimensions are read when the row is written; drop them afterwards
+        # so memory stays flat however long the report is
+        ws.row_dimensions[row_idx].height = row_height
+        ws.append(cells)
+        del ws.row_dimensions[row_idx]
+
+
+def _styled_cell(ws, value, style):
+    cell = WriteOnlyCell(ws)
+    cell.style = style
+    cell.value = value
+    if isinstance(value, datetime):
+        cell.number_format = DATETIME_FORMAT
+    return cell
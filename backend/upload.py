@@ -0,0 +1,130 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from io import BytesIO
+
+from flask import Request
+from werkzeug.exceptions import RequestEntityTooLarge
+
+
+# Uploads up to this size stay in memory; larger ones are spooled to a temp file
+UPLOAD_SPOOL_THRESHOLD = 32 * 1024 * 1024
+MAX_UPLOAD_BYTES = 100 * 1024 * 1024
+# Requests announcing more than this (the file plus the multipart envelope) are
+# rejected before their body is read
+MAX_REQUEST_BYTES = MAX_UPLOAD_BYTES + 64 * 1024
+
+UPLOAD_TOO_LARGE_MESSAGE = f"The uploaded file is too large. The maximum size is {MAX_UPLOAD_BYTES // (1024 * 1024)} MB."
+
+
+class SpooledUpload:
+    """
+    One uploaded file, written once as it is received.
+    The bytes are kept in memory up to spool_threshold and moved to a temp file
+    beyond it, hashed (SHA-256) on the fly and rejected with a 413 as soon as
+    they exceed max_bytes. The parser is handed the buffer or the temp file's
+    path directly, so a request holds about one copy of the upload.
+    """
+
+    def __init__(self, max_bytes=MAX_UPLOAD_BYTES, spool_threshold=UPLOAD_SPOOL_THRESHOLD, directory=None):
+        self.max_bytes = max_bytes
+        self.spool_threshold = spool_threshold
+        self.directory = directory
+        self.size = 0
+        self.path = None
+        self._hash = hashlib.sha256()
+        self._file = BytesIO()
+
+    @property
+    def digest(self):
+        """SHA-256 hex digest of the bytes written so far."""
+        return self._hash.hexdigest()
+
+    @property
+    def in_memory(self):
+        return self.path is None
+
+    def write(self, data):
+        self.size += len(data)
+        if self.max_bytes is not None and self.size > self.max_bytes:
+            # The form parser drops this stream without closing it: remove the spool file now
+            self.close()
+            raise RequestEntityTooLarge(UPLOAD_TOO_LARGE_MESSAGE)
+        self._hash.update(data)
+        if self.in_memory and self.size > self.spool_threshold:
+            self._rollover()
+        return self._file.write(data)
+
+    def _rollover(self):
+        fd, path = tempfile.mkstemp(prefix='upload_', suffix='.spool', dir=self.directory)
+        spooled = os.fdopen(fd, 'w+b')
+        spooled.write(self._file.getbuffer())
+        self._file = spooled
+        self.path = path
+
+    def source(self):
+        """
+        The upload in the form the workbook parser takes: the temp file's path once
+        spooled to disk, otherwise the in-memory buffer itself (not a copy).
+        """
+        if self.in_memory:
+            self._file.seek(0)
+            return self._file
+        self._file.flush()
+        return self.path
+
+    def persist(self, path):
+        """Keep the upload at path (e.g. for a background job) and return path."""
+        if self.in_memory:
+            with open(path, 'wb') as f:
+                f.write(self._file.getbuffer())
+        else:
+            self._file.close()
+            shutil.move(self.path, path)
+            self.path = None
+            self._file = BytesIO()
+        return path
+
+    # File-like interface used by werkzeug's form parser and FileStorage
+
+    def read(self, size=-1):
+        return self._file.read(size)
+
+    def readline(self, size=-1):
+        return self._file.readline(size)
+
+    def seek(self, offset, whence=0):
+        return self._file.seek(offset, whence)
+
+    def tell(self):
+        return self._file.tell()
+
+    def readable(self):
+        return True
+
+    def writable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def close(self):
+        self._file.close()
+        if self.path is not None:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+            self.path = None
+
+
+class UploadRequest(Request):
+    """Flask request whose uploaded files are received into SpooledUploads."""
+
+    upload_max_bytes = MAX_UPLOAD_BYTES
+    upload_spool_threshold = UPLOAD_SPOOL_THRESHOLD
+    upload_directory = None
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return SpooledUpload(self.upload_max_bytes, self.upload_spool_threshold, self.upload_directory)
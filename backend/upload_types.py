@@ -0,0 +1,44 @@
+import os
+
+
+# Accepted uploads: an Excel workbook, or delimited-text tabs zipped one file per tab
+# (Compute.csv, README-Glossary.csv, Storage.tsv, ...; see csv_reader.py). The zip
+# and each file in it may also be gzip-compressed (Compute.csv.gz). A single
+# delimited file is not accepted: it holds one tab, and validation needs at least
+# README-Glossary and Compute. No pandas here: the Vercel function checks upload
+# names before it imports the validation modules.
+WORKBOOK_EXTENSIONS = ('.xlsx', '.xls')
+DELIMITED_EXTENSIONS = ('.csv', '.tsv', '.txt')
+BUNDLE_EXTENSION = '.zip'
+GZIP_EXTENSION = '.gz'
+
+INVALID_FORMAT_MESSAGE = ("Invalid file format. Please upload an Excel file (.xlsx or .xls) "
+                          "or a zip of one CSV file per tab")
+SINGLE_TAB_MESSAGE = ("A single CSV/TSV file holds only one tab, but validation needs the README-Glossary "
+                      "and Compute tabs. Please upload a zip of one CSV file per tab "
+                      "(README-Glossary.csv, Compute.csv, ...) or the Excel workbook")
+
+
+def _without_gzip(filename):
+    name = os.path.basename(filename).lower()
+    return name[:-len(GZIP_EXTENSION)] if name.endswith(GZIP_EXTENSION) else name
+
+
+def is_delimited_name(filename):
+    """Whether a file name denotes delimited text (or a zip or gzip of it) rather than a workbook."""
+    name = _without_gzip(filename)
+    return name.endswith(DELIMITED_EXTENSIONS) or name.endswith(BUNDLE_EXTENSION)
+
+
+def is_bundle_name(filename):
+    """Whether a file name denotes a zip of delimited-text tabs (optionally gzip-compressed)."""
+    return _without_gzip(filename).endswith(BUNDLE_EXTENSION)
+
+
+def upload_name_error(filename):
+    """The user-facing message for an upload name that isn't accepted, or None."""
+    if os.path.splitext(filename)[1].lower() in WORKBOOK_EXTENSIONS or is_bundle_name(filename):
+        return None
+    if is_delimited_name(filename):
+        return SINGLE_TAB_MESSAGE
+    return INVALID_FORMAT_MESSAGE
@@ -0,0 +1,706 @@
+import itertools
+import os
+import zipfile
+from collections import defaultdict, deque
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+from openpyxl.cell.cell import ERROR_CODES
+
+from column_index import column_index_for, COMPUTE_TEMPLATE
+from glossary_cache import glossary_cache, sheet_fingerprint
+from xlsx_reader import CellDecoder, UnsupportedSheetXML, iter_row_blocks, header_end
+from csv_reader import DelimitedBundle, DelimitedInputError, delimited_source
+from progress import NULL_PROGRESS, PROGRESS_STRIDE
+from worker_pool import shared_pool, worker_count, POOL_ERRORS
+
+
+GLOSSARY_SHEET = 'README-Glossary'
+COMPUTE_SHEET = 'Compute'
+REQUIRED_SHEETS = [GLOSSARY_SHEET, COMPUTE_SHEET]
+
+# Header rows (0-based, as passed to pandas): glossary header is on row 7, Compute on row 6
+GLOSSARY_HEADER_ROW = 6
+COMPUTE_HEADER_ROW = 5
+# Other inventory tabs described in the glossary share the Compute layout
+TAB_HEADER_ROW = COMPUTE_HEADER_ROW
+
+REQUIRED_GLOSSARY_COLUMNS = ['Tab Name', 'Column Name']
+MIN_COMPUTE_COLUMNS = 24
+
+# Error codes returned by ParsedWorkbook.check_structure()
+STRUCTURE_ERROR_CODES = ('unreadable_file', 'missing_sheets', 'glossary_unreadable', 'glossary_columns',
+                         'compute_unreadable', 'compute_columns')
+
+# Workbook readers: 'streaming' reads Compute row by row with openpyxl (xlsx only),
+# keeping only the projected columns of 'TBD' rows; 'pandas' parses the whole sheet;
+# 'xml' (opt-in) decodes the sheet's XML part directly (see xlsx_reader.py), in blocks
+# of rows decoded by worker processes, keeping the same rows and columns as 'streaming'
+READERS = ('streaming', 'pandas', 'xml')
+DEFAULT_READER = 'streaming'
+
+# Report columns with few distinct values (a few dozen SBGs across thousands of
+# servers), held as categoricals from read time so that the 'TBD' filter, fillna
+# and the statistics' grouping work on integer codes
+CATEGORICAL_ROLES = ('sbg', 'ban', 'app_name', 'sep_scenario')
+
+# Sheet XML is read from the zip in blocks of rows: smaller ones when decoded here,
+# larger ones (worth the round trip) when sent to worker processes
+XML_BLOCK_BYTES = 1024 * 1024
+XML_CHUNK_MIN_BYTES = 4 * 1024 * 1024
+
+# Cell values pandas treats as missing when reading Excel (its documented default
+# na_values), plus openpyxl error codes
+_PANDAS_NA_VALUES = frozenset([
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+    '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null',
+])
+_NA_VALUES = _PANDAS_NA_VALUES | frozenset(ERROR_CODES)
+
+
+class ParsedWorkbook:
+    """
+    An uploaded Combined Data File parsed once per request.
+    The sheets needed for validation are read into DataFrames up front so that the
+    structure check and the report generator work on the same in-memory frames.
+    """
+
+    def __init__(self, sheet_names=None, glossary=None, compute=None, compute_columns=None,
+                 read_error=None, glossary_error=None, compute_error=None, source=None, reader=DEFAULT_READER):
+        # Kept so that other tabs can be read later (e.g. by worker processes) the same way
+        self.source = source
+        self.reader = reader
+        self.sheet_names = sheet_names or []
+        # The glossary DataFrame is None when the glossary came from the glossary cache;
+        # glossary_header (its column names) and glossary_columns (the valid columns of
+        # each tab, once the required columns are present) are always set
+        self.glossary = glossary
+        self.glossary_header = list(glossary.columns) if glossary is not None else None
+        self.glossary_columns = None
+        # Content fingerprint of the README-Glossary sheet (None for .xls files)
+        self.glossary_key = None
+        # With the streaming and xml readers, compute holds only the projected columns of the
+        # 'TBD' rows; compute_columns is always the full (cleaned) header of the sheet
+        self.compute = compute
+        self.compute_columns = compute_columns
+        # Where the validator's columns are in Compute, resolved from its header row
+        self.compute_index = None
+        self.read_error = read_error
+        # Set (to a message for the user) for delimited-text uploads that can't be unpacked
+        self.input_error = None
+        self.glossary_error = glossary_error
+        self.compute_error = compute_error
+
+    @classmethod
+    def load(cls, source, reader=DEFAULT_READER, max_workers=None, progress=NULL_PROGRESS):
+        """
+        Parse the workbook from a path, bytes or a binary file-like object, or the tabs
+        of a delimited-text upload (a csv_reader.DelimitedBundle, or the path of one).
+        Never raises: read problems are recorded and reported by check_structure().
+        The streaming and xml readers fall back to pandas for files openpyxl can't open (.xls).
+        The xml reader decodes Compute in up to max_workers worker processes (default:
+        one per CPU; 1 inside a worker process) while the glossary is read in this process.
+        progress (a progress.ProgressReporter) gets the 'parse' stage: Compute rows read.
+        """
+        if reader not in READERS:
+            raise ValueError(f"Unknown workbook reader '{reader}'. Expected one of: {', '.join(READERS)}")
+
+        try:
+            bundle = delimited_source(source)
+        except DelimitedInputError as e:
+            workbook = cls(read_error=str(e))
+            workbook.input_error = str(e)
+            return workbook
+        if bundle is not None:
+            return cls._load_delimited(bundle, reader, progress)
+
+        if isinstance(source, (bytes, bytearray)):
+            source = BytesIO(source)
+        try:
+            excel_file = pd.ExcelFile(source)
+        except Exception as e:
+            return cls(read_error=str(e))
+
+        with excel_file:
+            workbook = cls(sheet_names=excel_file.sheet_names, source=source, reader=reader)
+            if workbook.missing_sheets():
+                return workbook
+
+            compute_xml = None
+            if reader == 'xml' and excel_file.engine == 'openpyxl':
+                compute_xml = start_compute_xml(source, excel_file.book[COMPUTE_SHEET], max_workers, progress)
+
+            # The glossary rarely changes between uploads: once parsed, it is found by
+            # the fingerprint of its sheet and not parsed again
+            if excel_file.engine == 'openpyxl':
+                workbook.glossary_key = sheet_fingerprint(source, GLOSSARY_SHEET)
+            cached = glossary_cache.get(workbook.glossary_key) if workbook.glossary_key else None
+            if cached is not None:
+                workbook.glossary_header, workbook.glossary_columns = cached
+            else:
+                try:
+                    workbook.glossary = excel_file.parse(GLOSSARY_SHEET, header=GLOSSARY_HEADER_ROW)
+                    workbook.glossary_header = list(workbook.glossary.columns)
+                    if all(col in workbook.glossary_header for col in REQUIRED_GLOSSARY_COLUMNS):
+                        workbook.glossary_columns = glossary_columns_by_tab(workbook.glossary)
+                    if workbook.glossary_key:
+                        glossary_cache.put(workbook.glossary_key,
+                                           (workbook.glossary_header, workbook.glossary_columns))
+                except Exception as e:
+                    workbook.glossary_error = str(e)
+
+            try:
+                if compute_xml is not None:
+                    workbook.compute, workbook.compute_columns, workbook.compute_index = compute_xml()
+                elif reader == 'streaming' and excel_file.engine == 'openpyxl':
+                    workbook.compute, workbook.compute_columns, workbook.compute_index = read_compute_streaming(
+                        excel_file.book[COMPUTE_SHEET], progress
+                    )
+                else:
+                    progress.start('parse')
+                    df_compute = excel_file.parse(COMPUTE_SHEET, header=COMPUTE_HEADER_ROW)
+                    # Clean column names once
+                    df_compute.columns = df_compute.columns.astype(str).str.strip()
+                    workbook.compute = df_compute
+                    workbook.compute_columns = df_compute.columns.tolist()
+                    workbook.compute_index = column_index_for(workbook.compute_columns, COMPUTE_TEMPLATE)
+                categorize(workbook.compute, workbook.compute_index.names)
+            except Exception as e:
+                workbook.compute_error = str(e)
+
+        return workbook
+
+    @classmethod
+    def _load_delimited(cls, bundle, reader, progress):
+        """
+        load() for delimited-text tabs: the glossary is read whole; Compute is read in
+        chunks keeping the projected columns of 'TBD' rows, except with the pandas reader.
+        """
+        workbook = cls(sheet_names=bundle.sheet_names, source=bundle, reader=reader)
+        if workbook.missing_sheets():
+            return workbook
+
+        try:
+            workbook.glossary = bundle.read_frame(GLOSSARY_SHEET, GLOSSARY_HEADER_ROW)
+            workbook.glossary_header = list(workbook.glossary.columns)
+            if all(col in workbook.glossary_header for col in REQUIRED_GLOSSARY_COLUMNS):
+                workbook.glossary_columns = glossary_columns_by_tab(workbook.glossary)
+        except Exception as e:
+            workbook.glossary_error = str(e)
+
+        try:
+            if reader == 'pandas':
+                progress.start('parse')
+                df_compute = bundle.read_frame(COMPUTE_SHEET, COMPUTE_HEADER_ROW)
+                df_compute.columns = df_compute.columns.astype(str).str.strip()
+                workbook.compute = df_compute
+                workbook.compute_columns = df_compute.columns.tolist()
+                workbook.compute_index = column_index_for(workbook.compute_columns, COMPUTE_TEMPLATE)
+            else:
+                workbook.compute, workbook.compute_columns, workbook.compute_index = read_compute_delimited(
+                    bundle, progress
+                )
+            categorize(workbook.compute, workbook.compute_index.names)
+        except Exception as e:
+            workbook.compute_error = str(e)
+
+        return workbook
+
+    def to_state(self):
+        """
+        What was parsed, for the columnar cache (see columnar_cache.py): the sheet names,
+        the glossary's header and columns per tab, and the Compute frame and header.
+        """
+        return {
+            'reader': self.reader,
+            'sheet_names': self.sheet_names,
+            'glossary_header': self.glossary_header,
+            'glossary_columns': self.glossary_columns,
+            'glossary_key': self.glossary_key,
+            'compute': self.compute,
+            'compute_columns': self.compute_columns,
+        }
+
+    @classmethod
+    def from_state(cls, state, source=None):
+        """The workbook as it was parsed from source (see to_state), without parsing it again."""
+        workbook = cls(sheet_names=state['sheet_names'], compute=state['compute'],
+                       compute_columns=state['compute_columns'], source=source, reader=state['reader'])
+        workbook.glossary_header = state['glossary_header']
+        workbook.glossary_columns = state['glossary_columns']
+        workbook.glossary_key = state['glossary_key']
+        workbook.compute_index = column_index_for(workbook.compute_columns, COMPUTE_TEMPLATE)
+        return workbook
+
+    def worker_source(self):
+        """The source in a form that can be sent to a worker process (a path, the raw bytes or a DelimitedBundle)."""
+        if isinstance(self.source, (str, bytes, os.PathLike, DelimitedBundle)):
+            return self.source
+        if hasattr(self.source, 'getvalue'):
+            return self.source.getvalue()
+        self.source.seek(0)
+        return self.source.read()
+
+    def missing_sheets(self):
+        return [sheet for sheet in REQUIRED_SHEETS if sheet not in self.sheet_names]
+
+    def check_structure(self):
+        """
+        Validate that the workbook has the required structure.
+        Returns an (error_code, message) tuple if invalid, None if valid.
+        """
+        if self.input_error is not None:
+            return ('unreadable_file', self.input_error)
+        if self.read_error is not None:
+            return ('unreadable_file', f"Unable to read the Excel file. Please ensure it's a valid Excel file (.xlsx or .xls). Error: {self.read_error}")
+
+        missing_sheets = self.missing_sheets()
+        if missing_sheets:
+            return ('missing_sheets', f"Invalid file structure. Missing required sheet(s): {', '.join(missing_sheets)}. Please upload the correct Combined Data File.")
+
+        # Validate README-Glossary sheet structure
+        if self.glossary_header is None:
+            return ('glossary_unreadable', "Error reading 'README-Glossary' sheet. Please ensure the file format is correct. Header should be at row 7.")
+
+        missing_cols = [col for col in REQUIRED_GLOSSARY_COLUMNS if col not in self.glossary_header]
+        if missing_cols:
+            return ('glossary_columns', f"Invalid 'README-Glossary' sheet structure. Missing column(s): {', '.join(missing_cols)}. Please upload the correct file.")
+
+        # Validate Compute sheet structure
+        if self.compute is None:
+            return ('compute_unreadable', "Error reading 'Compute' sheet. Please ensure the file format is correct. Header should be at row 6.")
+
+        index = self.compute_index
+        if index.missing_roles() or not index.has_all_targets():
+            if len(self.compute_columns) < MIN_COMPUTE_COLUMNS:
+                return ('compute_columns', f"Invalid 'Compute' sheet structure. Expected at least {MIN_COMPUTE_COLUMNS} columns, found {len(self.compute_columns)}. Please upload the correct file.")
+            missing = index.missing_roles() or ['target columns after the separation scenario']
+            return ('compute_columns', f"Invalid 'Compute' sheet structure. Could not find column(s): {', '.join(missing)}. Please upload the correct file.")
+
+        return None
+
+
+def glossary_columns_by_tab(df_glossary):
+    """
+    Map each 'Tab Name' of the glossary to the set of its 'Column Name' values,
+    in the order the tabs are first listed.
+    """
+    # Keep only the required glossary columns
+    df_glossary = df_glossary[['Tab Name', 'Column Name']].copy()
+
+    # Clean Glossary Data
+    df_glossary['Tab Name'] = df_glossary['Tab Name'].astype(str).str.strip()
+    df_glossary['Column Name'] = df_glossary['Column Name'].astype(str).str.strip()
+
+    # Sets for O(1) lookup
+    columns_by_tab = {}
+    for tab, column in zip(df_glossary['Tab Name'].tolist(), df_glossary['Column Name'].tolist()):
+        if tab in ('', 'nan'):
+            continue
+        columns_by_tab.setdefault(tab, set()).add(column)
+    return columns_by_tab
+
+
+def categorize(df, names):
+    """
+    Convert the CATEGORICAL_ROLES columns of df (names maps roles to column names)
+    to categoricals, in place. Returns df.
+    """
+    for role in CATEGORICAL_ROLES:
+        column = names.get(role)
+        if column is not None and column in df.columns and not isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = df[column].astype('category')
+    return df
+
+
+def fill_na(series, value):
+    """series.fillna(value), also for categoricals that don't have value as a category yet."""
+    if isinstance(series.dtype, pd.CategoricalDtype) and value not in series.cat.categories and series.isna().any():
+        series = series.cat.add_categories([value])
+    return series.fillna(value)
+
+
+def read_compute_streaming(sheet, progress=NULL_PROGRESS):
+    """
+    Stream the Compute sheet, keeping the validator's columns of 'TBD' rows.
+    The columns are located through the header row's ColumnIndex.
+    Returns (DataFrame, cleaned header names, ColumnIndex).
+    """
+    resolved = {}
+
+    def select(header_columns):
+        resolved['index'] = index = column_index_for(header_columns, COMPUTE_TEMPLATE)
+        return index.projected_positions, index.scenario_position
+
+    df, columns = read_sheet_streaming(sheet, COMPUTE_HEADER_ROW, select, progress=progress)
+    return df, columns, resolved['index']
+
+
+def read_compute_delimited(bundle, progress=NULL_PROGRESS):
+    """
+    Read the Compute tab of a delimited-text upload in chunks, keeping the validator's
+    columns of 'TBD' rows, like read_compute_streaming.
+    Returns (DataFrame, cleaned header names, ColumnIndex).
+    """
+    resolved = {}
+
+    def select(header_columns):
+        resolved['index'] = index = column_index_for(header_columns, COMPUTE_TEMPLATE)
+        return index.projected_positions, index.scenario_position
+
+    df, columns = bundle.read_projected(COMPUTE_SHEET, COMPUTE_HEADER_ROW, select, progress=progress)
+    return df, columns, resolved['index']
+
+
+def start_compute_xml(source, sheet, max_workers=None, progress=NULL_PROGRESS):
+    """
+    Start decoding the Compute sheet with the xml reader (see start_sheet_xml).
+    Returns a function that waits for (DataFrame, cleaned header names, ColumnIndex).
+    """
+    resolved = {}
+
+    def select(header_columns):
+        resolved['index'] = index = column_index_for(header_columns, COMPUTE_TEMPLATE)
+        return index.projected_positions, index.scenario_position
+
+    collect = start_sheet_xml(source, sheet, COMPUTE_HEADER_ROW, select, max_workers, progress=progress)
+
+    def result():
+        df, columns = collect()
+        return df, columns, resolved['index']
+
+    return result
+
+
+def read_tab(source, sheet_name, select, header_row=TAB_HEADER_ROW, reader=DEFAULT_READER):
+    """
+    Parse a single tab on its own (e.g. in a worker process).
+    select(header_columns) -> (positions, scenario_position) picks the projected columns
+    for the streaming and xml readers; the pandas reader returns the whole sheet.
+    Returns (DataFrame, cleaned header names).
+    """
+    bundle = delimited_source(source)
+    if bundle is not None:
+        if reader == 'pandas':
+            df = bundle.read_frame(sheet_name, header_row)
+            df.columns = df.columns.astype(str).str.strip()
+            return df, df.columns.tolist()
+        return bundle.read_projected(sheet_name, header_row, select)
+
+    if isinstance(source, bytes):
+        source = BytesIO(source)
+
+    with pd.ExcelFile(source) as excel_file:
+        if reader == 'streaming' and excel_file.engine == 'openpyxl':
+            return read_sheet_streaming(excel_file.book[sheet_name], header_row, select)
+        if reader == 'xml' and excel_file.engine == 'openpyxl':
+            # Already in a worker process: decode the tab here
+            return start_sheet_xml(source, excel_file.book[sheet_name], header_row, select, max_workers=1)()
+
+        df = excel_file.parse(sheet_name, header=header_row)
+        # Clean column names once
+        df.columns = df.columns.astype(str).str.strip()
+        return df, df.columns.tolist()
+
+
+def read_sheet_streaming(sheet, header_row, select, scenario_value='TBD', progress=NULL_PROGRESS):
+    """
+    Stream a read-only openpyxl worksheet and keep only the projected column positions
+    of rows whose separation scenario is scenario_value.
+    select(header_columns) returns (positions, scenario_position); with no scenario
+    position every row is kept.
+    Values are converted the way pandas.read_excel would convert them, so the result
+    matches filtering the fully parsed sheet. Returns (DataFrame, cleaned header names).
+    progress gets the 'parse' stage: data rows read, out of those the sheet declares.
+    """
+    progress.start('parse', _declared_data_rows(sheet, header_row))
+    sheet.reset_dimensions()
+    rows = sheet.iter_rows(values_only=True)
+
+    width = 0
+    header = ()
+    for row_number, row in enumerate(rows):
+        width = max(width, _row_width(row))
+        if row_number == header_row:
+            header = row
+            break
+
+    positions, scenario_position = select(_header_names(header, _row_width(header)))
+    positions = sorted(set(positions))
+
+    scan = _scan_rows(enumerate(rows), positions, scenario_position, scenario_value, progress)
+    return _frame_from_scans(header, width, positions, [scan])
+
+
+def start_sheet_xml(source, sheet, header_row, select, max_workers=None, scenario_value='TBD',
+                    progress=NULL_PROGRESS):
+    """
+    Start decoding a worksheet of the xlsx source (a path or binary file-like object)
+    from its XML part, keeping the same rows and columns as read_sheet_streaming on
+    sheet (its read-only openpyxl worksheet). The part is read from the zip in blocks
+    of rows; with more than one worker (max_workers, default: one per CPU) the blocks
+    are decoded, projected and filtered in the shared worker pool, a bounded number at
+    a time. Returns a function that waits for the result, (DataFrame, cleaned header
+    names). Sheets whose XML xlsx_reader doesn't handle are streamed with openpyxl
+    instead. progress gets the 'parse' stage as in read_sheet_streaming.
+    """
+    def fallback():
+        return read_sheet_streaming(sheet, header_row, select, scenario_value, progress)
+
+    progress.start('parse', _declared_data_rows(sheet, header_row))
+    workers = worker_count(max_workers)
+
+    archive = None
+    try:
+        archive = zipfile.ZipFile(source)
+        decoder, part = CellDecoder.for_sheet(archive, sheet.title)
+        blocks = iter_row_blocks(archive.open(part), XML_CHUNK_MIN_BYTES if workers > 1 else XML_BLOCK_BYTES)
+
+        # Decode the rows up to the header here; the rest of the block is the first data block
+        width = 0
+        header = ()
+        data_blocks = []
+        for block in blocks:
+            cut = header_end(block, header_row)
+            for row_number, row in decoder.iter_rows(block[:cut]):
+                width = max(width, _row_width(row))
+                if row_number == header_row + 1:
+                    header = row
+            if cut is not None:
+                data_blocks.append(block[cut:])
+                break
+    except (UnsupportedSheetXML, zipfile.BadZipFile, KeyError):
+        if archive is not None:
+            archive.close()
+        return fallback
+
+    positions, scenario_position = select(_header_names(header, _row_width(header)))
+    positions = sorted(set(positions))
+    args = (positions, scenario_position, scenario_value, header_row, decoder)
+
+    data_blocks = itertools.chain(data_blocks, blocks)
+    pool = {'available': workers > 1}
+    pending = deque()
+
+    def submit_next():
+        """Read the next block and queue it (with its future, or None to decode it here)."""
+        block = next(data_blocks, None)
+        if block is None:
+            return False
+        future = None
+        if pool['available']:
+            try:
+                future = shared_pool.submit(_scan_xml_rows, block, *args)
+            except POOL_ERRORS:
+                pool['available'] = False
+        pending.append((block, future))
+        return True
+
+    def collect():
+        scans = []
+        try:
+            while pending or submit_next():
+                block, future = pending.popleft()
+                scan = None
+                if future is not None:
+                    try:
+                        scan = shared_pool.result(future)
+                    except POOL_ERRORS:
+                        pool['available'] = False
+                if scan is None:
+                    scan = _scan_xml_rows(block, *args, progress=progress)
+                scans.append(scan)
+                if future is not None and scan.last_row is not None:
+                    progress.update(scan.last_row + 1)
+                # Keep every worker busy, with at most two blocks each in flight
+                while pool['available'] and len(pending) < 2 * workers and submit_next():
+                    pass
+        except UnsupportedSheetXML:
+            return fallback()
+        finally:
+            archive.close()
+        return _frame_from_scans(header, width, positions, scans)
+
+    # Workers start on the first blocks while the caller goes on (e.g. with the glossary)
+    while pool['available'] and len(pending) < 2 * workers and submit_next():
+        pass
+    return collect
+
+
+def _scan_xml_rows(data, positions, scenario_position, scenario_value, header_row, decoder,
+                   progress=NULL_PROGRESS):
+    """Decode and scan one range of a sheet's data rows (runs in a worker process)."""
+    rows = decoder.iter_rows(data)
+    # Data rows are numbered from 0 after the header row, as in read_sheet_streaming
+    return _scan_rows(((number - header_row - 2, row) for number, row in rows),
+                      positions, scenario_position, scenario_value, progress)
+
+
+def _declared_data_rows(sheet, header_row):
+    """Data rows below the header according to the sheet's dimension record (None without one)."""
+    max_row = sheet.max_row
+    return max(max_row - header_row - 1, 0) if max_row else None
+
+
+class _RowScan:
+    """The projected values of the rows kept from one run of data rows."""
+
+    def __init__(self, positions):
+        self.values = {position: [] for position in positions}
+        self.index = []
+        # Per projected column: does it hold a missing value / only numbers anywhere in the run
+        self.has_na = dict.fromkeys(positions, False)
+        self.numeric = dict.fromkeys(positions, True)
+        self.width = 0
+        # First and last non-blank row numbers, and whether blank rows lie between them
+        self.first_row = None
+        self.last_row = None
+        self.gap = False
+
+
+def _scan_rows(numbered_rows, positions, scenario_position, scenario_value, progress=NULL_PROGRESS):
+    """
+    Convert the projected cells of (row number, values) pairs and keep the rows whose
+    separation scenario is scenario_value. Blank rows may be given or left out.
+    """
+    scan = _RowScan(positions)
+    values, has_na, numeric = scan.values, scan.has_na, scan.numeric
+
+    for row_number, row in numbered_rows:
+        if not row_number % PROGRESS_STRIDE:
+            progress.update(row_number)
+        row_width = _row_width(row)
+        if row_width == 0:
+            continue
+        if scan.last_row is None:
+            scan.first_row = row_number
+        elif row_number > scan.last_row + 1:
+            scan.gap = True
+        scan.last_row = row_number
+        scan.width = max(scan.width, row_width)
+
+        converted = {}
+        for position in positions:
+            value = _convert_value(row[position]) if position < len(row) else np.nan
+            if value is np.nan:
+                has_na[position] = True
+            elif numeric[position] and not _is_numeric(value):
+                numeric[position] = False
+            converted[position] = value
+
+        scenario = converted.get(scenario_position)
+        if scenario_position is None or (isinstance(scenario, str) and scenario.strip().upper() == scenario_value):
+            scan.index.append(row_number)
+            for position in positions:
+                values[position].append(converted[position])
+
+    return scan
+
+
+def _frame_from_scans(header, width, positions, scans):
+    """Combine consecutive row scans into the DataFrame pandas would give for the kept rows."""
+    values = {position: [] for position in positions}
+    index = []
+    has_na = dict.fromkeys(positions, False)
+    numeric = dict.fromkeys(positions, True)
+
+    # Blank rows only become all-missing rows when data follows them
+    blank_rows = False
+    previous = -1
+    for scan in scans:
+        if scan.first_row is None:
+            continue
+        if scan.gap or scan.first_row > previous + 1:
+            blank_rows = True
+        previous = scan.last_row
+        width = max(width, scan.width)
+        index.extend(scan.index)
+        for position in positions:
+            values[position].extend(scan.values[position])
+            has_na[position] = has_na[position] or scan.has_na[position]
+            numeric[position] = numeric[position] and scan.numeric[position]
+    if blank_rows:
+        has_na = dict.fromkeys(positions, True)
+
+    columns = _header_names(header, width)
+    data = {}
+    for position in positions:
+        if position >= len(columns):
+            continue
+        column = pd.Series(values[position], index=index, dtype=object)
+        if numeric[position]:
+            column = pd.to_numeric(column)
+            if has_na[position]:
+                column = column.astype('float64')
+        else:
+            column = column.infer_objects()
+        data[columns[position]] = column
+
+    return pd.DataFrame(data, index=pd.Index(index, dtype='int64')), columns
+
+
+def _row_width(row):
+    """Number of cells up to the last non-empty one (pandas trims trailing blanks)."""
+    width = len(row)
+    while width and row[width - 1] in (None, ''):
+        width -= 1
+    return width
+
+
+def _convert_value(value):
+    """Convert a raw cell value like pandas' openpyxl reader plus default NA handling."""
+    if value is None:
+        return np.nan
+    if isinstance(value, str):
+        return np.nan if value in _NA_VALUES else value
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def _is_numeric(value):
+    if isinstance(value, bool):
+        return False
+    if isinstance(value, (int, float)):
+        return True
+    if isinstance(value, str):
+        try:
+            float(value)
+            return True
+        except ValueError:
+            return False
+    return False
+
+
+def _header_names(header, width):
+    """Build cleaned column names the way read_excel names (and de-duplicates) them."""
+    names = []
+    for position in range(width):
+        value = header[position] if position < len(header) else None
+        names.append(f"Unnamed: {position}" if value in (None, '') else _convert_value(value))
+
+    counts = defaultdict(int)
+    for position, name in enumerate(names):
+        count = counts[name]
+        while count > 0:
+            counts[name] = count + 1
+            name = f"{name}.{count}"
+            count = counts[name]
+        names[position] = name
+        counts[name] = count + 1
+
+    return [str(name).strip() for name in names]
+
+
+def validate_file_structure(workbook):
+    """
+    Validate that the uploaded Excel file has the required structure.
+    Accepts a ParsedWorkbook (or anything ParsedWorkbook.load accepts).
+    Returns error message if invalid, None if valid.
+    """
+    if not isinstance(workbook, ParsedWorkbook):
+        workbook = ParsedWorkbook.load(workbook)
+
+    problem = workbook.check_structure()
+    return problem[1] if problem else None
@@ -0,0 +1,93 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+
+# Worker processes are started by a fork server (a fresh spawn where there is none),
+# never forked from the threaded web server: a forked child inherits any lock another
+# request thread holds at that moment (e.g. a cache lock) and can hang on it
+WORKER_START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+# Imported once by the fork server, so its workers start with pandas/openpyxl loaded
+WORKER_PRELOAD = ['validator']
+
+# Errors meaning no (working) worker processes here, e.g. serverless runtimes without /dev/shm
+POOL_ERRORS = (OSError, NotImplementedError, BrokenProcessPool)
+
+# Set in every worker process started through this module (see mark_worker_process)
+_in_worker = False
+
+
+def worker_context():
+    context = multiprocessing.get_context(WORKER_START_METHOD)
+    if WORKER_START_METHOD == 'forkserver':
+        context.set_forkserver_preload(WORKER_PRELOAD)
+    return context
+
+
+def mark_worker_process():
+    """Initializer of worker processes: work they start themselves runs in-process."""
+    global _in_worker
+    _in_worker = True
+
+
+def in_worker_process():
+    return _in_worker
+
+
+def worker_count(max_workers=None):
+    """
+    Processes to spread one validation's work over: max_workers (default: one per CPU),
+    or 1 inside a worker process, whose pool already uses every core.
+    """
+    if _in_worker:
+        return 1
+    return max_workers or os.cpu_count() or 1
+
+
+class SharedPool:
+    """
+    One long-lived process pool for the parallel parts of every request (other tabs,
+    xml row ranges), created on first use. A pool broken by a killed worker is
+    replaced on the next submission.
+    """
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args):
+        """executor.submit(fn, *args); raises one of POOL_ERRORS when no pool is available."""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers or os.cpu_count() or 1,
+                                                     mp_context=worker_context(), initializer=mark_worker_process)
+            executor = self._executor
+        try:
+            return executor.submit(fn, *args)
+        except BrokenProcessPool:
+            self.discard(executor)
+            raise
+
+    def discard(self, executor):
+        """Drop a broken executor so the next submission starts a new pool (queued work still runs)."""
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False)
+
+    def result(self, future):
+        """future.result(), discarding the pool when it broke while running it."""
+        try:
+            return future.result()
+        except BrokenProcessPool:
+            with self._lock:
+                executor = self._executor
+            if executor is not None:
+                self.discard(executor)
+            raise
+
+
+shared_pool = SharedPool()
@@ -0,0 +1,255 @@
+import html
+import posixpath
+import re
+from xml.etree import ElementTree
+
+from openpyxl.reader.strings import read_string_table
+from openpyxl.styles.numbers import builtin_format_code, is_date_format, is_timedelta_format
+from openpyxl.utils.datetime import from_excel, from_ISO8601, CALENDAR_MAC_1904, CALENDAR_WINDOWS_1900
+
+
+# SpreadsheetML as written by Excel, openpyxl and most other producers. Rows hold
+# cells (<c r="B7" s="1" t="s"><v>12</v></c>); text is in <v> or, for inline
+# strings, in the <t> elements of <is> (phonetic runs, <rPh>, excluded).
+_ROW_PATTERN = re.compile(rb'<row\b([^>]*?)(?:/>|>(.*?)</row>)', re.S)
+_CELL_PATTERN = re.compile(rb'<c\b([^>]*?)(?:/>|>(.*?)</c>)', re.S)
+_ATTR_PATTERN = re.compile(rb'\b(r|s|t)="([^"]*)"')
+_VALUE_PATTERN = re.compile(rb'<v(?:\s[^>]*)?>(.*?)</v>', re.S)
+_TEXT_PATTERN = re.compile(rb'<t(?:\s[^>]*)?>(.*?)</t>', re.S)
+_PHONETIC_PATTERN = re.compile(rb'<rPh\b.*?</rPh>', re.S)
+_ROW_END = b'</row>'
+
+# Markup the patterns above don't handle (CDATA, namespace prefixes, single-quoted
+# attributes); sheets using it are read with openpyxl instead
+_UNSUPPORTED_PATTERN = re.compile(rb"<!\[CDATA\[|<[A-Za-z_][\w.-]*:|='")
+
+
+class UnsupportedSheetXML(Exception):
+    """Raised for sheet XML outside the subset CellDecoder handles."""
+
+
+class CellDecoder:
+    """
+    Decodes the rows of a worksheet's XML part to cell values, as openpyxl's read-only
+    worksheets do with data_only=True: shared strings resolved, numbers cast to int or
+    float, date-formatted numbers converted to datetimes. Everything it needs from the
+    workbook (shared strings, date styles, epoch) is passed in, so it can be sent to
+    worker processes once and decode any part of the sheet.
+    """
+
+    def __init__(self, shared_strings, date_styles, timedelta_styles, epoch):
+        self.shared_strings = shared_strings
+        self.date_styles = frozenset(date_styles)
+        self.timedelta_styles = frozenset(timedelta_styles)
+        self.epoch = epoch
+        self._columns = {}
+
+    @classmethod
+    def for_sheet(cls, archive, sheet_name):
+        """
+        The decoder for a sheet of an open xlsx zipfile.ZipFile (its workbook's shared
+        strings, date styles and epoch) and the name of the sheet's XML part.
+        Raises UnsupportedSheetXML when the package parts can't be found.
+        """
+        try:
+            parts = _relationships(archive, '')
+            workbook_part = next(path for kind, path in parts.values() if kind == 'officeDocument')
+            parts = _relationships(archive, workbook_part)
+            workbook = ElementTree.fromstring(archive.read(workbook_part))
+        except (KeyError, StopIteration, ElementTree.ParseError) as e:
+            raise UnsupportedSheetXML(f"Unreadable workbook part: {str(e)}")
+
+        sheet_part = None
+        epoch = CALENDAR_WINDOWS_1900
+        for element in workbook.iter():
+            tag = _local_name(element.tag)
+            if tag == 'workbookPr' and element.get('date1904') in ('1', 'true'):
+                epoch = CALENDAR_MAC_1904
+            elif tag == 'sheet' and element.get('name') == sheet_name:
+                sheet_part = parts.get(_attribute(element, 'id'), (None, None))[1]
+        if sheet_part is None or sheet_part not in archive.namelist():
+            raise UnsupportedSheetXML(f"No XML part for sheet '{sheet_name}'")
+
+        shared_strings = []
+        date_styles, timedelta_styles = set(), set()
+        for kind, path in parts.values():
+            if kind == 'sharedStrings' and path in archive.namelist():
+                with archive.open(path) as f:
+                    shared_strings = list(read_string_table(f))
+            elif kind == 'styles' and path in archive.namelist():
+                date_styles, timedelta_styles = _number_styles(archive.read(path))
+        return cls(shared_strings, date_styles, timedelta_styles, epoch), sheet_part
+
+    def iter_rows(self, data):
+        """
+        Yield (row number, values) for each <row> in data (1-based row numbers, values
+        up to the row's last cell with None for cells left out), like iter_rows(values_only=True)
+        without the blank rows openpyxl fills in for rows left out of the XML.
+        """
+        if _UNSUPPORTED_PATTERN.search(data):
+            raise UnsupportedSheetXML("Unsupported markup in sheet XML")
+
+        for match in _ROW_PATTERN.finditer(data):
+            number = dict(_ATTR_PATTERN.findall(match.group(1))).get(b'r')
+            if number is None:
+                raise UnsupportedSheetXML("Row without a row number")
+            yield int(number), self.decode_cells(match.group(2) or b'')
+
+    def decode_cells(self, body):
+        values = []
+        for cell_attrs, cell_body in _CELL_PATTERN.findall(body):
+            attrs = dict(_ATTR_PATTERN.findall(cell_attrs))
+            ref = attrs.get(b'r')
+            column = self._column(ref) if ref is not None else len(values)
+            if column > len(values):
+                values.extend([None] * (column - len(values)))
+            value = self.decode_value(attrs.get(b't', b'n'), attrs.get(b's'), cell_body)
+            if column == len(values):
+                values.append(value)
+            else:
+                values[column] = value
+        return values
+
+    def decode_value(self, data_type, style, body):
+        if data_type == b'inlineStr':
+            if b'<is' not in body:
+                return None
+            if b'<rPh' in body:
+                body = _PHONETIC_PATTERN.sub(b'', body)
+            return ''.join(_text(part) for part in _TEXT_PATTERN.findall(body))
+
+        match = _VALUE_PATTERN.search(body) if body else None
+        raw = match.group(1) if match else None
+        if not raw:
+            return None
+
+        if data_type == b'n':
+            value = float(raw) if (b'.' in raw or b'E' in raw or b'e' in raw) else int(raw)
+            if style is not None and int(style) in self.date_styles:
+                try:
+                    return from_excel(value, self.epoch, timedelta=int(style) in self.timedelta_styles)
+                except (OverflowError, ValueError):
+                    return '#VALUE!'
+            return value
+        if data_type == b's':
+            return self.shared_strings[int(raw)]
+        if data_type == b'b':
+            return bool(int(raw))
+        if data_type == b'd':
+            return from_ISO8601(_text(raw))
+        return _text(raw)
+
+    def _column(self, ref):
+        """0-based column of a cell reference such as b'AB12'."""
+        letters = ref.rstrip(b'0123456789')
+        column = self._columns.get(letters)
+        if column is None:
+            column = 0
+            for letter in letters:
+                column = column * 26 + (letter - 64)
+            column = self._columns[letters] = column - 1
+        return column
+
+
+def _text(raw):
+    """Decoded XML text: line ends normalised as an XML parser would, then entities resolved."""
+    text = raw.decode('utf-8')
+    if '\r' in text:
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+    if '&' in text:
+        text = html.unescape(text)
+    return text
+
+
+def iter_row_blocks(stream, block_size):
+    """
+    Yield the rows inside the <sheetData> element of a sheet XML stream (e.g. from
+    ZipFile.open) as blocks of whole <row> elements of about block_size bytes, so a
+    sheet is decoded without holding its whole (uncompressed) XML in memory.
+    """
+    buffer = b''
+    started = False
+    while True:
+        chunk = stream.read(block_size)
+        buffer += chunk
+        if not started:
+            start = buffer.find(b'<sheetData')
+            close = buffer.find(b'>', start) if start != -1 else -1
+            if close == -1:
+                if not chunk:
+                    raise UnsupportedSheetXML("No sheetData element")
+                continue
+            if buffer[close - 1:close + 1] == b'/>':
+                return
+            buffer = buffer[close + 1:]
+            started = True
+
+        end = buffer.find(b'</sheetData>')
+        if end != -1:
+            if buffer[:end].strip():
+                yield buffer[:end]
+            return
+        if not chunk:
+            raise UnsupportedSheetXML("Unterminated sheetData element")
+        cut = buffer.rfind(_ROW_END)
+        if cut != -1:
+            cut += len(_ROW_END)
+            yield buffer[:cut]
+            buffer = buffer[cut:]
+
+
+def header_end(data, header_row):
+    """
+    Offset of the first row numbered after header_row + 1 (1-based) in a block of rows,
+    or None when every row of the block is at or above the header.
+    """
+    for match in _ROW_PATTERN.finditer(data):
+        number = dict(_ATTR_PATTERN.findall(match.group(1))).get(b'r')
+        if number is None:
+            raise UnsupportedSheetXML("Row without a row number")
+        if int(number) > header_row + 1:
+            return match.start()
+    return None
+
+
+def _number_styles(styles_xml):
+    """Indexes of the cell formats (cellXfs) with date and with timedelta number formats, as openpyxl finds them."""
+    root = ElementTree.fromstring(styles_xml)
+    custom = {int(element.get('numFmtId')): element.get('formatCode')
+              for element in root.iter() if _local_name(element.tag) == 'numFmt'}
+    date_styles, timedelta_styles = set(), set()
+    cell_formats = next((element for element in root if _local_name(element.tag) == 'cellXfs'), ())
+    for index, element in enumerate(cell_formats):
+        number_format = int(element.get('numFmtId', 0))
+        code = custom[number_format] if number_format in custom else builtin_format_code(number_format)
+        if code and is_date_format(code):
+            date_styles.add(index)
+        if code and is_timedelta_format(code):
+            timedelta_styles.add(index)
+    return date_styles, timedelta_styles
+
+
+def _relationships(archive, part):
+    """Relationship id -> (type, part name) of a package part ('' for the package itself)."""
+    directory, name = posixpath.split(part)
+    root = ElementTree.fromstring(archive.read(posixpath.join(directory, '_rels', name + '.rels')))
+    relationships = {}
+    for element in root:
+        if element.get('TargetMode') == 'External':
+            continue
+        target = element.get('Target', '')
+        path = target.lstrip('/') if target.startswith('/') else posixpath.normpath(posixpath.join(directory, target))
+        relationships[element.get('Id')] = (element.get('Type', '').rsplit('/', 1)[-1], path)
+    return relationships
+
+
+def _local_name(tag):
+    return tag.rsplit('}', 1)[-1]
+
+
+def _attribute(element, name):
+    """An attribute by local name, whatever its namespace (e.g. r:id)."""
+    for key, value in element.attrib.items():
+        if _local_name(key) == name:
+            return value
+    return None
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Benchmark: the stages of generate_validation_report on synthetic workbooks.
+For each row count a workbook is generated (see synthetic_workbook.py) and, in a
+fresh process, each stage is timed on it: read (parse + structure check), filter
+('TBD' rows), missing-column detection, report assembly, write, apply_formatting
+and calculate_statistics, the streamed CSV encoding of the same rows (the
+?format=csv path, which replaces write and apply_formatting), followed by the whole generate_validation_report call.
+Peak RSS is recorded after every stage.
+
+Results can be saved as a JSON baseline and later runs compared against it; the
+reader defaults to the one the baseline was recorded with (otherwise DEFAULT_READER):
+
+Usage: python benchmarks/bench_pipeline.py [--rows 10000 50000] [--save NAME] [--compare NAME]
+           [--tolerance 0.25] [--tbd-ratio 0.3] [--missing-ratio 0.2] [--reader streaming|xml|pandas]
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines')
+
+STAGES = ['read', 'filter', 'missing', 'report', 'write', 'apply_formatting', 'statistics', 'encode_csv', 'total']
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far (None where unavailable)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def run_stages(path, reader):
+    """Time each stage on one workbook (called in a fresh child process)."""
+    sys.path.insert(0, os.path.join(ROOT, 'backend'))
+    import validator
+    from workbook import ParsedWorkbook, COMPUTE_SHEET
+    from report_writer import write_reports
+    from report_formats import encode_report
+
+    timings = {}
+    rss = {}
+
+    def timed(stage, func):
+        start = time.perf_counter()
+        result = func()
+        timings[stage] = round(time.perf_counter() - start, 4)
+        rss[stage] = peak_rss_mb()
+        return result
+
+    def read():
+        workbook = ParsedWorkbook.load(path, reader)
+        problem = workbook.check_structure()
+        if problem:
+            raise SystemExit(f"Generated workbook failed the structure check: {problem[1]}")
+        return workbook
+
+    workbook = timed('read', read)
+    valid_columns = workbook.glossary_columns[COMPUTE_SHEET]
+    names = workbook.compute_index.names
+    targets = [col for col in workbook.compute_index.target_names if col in valid_columns]
+
+    def tbd_rows():
+        df = workbook.compute
+        return df[df[names['sep_scenario']].astype(str).str.strip().str.upper() == 'TBD']
+
+    df_tbd = timed('filter', tbd_rows)
+    timed('missing', lambda: validator.find_missing_columns(df_tbd, targets))
+    report_df, message = timed('report', lambda: validator.build_compute_report(workbook, valid_columns))
+    if report_df is None:
+        raise SystemExit(f"No report generated: {message}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        output = os.path.join(tmp, 'report.xlsx')
+        timed('write', lambda: write_reports([(COMPUTE_SHEET, report_df)], output))
+        timed('apply_formatting', lambda: validator.apply_formatting(output, COMPUTE_SHEET, len(report_df)))
+        timed('statistics', lambda: validator.calculate_statistics(report_df))
+        timed('encode_csv', lambda: sum(len(chunk) for chunk in encode_report([(COMPUTE_SHEET, report_df)], 'csv')))
+        success, message, _ = timed('total', lambda: validator.generate_validation_report(path, output))
+        if not success:
+            raise SystemExit(f"generate_validation_report failed: {message}")
+
+    return {'stages': timings, 'peak_rss_mb': rss, 'report_rows': len(report_df)}
+
+
+def measure(rows, args, tmp):
+    """Generate a workbook and time its stages in a child process."""
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from synthetic_workbook import make_workbook
+
+    path = os.path.join(tmp, f"synthetic_{rows}.xlsx")
+    make_workbook(path, rows, args.tbd_ratio, args.missing_ratio)
+    result = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', path, '--reader', args.reader],
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        raise SystemExit(result.stderr or result.stdout)
+    measurement = json.loads(result.stdout.strip().splitlines()[-1])
+    measurement['rows'] = rows
+    measurement['file_mb'] = round(os.path.getsize(path) / (1024 * 1024), 2)
+    return measurement
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results, baseline=None):
+    print(f"{'rows':>9} {'stage':>17} {'seconds':>9} {'peak RSS MB':>12}" + (f" {'baseline':>9} {'change':>8}" if baseline else ''))
+    for measurement in results:
+        base = (baseline or {}).get(str(measurement['rows']))
+        for stage in STAGES:
+            seconds = measurement['stages'][stage]
+            line = f"{measurement['rows']:>9} {stage:>17} {seconds:>9.3f} {measurement['peak_rss_mb'][stage] or 0:>12.1f}"
+            # Baselines saved before a stage was added don't have it
+            old = base['stages'].get(stage) if base else None
+            if old is not None:
+                line += f" {old:>9.3f} {(seconds - old) / old if old else 0:>+8.0%}"
+            print(line)
+
+
+def regressions(results, baseline, tolerance):
+    found = []
+    for measurement in results:
+        base = baseline.get(str(measurement['rows']))
+        if not base:
+            continue
+        for stage in STAGES:
+            old, new = base['stages'].get(stage), measurement['stages'][stage]
+            if old is None:
+                continue
+            # Ignore sub-10ms stages, which are dominated by noise
+            if new > 0.01 and new > old * (1 + tolerance):
+                found.append(f"{measurement['rows']} rows, {stage}: {old:.3f}s -> {new:.3f}s")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 50_000])
+    parser.add_argument('--tbd-ratio', type=float, default=0.3)
+    parser.add_argument('--missing-ratio', type=float, default=0.2)
+    parser.add_argument('--reader', help="Workbook reader passed to ParsedWorkbook.load "
+                                          "(default: the --compare baseline's, otherwise DEFAULT_READER)")
+    parser.add_argument('--save', metavar='NAME', help="Store the results as baselines/NAME.json")
+    parser.add_argument('--compare', metavar='NAME', help="Compare with baselines/NAME.json")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="Allowed slowdown per stage before --compare fails (0.25 = 25%%)")
+    parser.add_argument('--child', metavar='PATH', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_stages(args.child, args.reader)))
+        return 0
+
+    baseline = None
+    baseline_reader = None
+    if args.compare:
+        with open(os.path.join(BASELINE_DIR, f"{args.compare}.json")) as f:
+            saved = json.load(f)
+        baseline = {str(m['rows']): m for m in saved['results']}
+        baseline_reader = saved.get('reader')
+    if args.reader is None:
+        sys.path.insert(0, os.path.join(ROOT, 'backend'))
+        from workbook import DEFAULT_READER
+        # Compare like with like: a baseline is only meaningful for the reader it was recorded with
+        args.reader = baseline_reader or DEFAULT_READER
+    elif baseline_reader and args.reader != baseline_reader:
+        print(f"Note: baseline '{args.compare}' was recorded with the '{baseline_reader}' reader, "
+              f"this run uses '{args.reader}'", file=sys.stderr)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results = [measure(rows, args, tmp) for rows in args.rows]
+    print(f"reader: {args.reader}")
+    print_results(results, baseline)
+
+    if args.save:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        path = os.path.join(BASELINE_DIR, f"{args.save}.json")
+        with open(path, 'w') as f:
+            json.dump({
+                'commit': git_commit(),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'reader': args.reader,
+                'tbd_ratio': args.tbd_ratio,
+                'missing_ratio': args.missing_ratio,
+                'results': results,
+            }, f, indent=2)
+            f.write('\n')
+        print(f"Saved {path}")
+
+    if baseline:
+        found = regressions(results, baseline, args.tolerance)
+        for regression in found:
+            print(f"REGRESSION: {regression}", file=sys.stderr)
+        return 1 if found else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark: the workbook readers on synthetic workbooks.
+For each row count a workbook is generated (see synthetic_workbook.py) and, in a
+fresh process per run, ParsedWorkbook.load is timed with the 'streaming' and
+'pandas' readers and with the 'xml' reader on one worker (decoded in-process) and
+on --workers worker processes, recording peak RSS. The xml speedup is reported
+against its own single-worker run and against 'streaming'; it can only show on a
+machine with more than one core.
+
+Usage: python benchmarks/bench_readers.py [--rows 10000 50000] [--workers N] [--repeat 3]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far (None where unavailable)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def run_load(path, reader, workers):
+    """Time one ParsedWorkbook.load (called in a fresh child process)."""
+    sys.path.insert(0, os.path.join(ROOT, 'backend'))
+    from workbook import ParsedWorkbook
+
+    start = time.perf_counter()
+    workbook = ParsedWorkbook.load(path, reader, max_workers=workers)
+    seconds = time.perf_counter() - start
+    problem = workbook.check_structure()
+    if problem:
+        raise SystemExit(f"Generated workbook failed the structure check: {problem[1]}")
+    return {'seconds': round(seconds, 4), 'peak_rss_mb': peak_rss_mb(), 'rows': len(workbook.compute)}
+
+
+def measure(path, reader, workers, repeat):
+    """Best of repeat runs, each in a child process (so pools and peak RSS start fresh)."""
+    runs = []
+    for _ in range(repeat):
+        result = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', path,
+                                 '--reader', reader, '--workers', str(workers)],
+                                capture_output=True, text=True)
+        if result.returncode != 0:
+            raise SystemExit(result.stderr or result.stdout)
+        runs.append(json.loads(result.stdout.strip().splitlines()[-1]))
+    return min(runs, key=lambda run: run['seconds'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 50_000])
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="Worker processes for the parallel xml run (default: one per CPU)")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--reader', help=argparse.SUPPRESS)
+    parser.add_argument('--child', metavar='PATH', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_load(args.child, args.reader, args.workers)))
+        return 0
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from synthetic_workbook import make_workbook
+
+    runs = [('streaming', 1), ('pandas', 1), ('xml', 1), ('xml', args.workers)]
+    print(f"{os.cpu_count()} CPUs")
+    print(f"{'rows':>9} {'reader':>10} {'workers':>8} {'seconds':>9} {'peak RSS MB':>12} "
+          f"{'vs xml x1':>10} {'vs streaming':>13}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in args.rows:
+            path = os.path.join(tmp, f"synthetic_{rows}.xlsx")
+            make_workbook(path, rows)
+            results = {run: measure(path, *run, args.repeat) for run in runs}
+            for (reader, workers), result in results.items():
+                line = f"{rows:>9} {reader:>10} {workers:>8} {result['seconds']:>9.3f} {result['peak_rss_mb'] or 0:>12.1f}"
+                if reader == 'xml':
+                    line += f" {results['xml', 1]['seconds'] / result['seconds']:>9.2f}x"
+                    line += f" {results['streaming', 1]['seconds'] / result['seconds']:>12.2f}x"
+                print(line)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
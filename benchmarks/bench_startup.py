@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Benchmark: cold-start import time of the Vercel function (api/validate.py).
+Imports the app in fresh interpreters with `python -X importtime`, checks that the
+health check, CORS preflight and a report cache hit don't import pandas, numpy or
+openpyxl, and compares the import time with the budget in startup_budget.json.
+Exits with status 1 when either check regresses.
+
+Usage: python benchmarks/bench_startup.py [--runs 7] [--update]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+API_DIR = os.path.join(ROOT, 'api')
+BUDGET_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'startup_budget.json')
+
+# Budget written by --update: the measured time plus this much headroom for noise
+BUDGET_HEADROOM = 0.5
+
+# Runs in api/: serve a health check, a preflight and a cache hit, then list heavy modules
+LAZY_PATHS_PROBE = """
+import io, json, shutil, sys, tempfile
+import validate
+from report_cache import ReportCache, DiskCacheBackend, report_cache_key, upload_digest, VALIDATION_RULES_VERSION
+
+cache_dir = tempfile.mkdtemp()
+validate.report_cache = ReportCache(DiskCacheBackend(cache_dir, 1024 * 1024))
+upload = b'cached upload'
+validate.report_cache.put(report_cache_key(upload_digest(upload), VALIDATION_RULES_VERSION), b'report', {'total_records': 1})
+
+client = validate.app.test_client()
+statuses = {
+    'health': client.get('/').status_code,
+    'preflight': client.options('/').status_code,
+    'cache_hit': client.post('/', data={'file': (io.BytesIO(upload), 'cached.xlsx')},
+                             content_type='multipart/form-data').status_code,
+}
+shutil.rmtree(cache_dir, ignore_errors=True)
+print(json.dumps({'statuses': statuses, 'loaded': [m for m in HEAVY if m in sys.modules]}))
+"""
+
+EXPECTED_STATUSES = {'health': 200, 'preflight': 204, 'cache_hit': 200}
+
+
+def import_time_ms():
+    """Cumulative import time of the validate module in a fresh interpreter."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import validate'],
+                            cwd=API_DIR, capture_output=True, text=True, check=True)
+    for line in result.stderr.splitlines():
+        parts = [part.strip() for part in line.split('|')]
+        if len(parts) == 3 and parts[2] == 'validate':
+            return int(parts[1]) / 1000
+    raise RuntimeError("importtime output has no entry for 'validate'")
+
+
+def lazy_paths(heavy_modules):
+    code = f"HEAVY = {list(heavy_modules)!r}\n" + LAZY_PATHS_PROBE
+    result = subprocess.run([sys.executable, '-c', code], cwd=API_DIR, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=7, help="Fresh interpreters to time; the best time is used")
+    parser.add_argument('--update', action='store_true', help="Write a new budget from this measurement")
+    args = parser.parse_args()
+
+    with open(BUDGET_PATH) as f:
+        budget = json.load(f)
+
+    times = [import_time_ms() for _ in range(args.runs)]
+    best = min(times)
+    print(f"import validate: best {best:.1f} ms, worst {max(times):.1f} ms over {args.runs} runs "
+          f"(budget {budget['max_import_ms']} ms)")
+
+    probe = lazy_paths(budget['heavy_modules'])
+    print(f"statuses: {probe['statuses']}; heavy modules loaded: {probe['loaded'] or 'none'}")
+
+    if args.update:
+        budget['max_import_ms'] = round(best * (1 + BUDGET_HEADROOM))
+        with open(BUDGET_PATH, 'w') as f:
+            json.dump(budget, f, indent=2)
+            f.write('\n')
+        print(f"Budget updated to {budget['max_import_ms']} ms")
+
+    failures = []
+    if best > budget['max_import_ms']:
+        failures.append(f"import time {best:.1f} ms exceeds the budget of {budget['max_import_ms']} ms")
+    if probe['loaded']:
+        failures.append(f"{', '.join(probe['loaded'])} imported by health check, preflight or cache hit")
+    if probe['statuses'] != EXPECTED_STATUSES:
+        failures.append(f"unexpected statuses {probe['statuses']}")
+
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
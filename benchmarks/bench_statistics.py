@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-category/per-SBG loop vs single-pass calculate_statistics.
+Compares the previous nested-filter implementation with validator.calculate_statistics
+on reports with a few thousand SBG/BAN combinations and checks the statistics are identical.
+
+Usage: python benchmarks/bench_statistics.py [--rows 20000 100000] [--sbgs 40] [--bans 150]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+from validator import calculate_statistics
+
+BAN_COLUMN = 'Business Application Number (BAN)'
+CATEGORIES = ['Compute', 'Storage', 'Network', 'Database']
+
+
+def statistics_loop(df_report):
+    """The original implementation, kept here as the reference."""
+    stats = {
+        'total_records': len(df_report),
+        'unique_sbg_count': df_report['SBG'].nunique(),
+        'unique_ban_count': df_report[BAN_COLUMN].nunique(),
+        'unique_categories': df_report['Category'].nunique(),
+        'sbg_list': df_report['SBG'].unique().tolist(),
+        'category_list': df_report['Category'].unique().tolist(),
+        'sbg_breakdown': df_report.groupby('SBG').size().to_dict(),
+        'ban_breakdown': df_report.groupby(BAN_COLUMN).size().to_dict(),
+        'category_breakdown': df_report.groupby('Category').size().to_dict(),
+        'category_details': {}
+    }
+    for category in df_report['Category'].unique():
+        df_category = df_report[df_report['Category'] == category]
+        distinct_sbgs = df_category['SBG'].unique().tolist()
+        sbg_ban_details = {}
+        for sbg in distinct_sbgs:
+            df_sbg = df_category[df_category['SBG'] == sbg]
+            sbg_ban_details[sbg] = {
+                'distinct_bans': df_sbg[BAN_COLUMN].nunique(),
+                'total_records': len(df_sbg)
+            }
+        stats['category_details'][category] = {
+            'distinct_sbgs': len(distinct_sbgs),
+            'sbg_ban_details': sbg_ban_details
+        }
+    return stats
+
+
+def make_report(rows, sbgs, bans, seed=0):
+    """A report frame with the columns calculate_statistics reads, including 'N/A' placeholders."""
+    rng = np.random.default_rng(seed)
+    sbg_values = np.array([f"SBG-{i:03d}" for i in range(sbgs - 1)] + ['N/A'], dtype=object)
+    ban_values = np.array([f"BAN{i:05d}" for i in range(bans - 1)] + ['N/A'], dtype=object)
+    return pd.DataFrame({
+        BAN_COLUMN: rng.choice(ban_values, size=rows),
+        'Category': rng.choice(np.array(CATEGORIES, dtype=object), size=rows),
+        'SBG': rng.choice(sbg_values, size=rows),
+    })
+
+
+def best_of(func, repeat):
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[20_000, 100_000])
+    parser.add_argument('--sbgs', type=int, default=40, help="Distinct SBG values")
+    parser.add_argument('--bans', type=int, default=150, help="Distinct BAN values")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per path; the best time is reported")
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'combos':>8} {'loop (s)':>10} {'single-pass (s)':>16} {'speedup':>9}")
+    for rows in args.rows:
+        df = make_report(rows, args.sbgs, args.bans)
+        combos = df.groupby(['SBG', BAN_COLUMN]).ngroups
+        old_time, old = best_of(lambda: statistics_loop(df), args.repeat)
+        new_time, new = best_of(lambda: calculate_statistics(df), args.repeat)
+
+        # Same values, same key order (the stats are sent as JSON)
+        if json.dumps(old) != json.dumps(new):
+            print(f"Output mismatch at {rows} rows", file=sys.stderr)
+            return 1
+
+        print(f"{rows:>10} {combos:>8} {old_time:>10.3f} {new_time:>16.3f} {old_time / new_time:>8.1f}x")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Generate synthetic Combined Data File workbooks for benchmarking.
+The layout matches the real template: 'README-Glossary' with its header on row 7
+and 'Compute' with its header on row 6 and 24 or more columns (SBG in C, BAN in D,
+application name in E, server id in N, separation scenario in R and the six target
+columns after it). Other inventory tabs (e.g. Storage, Network) can be added with
+the same layout.
+
+Usage: python benchmarks/synthetic_workbook.py OUTPUT.xlsx [--rows 50000]
+           [--tbd-ratio 0.3] [--missing-ratio 0.2] [--extra-columns 2] [--tabs Storage Network]
+"""
+
+import argparse
+import random
+
+from openpyxl import Workbook
+
+COMPUTE_COLUMNS = [
+    'Record ID', 'Region', 'SBG', 'Business Application Number (BAN)', 'Business Application Name',
+    'Environment', 'Data Center', 'Hosting Model', 'Operating System', 'OS Version', 'CPU Cores',
+    'Memory (GB)', 'Owner', 'Server ID / Name', 'IP Address', 'Server Role', 'Criticality',
+    'Server-Level Separation Scenario',
+    # Target columns: the six columns after the separation scenario
+    'Target Environment', 'Target Data Center', 'Target Hosting Model', 'Migration Wave',
+    'Target Operating System', 'Decommission Date',
+]
+SCENARIO_POSITION = COMPUTE_COLUMNS.index('Server-Level Separation Scenario')
+TARGET_POSITIONS = range(SCENARIO_POSITION + 1, SCENARIO_POSITION + 7)
+
+SBGS = ['Aerospace', 'Building Automation', 'Energy', 'Performance Materials', 'Safety', 'Corporate']
+TBD_VALUES = ['TBD', 'TBD', ' tbd ']
+OTHER_SCENARIOS = ['Retain', 'Migrate', 'Decommission', None]
+MISSING_VALUES = [None, '', '  ']
+
+
+def tab_columns(tab, extra_columns):
+    """Header row of a tab: the Compute layout, with the id column named after the tab."""
+    columns = list(COMPUTE_COLUMNS)
+    if tab != 'Compute':
+        columns[columns.index('Server ID / Name')] = f"{tab} ID / Name"
+    return columns + [f"Notes {i + 1}" for i in range(extra_columns)]
+
+
+def make_workbook(path, rows=10_000, tbd_ratio=0.3, missing_ratio=0.2, extra_columns=2, tabs=(), seed=0):
+    """
+    Write a synthetic workbook to path.
+    tbd_ratio is the share of rows whose separation scenario is 'TBD'; missing_ratio
+    is the chance of each target cell being empty. Other tabs get rows // 4 rows.
+    """
+    rng = random.Random(seed)
+    bans = [f"BAN{i:05d}" for i in range(max(rows // 20, 10))]
+    wb = Workbook(write_only=True)
+
+    # README-Glossary: title block, header on row 7, then one row per tab column
+    glossary = wb.create_sheet('README-Glossary')
+    glossary.append(['Combined Data File - README / Glossary'])
+    for _ in range(5):
+        glossary.append([])
+    glossary.append(['Tab Name', 'Column Name', 'Description'])
+    for tab in ('Compute',) + tuple(tabs):
+        for column in tab_columns(tab, extra_columns):
+            glossary.append([tab, column, f"{column} of the {tab} inventory"])
+
+    for tab in ('Compute',) + tuple(tabs):
+        columns = tab_columns(tab, extra_columns)
+        sheet = wb.create_sheet(tab)
+        # Title block, header on row 6
+        sheet.append([f"{tab} inventory"])
+        for _ in range(4):
+            sheet.append([])
+        sheet.append(columns)
+
+        for n in range(rows if tab == 'Compute' else rows // 4):
+            row = [None] * len(columns)
+            row[0] = n + 1
+            row[1] = rng.choice(['AMER', 'EMEA', 'APAC'])
+            row[2] = rng.choice(SBGS)
+            row[3] = rng.choice(bans)
+            row[4] = f"Application {row[3][3:]}"
+            for idx in range(5, 13):
+                row[idx] = rng.choice(['Prod', 'Non-Prod', 'DC1', 'DC2', 'Linux', 'Windows', 8, 16, 'owner'])
+            row[13] = f"{tab.lower()}-{n:07d}"
+            row[14] = f"10.{n // 65536 % 256}.{n // 256 % 256}.{n % 256}"
+            row[15] = rng.choice(['App', 'DB', 'Web'])
+            row[16] = rng.choice(['High', 'Medium', 'Low'])
+            row[SCENARIO_POSITION] = rng.choice(TBD_VALUES) if rng.random() < tbd_ratio else rng.choice(OTHER_SCENARIOS)
+            for idx in TARGET_POSITIONS:
+                row[idx] = rng.choice(MISSING_VALUES) if rng.random() < missing_ratio else rng.choice(
+                    ['Prod', 'DC3', 'Cloud', 'Wave 1', 'Wave 2', 'RHEL 9', '2026-06-30'])
+            for idx in range(len(COMPUTE_COLUMNS), len(columns)):
+                row[idx] = rng.choice([None, 'note'])
+            sheet.append(row)
+
+    wb.save(path)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('output')
+    parser.add_argument('--rows', type=int, default=10_000, help="Compute rows")
+    parser.add_argument('--tbd-ratio', type=float, default=0.3)
+    parser.add_argument('--missing-ratio', type=float, default=0.2)
+    parser.add_argument('--extra-columns', type=int, default=2, help="Columns after the 24 template columns")
+    parser.add_argument('--tabs', nargs='*', default=[], help="Other glossary-described tabs to add")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    make_workbook(args.output, args.rows, args.tbd_ratio, args.missing_ratio, args.extra_columns,
+                  args.tabs, args.seed)
+    print(f"Wrote {args.output}")
+
+
+if __name__ == '__main__':
+    main()
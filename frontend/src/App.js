@@ -1,7 +1,17 @@
 import React, { useState } from 'react';
-import { validateFile } from './api';
+import { validateFileWithProgress } from './api';
 import './App.css';
 
+// What the progress bar says during each stage of a validation job
+const STAGE_LABELS = {
+  queued: 'Waiting for a free worker...',
+  parse: 'Reading workbook...',
+  validate: 'Checking for missing columns...',
+  write: 'Formatting report...',
+  save: 'Saving report...',
+  statistics: 'Calculating statistics...',
+};
+
 function App() {
   const [file, setFile] = useState(null);
   const [loading, setLoading] = useState(false);
@@ -18,12 +28,17 @@ function App() {
     if (e.target.files && e.target.files.length > 0) {
       const selectedFile = e.target.files[0];
       
-      // Validate file type
+      // Validate file type: a workbook, or a zip of one CSV file per tab (optionally .gz)
       const allowedExtensions = ['.xlsx', '.xls'];
-      const fileExtension = selectedFile.name.substring(selectedFile.name.lastIndexOf('.')).toLowerCase();
+      const singleTabExtensions = ['.csv', '.tsv', '.txt'];
+      const fileName = selectedFile.name.toLowerCase();
+      const fileExtension = fileName.substring(fileName.lastIndexOf('.'));
+      const uncompressedName = fileName.replace(/\.gz$/, '');
       
-      if (!allowedExtensions.includes(fileExtension)) {
-        setError('Invalid file format. Please select an Excel file (.xlsx or .xls)');
+      if (!allowedExtensions.includes(fileExtension) && !uncompressedName.endsWith('.zip')) {
+        setError(singleTabExtensions.some((extension) => uncompressedName.endsWith(extension))
+          ? 'A single CSV/TSV file holds only one tab, but validation needs the README-Glossary and Compute tabs. Please select a zip of one CSV file per tab or the Excel workbook'
+          : 'Invalid file format. Please select an Excel file (.xlsx or .xls) or a zip of one CSV file per tab');
         setFile(null);
         e.target.value = ''; // Clear the input
         return;
@@ -60,34 +75,23 @@ function App() {
     setProcessingStage('Preparing upload...');
 
     try {
-      // Track upload progress (0-40% for upload phase)
-      const { blob, stats } = await validateFile(file, (progress) => {
-        // Map upload progress to 0-40%
-        const uploadPercentage = Math.floor(progress * 0.4);
-        setUploadProgress(uploadPercentage);
-        
-        if (progress < 100) {
-          setProcessingStage('Uploading file...');
-        } else {
-          // Upload complete, now processing
-          setUploadProgress(40);
-          setProcessingStage('Processing file...');
-        }
+      const { blob, stats } = await validateFileWithProgress(file, {
+        // Upload phase: 0-20%
+        onUploadProgress: (progress) => {
+          setUploadProgress(Math.floor(progress * 0.2));
+          setProcessingStage(progress < 100 ? 'Uploading file...' : 'Processing file...');
+        },
+        // Processing stages streamed by the backend: 20-95%
+        onProgress: ({ progress, stage, stageDone, stageTotal }) => {
+          setUploadProgress(20 + Math.floor(progress * 0.75));
+          const label = STAGE_LABELS[stage] || 'Processing file...';
+          // Row counts for the long stages (reading and formatting)
+          setProcessingStage((stage === 'parse' || stage === 'write') && stageTotal && stageDone
+            ? `${label} (row ${stageDone.toLocaleString()} of ${stageTotal.toLocaleString()})`
+            : label);
+        },
       });
 
-      // Simulate processing progress (40-80%)
-      setUploadProgress(50);
-      setProcessingStage('Validating data...');
-      
-      await new Promise(resolve => setTimeout(resolve, 300));
-      setUploadProgress(65);
-      setProcessingStage('Generating report...');
-      
-      await new Promise(resolve => setTimeout(resolve, 300));
-      setUploadProgress(80);
-      setProcessingStage('Formatting report...');
-      
-      await new Promise(resolve => setTimeout(resolve, 200));
       setUploadProgress(95);
       setProcessingStage('Finalizing...');
       
@@ -212,10 +216,10 @@ function App() {
                   <line x1="12" y1="3" x2="12" y2="15"/>
                 </svg>
                 <p className="drop-text">Click to browse or drag and drop</p>
-                <p className="drop-hint">Supported formats: .xlsx, .xls</p>
+                <p className="drop-hint">Supported formats: .xlsx, .xls, .zip of per-tab CSVs</p>
                 <input
                   type="file"
-                  accept=".xlsx, .xls"
+                  accept=".xlsx, .xls, .zip, .gz"
                   onChange={handleFileChange}
                   id="file-upload"
                   disabled={loading}
@@ -416,9 +420,9 @@ function App() {
                         <span className="breakdown-count">{count} record{count !== 1 ? 's' : ''}</span>
                       </div>
                     ))}
-                    {Object.keys(reportStats.ban_breakdown || {}).length > 10 && (
+                    {reportStats.unique_ban_count > 10 && (
                       <div className="breakdown-item">
-                        <span className="breakdown-label text-muted">... and {Object.keys(reportStats.ban_breakdown).length - 10} more</span>
+                        <span className="breakdown-label text-muted">... and {reportStats.unique_ban_count - 10} more</span>
                       </div>
                     )}
                   </div>
@@ -5,11 +5,49 @@ const API_BASE_URL = process.env.NODE_ENV === 'production'
   ? ''  // Vercel production - use relative path
   : 'http://localhost:5000';  // Local development
 
+// Number of BAN breakdown entries fetched with the report statistics
+export const BAN_PAGE_SIZE = 10;
+
+// Whether the server runs background validation jobs: a promise, probed once
+let jobsSupport = null;
+
+/**
+ * Whether /api/jobs is available, asked once with a body-less GET and remembered.
+ * Anything but the jobs API's own answer (a 404 from the Vercel function, a 405 or
+ * an HTML page from static hosting, a network error) means validating in one request.
+ * @returns {Promise<boolean>}
+ */
+export const supportsJobs = () => {
+  if (jobsSupport === null) {
+    jobsSupport = axios.get(`${API_BASE_URL}/api/jobs`)
+      .then((response) => response.data?.jobs === true)
+      .catch(() => false);
+  }
+  return jobsSupport;
+};
+
+/**
+ * Fetches the full statistics of a generated report.
+ * @param {string} statsUrl - The X-Report-Stats-Url of the report response.
+ * @param {{offset?: number, limit?: number}} page - Which BAN breakdown entries to include.
+ * @returns {Promise<Object>} - Statistics, with ban_page describing the BAN page returned.
+ */
+export const fetchReportStats = async (statsUrl, { offset = 0, limit } = {}) => {
+  const params = { offset };
+  if (limit !== undefined) {
+    params.limit = limit;
+  }
+  const response = await axios.get(`${API_BASE_URL}${statsUrl}`, { params });
+  return response.data;
+};
+
 /**
  * Uploads the Excel file to the backend for validation.
  * @param {File} file - The file object selected by the user.
  * @param {Function} onProgress - Callback function to track upload progress (0-100).
  * @returns {Promise<{blob: Blob, stats: Object}>} - The generated report and statistics.
+ * The response header carries every statistic except the BAN breakdown, which is
+ * fetched from the stats resource it points to (X-Report-Stats-Url).
  */
 export const validateFile = async (file, onProgress = null) => {
   const formData = new FormData();
@@ -31,36 +69,146 @@ export const validateFile = async (file, onProgress = null) => {
       },
     });
 
-    // Extract statistics from response headers
-    let stats = null;
-    const statsHeader = response.headers['x-report-stats'];
-    if (statsHeader) {
-      try {
-        stats = JSON.parse(statsHeader);
-      } catch (e) {
-        console.error('Failed to parse statistics:', e);
-      }
+    return await readReportResponse(response);
+  } catch (error) {
+    throw await validationError(error);
+  }
+};
+
+/**
+ * Uploads the Excel file as a background validation job and follows its progress
+ * over Server-Sent Events until the report is ready. Uses validateFile instead
+ * (upload progress only) where the jobs API isn't available (see supportsJobs), so
+ * the file is only uploaded once.
+ * @param {File} file - The file object selected by the user.
+ * @param {{onUploadProgress?: Function, onProgress?: Function}} callbacks -
+ *   onUploadProgress(0-100) while uploading; onProgress({progress, stage, stageDone, stageTotal})
+ *   for each processing stage ('parse', 'validate', 'write', 'save', 'statistics').
+ * @returns {Promise<{blob: Blob, stats: Object}>} - The generated report and statistics.
+ */
+export const validateFileWithProgress = async (file, { onUploadProgress = null, onProgress = null } = {}) => {
+  // Deployments without background jobs (the Vercel function) validate in one request
+  if (!(await supportsJobs())) {
+    return validateFile(file, onUploadProgress);
+  }
+
+  const formData = new FormData();
+  formData.append('file', file);
+
+  let submitted;
+  try {
+    submitted = await axios.post(`${API_BASE_URL}/api/jobs`, formData, {
+      headers: {
+        'Content-Type': 'multipart/form-data',
+      },
+      onUploadProgress: (progressEvent) => {
+        if (onUploadProgress && progressEvent.total) {
+          onUploadProgress(Math.round((progressEvent.loaded * 100) / progressEvent.total));
+        }
+      },
+    });
+  } catch (error) {
+    throw await validationError(error);
+  }
+
+  try {
+    let job = submitted.data;
+    if (job.status !== 'succeeded' && job.status !== 'failed') {
+      job = await followJobEvents(job.events_url, onProgress);
+    }
+    if (job.status === 'failed') {
+      throw new Error(job.error || 'An unknown server error occurred.');
     }
 
-    return { blob: response.data, stats };
+    const response = await axios.get(`${API_BASE_URL}${submitted.data.report_url}`, {
+      responseType: 'blob',
+    });
+    return await readReportResponse(response);
   } catch (error) {
-    // Handle specific case where backend returns JSON error wrapped in a Blob
-    if (error.response && error.response.data instanceof Blob) {
-      const errorText = await error.response.data.text();
-      try {
-        const errorJson = JSON.parse(errorText);
-        throw new Error(errorJson.error || 'An unknown server error occurred.');
-      } catch (e) {
-        // If parsing fails, just use the raw text or a default message
-        throw new Error('File validation failed. Please check the file format.');
-      }
+    throw await validationError(error);
+  }
+};
+
+/**
+ * Listens to a job's progress stream until its 'done' event.
+ * @returns {Promise<Object>} - The finished job's status.
+ */
+const followJobEvents = (eventsUrl, onProgress) => new Promise((resolve, reject) => {
+  const source = new EventSource(`${API_BASE_URL}${eventsUrl}`);
+
+  source.addEventListener('progress', (event) => {
+    const job = JSON.parse(event.data);
+    if (onProgress) {
+      onProgress({
+        progress: job.progress,
+        stage: job.stage,
+        stageDone: job.stage_done,
+        stageTotal: job.stage_total,
+      });
     }
+  });
+  source.addEventListener('done', (event) => {
+    source.close();
+    resolve(JSON.parse(event.data));
+  });
+  // Server-sent 'error' events carry data; connection errors don't
+  source.addEventListener('error', (event) => {
+    source.close();
+    const message = event.data ? JSON.parse(event.data).error : 'Lost connection to the validation progress stream.';
+    reject(new Error(message));
+  });
+});
 
-    // Fallback for network errors or standard JSON errors
-    throw new Error(
-      error.response?.data?.error ||
-      error.message ||
-      'Server is unreachable. Please ensure the backend is running.'
-    );
+/**
+ * Reads a report response: the blob, its statistics (X-Report-Stats) and the first
+ * page of the BAN breakdown from the stats resource it points to. Without that
+ * page (e.g. an expired report) the rest of the statistics are still shown.
+ */
+const readReportResponse = async (response) => {
+  // Extract summary statistics from response headers
+  let stats = null;
+  const statsHeader = response.headers['x-report-stats'];
+  if (statsHeader) {
+    try {
+      stats = JSON.parse(statsHeader);
+    } catch (e) {
+      console.error('Failed to parse statistics:', e);
+    }
   }
+
+  // Fetch the BAN breakdown (only the first page is displayed)
+  const statsUrl = response.headers['x-report-stats-url'];
+  if (stats && statsUrl) {
+    try {
+      stats = { ...stats, ...(await fetchReportStats(statsUrl, { limit: BAN_PAGE_SIZE })) };
+    } catch (e) {
+      console.error('Failed to load BAN breakdown:', e);
+    }
+  }
+
+  return { blob: response.data, stats };
+};
+
+/**
+ * The Error to show for a failed validation request.
+ */
+const validationError = async (error) => {
+  // Handle specific case where backend returns JSON error wrapped in a Blob
+  if (error.response && error.response.data instanceof Blob) {
+    const errorText = await error.response.data.text();
+    try {
+      const errorJson = JSON.parse(errorText);
+      return new Error(errorJson.error || 'An unknown server error occurred.');
+    } catch (e) {
+      // If parsing fails, just use the raw text or a default message
+      return new Error('File validation failed. Please check the file format.');
+    }
+  }
+
+  // Fallback for network errors or standard JSON errors
+  return new Error(
+    error.response?.data?.error ||
+    error.message ||
+    'Server is unreachable. Please ensure the backend is running.'
+  );
 };
\ No newline at end of file
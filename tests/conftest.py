@@ -0,0 +1,10 @@
+"""
+Shared test setup: the backend modules import one another as top-level modules
+(as app.py and the worker processes run them), so backend/ goes on sys.path.
+Run with: python -m pytest -q tests
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
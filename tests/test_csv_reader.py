@@ -0,0 +1,111 @@
+"""
+A delimited-text export of a workbook (a zip of one CSV per tab) must give the same
+Compute rows and the same report as the workbook itself, including identifiers that
+look like numbers but are text in the workbook (leading-zero BANs, '1E5').
+"""
+
+import csv
+import zipfile
+from io import BytesIO, StringIO
+
+import pandas as pd
+import pytest
+from openpyxl import Workbook
+
+from csv_reader import DelimitedBundle
+from validator import generate_report_stream
+from workbook import ParsedWorkbook, COMPUTE_SHEET, GLOSSARY_SHEET, COMPUTE_HEADER_ROW, GLOSSARY_HEADER_ROW
+
+
+TARGETS = ['Target Environment', 'Target Data Center', 'Target Hosting Model', 'Migration Wave',
+           'Target Operating System', 'Decommission Date']
+COMPUTE_COLUMNS = ['Record ID', 'SBG', 'Business Application Number (BAN)', 'Business Application Name',
+                   'CPU Cores', 'Server ID / Name', 'Server-Level Separation Scenario'] + TARGETS
+COMPUTE_ROWS = [
+    [1, 'Energy', '00123', 'Billing', 4, 'srv-1', 'TBD', None, 'DC1', 'Cloud', 'Wave 1', 'RHEL 9', None],
+    [2, 'Energy', 123, 'Billing', 2.5, 'srv-2', 'TBD', 'Prod', None, None, 'Wave 1', 'RHEL 9', '2026-06-30'],
+    [3, 'Safety', '1E5', 'Payroll', 8, 'srv-3', ' tbd ', 'Prod', 'DC1', 'Cloud', 'Wave 2', None, None],
+    [4, 'Safety', 'BAN7', 'Payroll', None, 'srv-4', 'Retain', None, None, None, None, None, None],
+    [5, 'Corporate', 456, None, 16, 'srv-5', 'TBD', 'Prod', 'DC1', 'Cloud', 'Wave 2', 'RHEL 9', '2026-06-30'],
+    [6, 'Corporate', '-0', 'Ledger', 7.5, '0042', 'TBD', None, None, None, None, None, None],
+]
+
+
+@pytest.fixture(scope='module')
+def sheets():
+    """Tab name -> rows (title block, header, records), as laid out in the template."""
+    glossary = [['Combined Data File - README / Glossary']] + [[]] * (GLOSSARY_HEADER_ROW - 1)
+    glossary += [['Tab Name', 'Column Name', 'Description']]
+    glossary += [[COMPUTE_SHEET, column, f"{column} of the Compute inventory"] for column in COMPUTE_COLUMNS]
+    compute = [['Compute inventory']] + [[]] * (COMPUTE_HEADER_ROW - 1) + [COMPUTE_COLUMNS] + COMPUTE_ROWS
+    return {GLOSSARY_SHEET: glossary, COMPUTE_SHEET: compute}
+
+
+@pytest.fixture(scope='module')
+def workbook_bytes(sheets):
+    wb = Workbook()
+    wb.remove(wb.active)
+    for name, rows in sheets.items():
+        sheet = wb.create_sheet(name)
+        for row in rows:
+            sheet.append(row)
+    buffer = BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
+
+
+@pytest.fixture(scope='module')
+def bundle_bytes(sheets):
+    """The tabs exported as CSV, numbers written as Excel writes them ('8', '2.5')."""
+    def text(value):
+        if value is None:
+            return ''
+        if isinstance(value, float) and value.is_integer():
+            return str(int(value))
+        return str(value)
+
+    buffer = BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        for name, rows in sheets.items():
+            out = StringIO()
+            writer = csv.writer(out, lineterminator='\r\n')
+            for row in rows:
+                writer.writerow([text(value) for value in row])
+            archive.writestr(f"{name}.csv", out.getvalue())
+    return buffer.getvalue()
+
+
+def load_both(workbook_bytes, bundle_bytes, reader):
+    workbook = ParsedWorkbook.load(BytesIO(workbook_bytes), reader)
+    bundle = ParsedWorkbook.load(DelimitedBundle.open(bundle_bytes, 'export.zip'), reader)
+    assert workbook.check_structure() is None and bundle.check_structure() is None
+    return workbook, bundle
+
+
+@pytest.mark.parametrize('reader', ['streaming', 'pandas'])
+def test_compute_rows_match_workbook(workbook_bytes, bundle_bytes, reader):
+    workbook, bundle = load_both(workbook_bytes, bundle_bytes, reader)
+
+    assert bundle.compute_columns == workbook.compute_columns
+    pd.testing.assert_frame_equal(bundle.compute, workbook.compute)
+
+
+def test_identifiers_stay_text(workbook_bytes, bundle_bytes):
+    _, bundle = load_both(workbook_bytes, bundle_bytes, 'streaming')
+    compute = bundle.compute
+
+    assert compute['Business Application Number (BAN)'].tolist() == ['00123', 123, '1E5', 456, '-0']
+    assert compute['Server ID / Name'].tolist()[-1] == '0042'
+
+
+def test_report_matches_workbook(workbook_bytes, bundle_bytes):
+    workbook, bundle = load_both(workbook_bytes, bundle_bytes, 'streaming')
+
+    reports = []
+    for parsed in (workbook, bundle):
+        success, message, stats, chunks = generate_report_stream(parsed, 'csv', max_workers=1)
+        assert success, message
+        reports.append((''.join(chunks), stats))
+
+    assert reports[1] == reports[0]
+    assert '00123' in reports[1][0]
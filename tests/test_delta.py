@@ -0,0 +1,82 @@
+"""
+The delta row index: a RowIndex survives its JSON round trip (as kept between
+uploads), and two runs' findings diff into new, resolved and updated rows.
+"""
+
+import pandas as pd
+import pytest
+
+from delta import DeltaRun, RowIndex, NEW_FINDING, RESOLVED, UPDATED
+
+
+NAMES = {
+    'ban': 'BAN',
+    'sbg': 'SBG',
+    'app_name': 'Application',
+    'server_id': 'Server',
+    'sep_scenario': 'Scenario',
+}
+
+
+def tbd_rows(rows):
+    """'TBD' rows as build_category_report passes them to DeltaRun.record."""
+    return pd.DataFrame(rows, columns=['BAN', 'SBG', 'Application', 'Server', 'Scenario', 'Columns Missing'])
+
+
+FIRST = tbd_rows([
+    [123, 'Energy', 'Billing', 'srv-1', 'TBD', 'Target Environment'],
+    ['00123', 'Energy', 'Billing', 'srv-1', 'TBD', None],
+    ['BAN7', None, 'Payroll', 'srv-2', 'TBD', 'Migration Wave, Decommission Date'],
+    # The same server and BAN again: told apart by occurrence
+    ['BAN7', 'Safety', 'Payroll', 'srv-2', 'TBD', 'Migration Wave'],
+    ['BAN9', 'Corporate', None, 'srv-3', 'TBD', 'Target Data Center'],
+])
+
+
+def test_row_index_round_trip():
+    delta = DeltaRun()
+    delta.record(FIRST, NAMES)
+
+    restored = RowIndex.from_bytes(delta.index.to_bytes())
+
+    pd.testing.assert_frame_equal(restored.rows, delta.index.rows)
+    # Only findings are kept; the numeric and the text BAN stay different keys
+    assert len(restored.rows) == 4
+    assert restored.rows['ban'].tolist() == [123, 'BAN7', 'BAN7', 'BAN9']
+    assert restored.rows.loc[restored.rows['ban'] == 'BAN9', 'app_name'].tolist() == ['N/A']
+
+
+def test_restored_index_diffs_like_the_original():
+    first = DeltaRun()
+    first.record(FIRST, NAMES)
+    second = tbd_rows([
+        [123, 'Energy', 'Billing', 'srv-1', 'TBD', 'Target Environment'],
+        ['00123', 'Energy', 'Billing', 'srv-1', 'TBD', 'Owner'],
+        ['BAN7', None, 'Payroll', 'srv-2', 'TBD', 'Migration Wave'],
+        ['BAN7', 'Safety', 'Payroll', 'srv-2', 'TBD', 'Migration Wave'],
+    ])
+
+    delta = DeltaRun(RowIndex.from_bytes(first.index.to_bytes()))
+    delta.record(second, NAMES)
+    direct = DeltaRun(first.index)
+    direct.record(second, NAMES)
+
+    pd.testing.assert_frame_equal(delta.changes, direct.changes)
+    changes = delta.changes.set_index('Change')
+    assert changes.loc[NEW_FINDING, 'Business Application Number (BAN)'] == '00123'
+    assert changes.loc[RESOLVED, 'Server ID / Name'] == 'srv-3'
+    assert changes.loc[UPDATED, 'Previously Missing'] == 'Migration Wave, Decommission Date'
+    assert delta.summary() == {'new_findings': 1, 'resolved': 1, 'updated': 1}
+
+
+def test_empty_index_round_trip():
+    delta = DeltaRun()
+    delta.record(tbd_rows([]).drop(columns='Columns Missing'), NAMES)
+
+    assert RowIndex.from_bytes(delta.index.to_bytes()).rows.empty
+
+
+@pytest.mark.parametrize('data', [b'not json', b'{"keys": []}', b'[1, 2]'])
+def test_unreadable_index(data):
+    with pytest.raises(ValueError):
+        RowIndex.from_bytes(data)
@@ -0,0 +1,140 @@
+"""
+The three workbook readers ('streaming', 'pandas' and 'xml') must give the same
+rows and values for a tab: dates, shared and inline strings, formulas without a
+cached value, missing-value strings and error codes.
+Run with: python -m pytest -q tests
+"""
+
+import re
+import zipfile
+from datetime import datetime
+from io import BytesIO
+
+import pandas as pd
+import pytest
+from openpyxl import Workbook
+
+import workbook
+from workbook import TAB_HEADER_ROW, read_tab, start_sheet_xml
+
+
+SHEET = 'Compute'
+HEADER = ['Record ID', 'Created', 'Owner', 'Cores', 'Total', 'Separation Scenario', 'Notes']
+ROWS = [
+    [1, datetime(2024, 1, 15, 9, 30), 'alice', 4, '=D8*2', 'TBD', 'N/A'],
+    [2, datetime(2023, 12, 31), 'bob', 8.0, None, 'Retain', 'keep'],
+    [3, None, 'alice', '#N/A', '=D10+1', ' tbd ', 'NULL'],
+    [None, None, None, None, None, None, None],
+    ['A-4', datetime(2025, 6, 1), 'carol', 2.5, 7, 'TBD', ''],
+    [5, '2024-02-01', 'nan', 16, '#DIV/0!', 'TBD', 'shared text'],
+]
+SELECTED = HEADER
+# One string cell stays inline, the others go to the shared string table
+INLINE_CELL = b'C11'
+
+
+def select(header_columns):
+    positions = [header_columns.index(name) for name in SELECTED]
+    return positions, header_columns.index('Separation Scenario')
+
+
+@pytest.fixture(scope='module')
+def workbook_bytes():
+    wb = Workbook()
+    sheet = wb.active
+    sheet.title = SHEET
+    sheet.append(['Combined Data File'])
+    for _ in range(TAB_HEADER_ROW - 1):
+        sheet.append([])
+    sheet.append(HEADER)
+    for row in ROWS:
+        sheet.append(row)
+    buffer = BytesIO()
+    wb.save(buffer)
+    return _with_shared_strings(buffer.getvalue(), keep_inline=INLINE_CELL)
+
+
+def _with_shared_strings(xlsx, keep_inline):
+    """
+    openpyxl writes every string inline: move them to a shared string table (as Excel
+    does), all but the cell keep_inline.
+    """
+    strings = []
+
+    def share(match):
+        if match.group(1) == keep_inline:
+            return match.group(0)
+        strings.append(match.group(3))
+        return b'<c r="%s"%s t="s"><v>%d</v></c>' % (match.group(1), match.group(2), len(strings) - 1)
+
+    original = zipfile.ZipFile(BytesIO(xlsx))
+    patched = BytesIO()
+    with zipfile.ZipFile(patched, 'w', zipfile.ZIP_DEFLATED) as out:
+        for info in original.infolist():
+            data = original.read(info.filename)
+            if info.filename == 'xl/worksheets/sheet1.xml':
+                data = re.sub(rb'<c r="([A-Z]+\d+)"([^>]*?) t="inlineStr"><is><t>(.*?)</t></is></c>', share, data)
+            elif info.filename == '[Content_Types].xml':
+                data = data.replace(b'</Types>', b'<Override PartName="/xl/sharedStrings.xml" ContentType="application/'
+                                    b'vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"/></Types>')
+            elif info.filename == 'xl/_rels/workbook.xml.rels':
+                data = data.replace(b'</Relationships>', b'<Relationship Id="rIdShared" Type="http://schemas.'
+                                    b'openxmlformats.org/officeDocument/2006/relationships/sharedStrings" '
+                                    b'Target="sharedStrings.xml"/></Relationships>')
+            out.writestr(info, data)
+        items = b''.join(b'<si><t>%s</t></si>' % text for text in strings)
+        out.writestr('xl/sharedStrings.xml',
+                     b'<sst xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" count="%d" '
+                     b'uniqueCount="%d">%s</sst>' % (len(strings), len(strings), items))
+    return patched.getvalue()
+
+
+def read(source, reader):
+    df, columns = read_tab(BytesIO(source), SHEET, select, reader=reader)
+    if reader == 'pandas':
+        # The pandas reader returns the whole sheet: filter and project it like the others
+        scenario = df['Separation Scenario']
+        df = df.loc[scenario.astype(str).str.strip().str.upper().eq('TBD') & scenario.notna(), SELECTED]
+    return df, columns
+
+
+@pytest.mark.parametrize('reader', ['pandas', 'xml'])
+def test_reader_matches_streaming(workbook_bytes, reader):
+    expected, expected_columns = read(workbook_bytes, 'streaming')
+    df, columns = read(workbook_bytes, reader)
+
+    assert columns == expected_columns
+    pd.testing.assert_frame_equal(df, expected)
+
+
+@pytest.mark.parametrize('max_workers', [1, 2])
+def test_xml_blocks_match_streaming(workbook_bytes, monkeypatch, max_workers):
+    # Blocks of a row or two, decoded here or in worker processes
+    monkeypatch.setattr(workbook, 'XML_BLOCK_BYTES', 64)
+    monkeypatch.setattr(workbook, 'XML_CHUNK_MIN_BYTES', 64)
+    expected, expected_columns = read(workbook_bytes, 'streaming')
+
+    with pd.ExcelFile(BytesIO(workbook_bytes)) as excel_file:
+        collect = start_sheet_xml(BytesIO(workbook_bytes), excel_file.book[SHEET], TAB_HEADER_ROW, select,
+                                  max_workers=max_workers)
+        df, columns = collect()
+
+    assert columns == expected_columns
+    pd.testing.assert_frame_equal(df, expected)
+
+
+def test_cell_values(workbook_bytes):
+    df, _ = read(workbook_bytes, 'xml')
+
+    assert df.index.tolist() == [0, 2, 4, 5]
+    assert df['Record ID'].tolist() == [1, 3, 'A-4', 5]
+    assert df.loc[0, 'Created'] == datetime(2024, 1, 15, 9, 30)
+    assert df.loc[4, 'Created'] == datetime(2025, 6, 1)
+    assert df.loc[5, 'Created'] == '2024-02-01'
+    # Shared strings, the inline one, and a shared string pandas reads as missing
+    assert df['Owner'].tolist()[:3] == ['alice', 'alice', 'carol']
+    assert pd.isna(df.loc[5, 'Owner'])
+    # Formulas have no cached value in a workbook openpyxl wrote; NA strings and error codes are missing
+    assert df['Total'].isna().tolist() == [True, True, False, True]
+    assert df['Cores'].tolist()[0] == 4 and pd.isna(df.loc[2, 'Cores'])
+    assert df['Notes'].isna().tolist() == [True, True, True, False]
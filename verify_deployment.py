@@ -44,6 +44,22 @@ def verify_deployment():
         check_file_exists("api/__init__.py", "Package marker"),
         check_file_exists("api/validate.py", "Flask WSGI app"),
         check_file_exists("api/validator.py", "Validation logic"),
+        check_file_exists("api/workbook.py", "Workbook parsing"),
+        check_file_exists("api/column_index.py", "Column resolution"),
+        check_file_exists("api/report_writer.py", "Report writer"),
+        check_file_exists("api/report_cache.py", "Report cache"),
+        check_file_exists("api/report_stats.py", "Report statistics"),
+        check_file_exists("api/upload.py", "Upload ingestion"),
+        check_file_exists("api/instrumentation.py", "Stage timing"),
+        check_file_exists("api/delta.py", "Delta validation"),
+        check_file_exists("api/glossary_cache.py", "Glossary cache"),
+        check_file_exists("api/xlsx_reader.py", "Sheet XML reader"),
+        check_file_exists("api/columnar_cache.py", "Columnar workbook cache"),
+        check_file_exists("api/progress.py", "Progress reporting"),
+        check_file_exists("api/csv_reader.py", "Delimited-text (CSV/TSV) reader"),
+        check_file_exists("api/report_formats.py", "Streaming report formats"),
+        check_file_exists("api/worker_pool.py", "Shared worker process pool"),
+        check_file_exists("api/upload_types.py", "Accepted upload names"),
     ]
     checks_passed += sum(checks)
     checks_total += len(checks)